@@ -0,0 +1,146 @@
+"""
+Servidor local que serve as rotas do api-mock.json (as mesmas do Mockoon) com validadores HTTP:
+ETag (hash do corpo) e Last-Modified (data do arquivo), respondendo 304 a If-None-Match /
+If-Modified-Since. Serve para medir o ganho das requisições condicionais do backend.
+
+    python apimock/content_server.py --port 3001 [--latency-ms 20] [--no-validators]
+
+Só depende da biblioteca padrão; relê o api-mock.json quando o arquivo muda.
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_MOCK = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api-mock.json")
+
+
+class MockRoutes:
+    """Rotas do arquivo do Mockoon (regras de query 'equals' com operador AND/OR)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime = None
+        self._routes = {}
+        self._headers = []
+        self._lock = threading.Lock()
+
+    def _reload(self):
+        mtime = os.path.getmtime(self.path)
+        if mtime == self._mtime:
+            return
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self._routes = {("/" + r["endpoint"].strip("/"), r["method"].upper()): r for r in data["routes"]}
+        self._headers = [(h["key"], h["value"]) for h in data.get("headers", [])]
+        self._mtime = mtime
+
+    def resolve(self, method: str, path: str, query: dict):
+        """(status, corpo, cabeçalhos, mtime) da resposta escolhida, ou None se a rota não existe."""
+        with self._lock:
+            self._reload()
+            route = self._routes.get((path.rstrip("/"), method))
+            headers, mtime = list(self._headers), self._mtime
+        if route is None:
+            return None
+
+        chosen = None
+        for response in route["responses"]:
+            rules = response.get("rules") or []
+            if not rules:
+                continue
+            matches = [(query.get(r["modifier"]) == r["value"]) != r.get("invert", False) for r in rules]
+            if (any(matches) if response.get("rulesOperator") == "OR" else all(matches)):
+                chosen = response
+                break
+        if chosen is None:
+            chosen = next((r for r in route["responses"] if r.get("default")), route["responses"][0])
+
+        headers += [(h["key"], h["value"]) for h in chosen.get("headers", [])]
+        return chosen["statusCode"], chosen.get("body", "").encode("utf-8"), headers, mtime
+
+
+def make_handler(routes: MockRoutes, latency_ms: float, validators: bool):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        stats = {"200": 0, "304": 0, "bytes": 0}
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            resolved = routes.resolve("GET", url.path, query)
+            if resolved is None:
+                self._send(404, b'{"erro": "rota nao encontrada"}', [("Content-Type", "application/json")])
+                return
+
+            status, body, headers, mtime = resolved
+            if validators and 200 <= status < 300:
+                etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+                headers += [("ETag", etag), ("Last-Modified", formatdate(mtime, usegmt=True)),
+                            ("Cache-Control", "no-cache")]
+                if self._not_modified(etag, mtime):
+                    self._send(304, b"", [h for h in headers if h[0].lower() != "content-type"])
+                    return
+            self._send(status, body, headers)
+
+        def _not_modified(self, etag: str, mtime: float) -> bool:
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match:
+                tags = [t.strip() for t in if_none_match.split(",")]
+                return "*" in tags or etag in tags or f"W/{etag}" in tags
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_modified_since:
+                try:
+                    return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+                except (TypeError, ValueError):
+                    return False
+            return False
+
+        def _send(self, status: int, body: bytes, headers):
+            self.send_response(status)
+            for key, value in headers:
+                self.send_header(key, value)
+            if status != 304:
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if status != 304:
+                self.wfile.write(body)
+            Handler.stats["304" if status == 304 else "200"] += 1
+            Handler.stats["bytes"] += len(body)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mock", default=DEFAULT_MOCK)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3001)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--no-validators", action="store_true", help="Não envia ETag/Last-Modified (como o Mockoon).")
+    args = parser.parse_args()
+
+    handler = make_handler(MockRoutes(args.mock), args.latency_ms, not args.no_validators)
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    print(f"Servindo {args.mock} em http://{args.host}:{args.port}/api")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(handler.stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -13,4 +13,30 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# WebSocket não passa pelo Django: as rotas abaixo são apps ASGI próprias
+from educhatbot.controllers.chat_socket_controller import ChatSocketController  # noqa: E402
+
+websocket_routes = {
+    "/api/chat/ws": ChatSocketController(),
+}
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        handler = websocket_routes.get(scope["path"].rstrip("/"))
+        if handler is None:
+            await receive()  # websocket.connect
+            await send({"type": "websocket.close", "code": 4404})
+            return
+        await handler(scope, receive, send)
+        return
+    await django_application(scope, receive, send)
+
+# Fora do Gunicorn (ex.: uvicorn direto) o warmup pode ser feito na importação.
+# Com o config/gunicorn.conf.py NÃO habilite: o warmup roda em cada worker.
+if os.getenv("WARMUP_ON_STARTUP", "").lower() in ("1", "true", "yes", "on"):
+    from educhatbot.runtime import warmup
+
+    warmup()
@@ -0,0 +1,58 @@
+"""
+Perfil de execução em produção (Gunicorn).
+
+WSGI (padrão, workers com threads):
+    gunicorn -c config/gunicorn.conf.py config.wsgi:application
+
+ASGI (workers Uvicorn):
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \
+        gunicorn -c config/gunicorn.conf.py config.asgi:application
+
+Com ``preload_app`` o master importa Django, a URLconf e os SDKs pesados
+(google.generativeai, grpc, drf_spectacular) uma única vez antes do fork.
+Cada worker então executa o warmup (serviços, aliases e cache de conteúdos)
+antes de aceitar conexões, e só responde 200 em /api/health/ready depois disso.
+Conexões (httpx, gRPC) nunca são abertas no master, pois não sobrevivem ao fork.
+"""
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+
+preload_app = True
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", "30"))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", "5"))
+
+# Recicla workers periodicamente (com jitter para não reiniciarem todos juntos)
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "2000"))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", "200"))
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    """Master: importa módulos pesados antes de criar os workers."""
+    from educhatbot.runtime import preload
+    preload()
+    server.log.info("Preload concluído (URLconf e serviços importados).")
+
+
+def post_worker_init(worker):
+    """Worker: constrói serviços e aquece caches antes de aceitar tráfego."""
+    from educhatbot.runtime import warmup
+    report = warmup()
+    worker.log.info(f"Warmup do worker {worker.pid}: {report}")
+
+
+def worker_exit(server, worker):
+    """Worker: grava os feedbacks ainda pendentes na fila write-behind."""
+    from educhatbot.runtime import shutdown
+    if not shutdown():
+        worker.log.warning(f"Worker {worker.pid} encerrou com feedbacks não gravados.")
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
 from dotenv import load_dotenv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -34,6 +35,9 @@ ALLOWED_HOSTS = [
     ".ngrok-free.app",   # aceita todos domínios do ngrok
 ]
 
+# Schema OpenAPI / Swagger UI (drf_spectacular). Desligado, o pacote nem é importado.
+API_SCHEMA_ENABLED = os.getenv("API_SCHEMA_ENABLED", "True").lower() in ("1", "true", "yes", "on")
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -44,7 +48,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'rest_framework',
-    'drf_spectacular',
+    *(['drf_spectacular'] if API_SCHEMA_ENABLED else []),
     'educhatbot',
     'corsheaders',
 ]
@@ -58,6 +62,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'educhatbot.middleware.ProfilingMiddleware',
 ]
 
 ROOT_URLCONF = 'config.urls'
@@ -133,7 +138,6 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_RENDERER_CLASSES': (
         'djangorestframework_camel_case.render.CamelCaseJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
@@ -144,6 +148,9 @@ REST_FRAMEWORK = {
     'JSON_UNDERSCOREIZE': {"no_underscore_before_number": True},
 }
 
+if API_SCHEMA_ENABLED:
+    REST_FRAMEWORK['DEFAULT_SCHEMA_CLASS'] = 'drf_spectacular.openapi.AutoSchema'
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'API do Chatbot Educacional',
     'DESCRIPTION': 'Documentação da API para o TCC 2',
@@ -155,11 +162,19 @@ SPECTACULAR_SETTINGS = {
 }
 
 CORS_ALLOW_ALL_ORIGINS = True
+# X-Deadline-Ms: prazo do /api/chat pedido pelo cliente; Idempotency-Key: retentativas sem reexecutar
+CORS_ALLOW_HEADERS = (*default_headers, "x-deadline-ms", "idempotency-key")
+CORS_EXPOSE_HEADERS = ["Retry-After", "Idempotent-Replayed"]
 
 os.environ.setdefault("GRPC_VERBOSITY", "NONE")
 os.environ.setdefault("GRPC_PYTHON_LOG_LEVEL", "CRITICAL")
 os.environ.setdefault("GRPC_TRACE", "")
+# gemini | dialogflow | local | fake | cascade (NLU_CASCADE_FAST primeiro, Gemini abaixo da confiança mínima)
 NLU_PROVIDER = os.getenv("NLU_PROVIDER", "dialogflow")
+NLU_CASCADE_FAST = os.getenv("NLU_CASCADE_FAST", "local")
+NLU_CASCADE_MIN_CONFIDENCE = float(os.getenv("NLU_CASCADE_MIN_CONFIDENCE", "0.8"))
+# Fração das respostas confiantes da cascata reclassificadas pelo Gemini em background (métrica de concordância)
+NLU_SHADOW_RATE = float(os.getenv("NLU_SHADOW_RATE", "0.05"))
 DIALOGFLOW_PROJECT_ID = os.getenv("DIALOGFLOW_PROJECT_ID", "educational-ai-chatbot-backend")
 DIALOGFLOW_LANGUAGE_CODE = os.getenv("DIALOGFLOW_LANGUAGE_CODE", "pt-BR")
 DIALOGFLOW_TRANSPORT = os.getenv("DIALOGFLOW_TRANSPORT", "rest")
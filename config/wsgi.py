@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+# Fora do Gunicorn (ex.: uvicorn direto) o warmup pode ser feito na importação.
+# Com o config/gunicorn.conf.py NÃO habilite: o warmup roda em cada worker.
+if os.getenv("WARMUP_ON_STARTUP", "").lower() in ("1", "true", "yes", "on"):
+    from educhatbot.runtime import warmup
+
+    warmup()
@@ -1,3 +1,7 @@
 from .ask_controller import AskController
 from .feedback_controller import FeedbackController
-from .session_controller import SessionController
\ No newline at end of file
+from .feedback_metrics_controller import FeedbackMetricsController
+from .health_controller import LivenessController, ReadinessController
+from .metrics_controller import MetricsController
+from .profile_controller import ProfileDownloadController, ProfileListController
+from .session_controller import SessionController
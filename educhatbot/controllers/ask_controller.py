@@ -1,13 +1,20 @@
+import math
+import time
 from typing import Optional, Dict, Any
 
-from drf_spectacular.utils import extend_schema
 from rest_framework import status
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import BrowsableAPIRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from ..serializers import AskSerializer, BotMessageSerializer
-from ..services import ChatbotService
+from ..core import OverloadedError, client_deadline, metrics
+from ..core.schema import extend_schema
+from ..runtime import get_chatbot_service, get_idempotency_service, get_rate_limit_service
+from ..services.idempotency_service import IDEMPOTENCY_KEY_MAX_LENGTH, IdempotencyConflict, fingerprint
+from ..serializers import (
+    AskSerializer, BotMessageSerializer, ChatJSONParser, ChatJSONRenderer, bot_message, parse_ask_request
+)
 
 
 @extend_schema(
@@ -19,50 +26,106 @@ from ..services import ChatbotService
 )
 class AskController(APIView):
     permission_classes = [AllowAny]
+    # Caminho enxuto: sem conversão recursiva camelCase e sem DRF Serializer no hot path
+    parser_classes = [ChatJSONParser]
+    renderer_classes = [ChatJSONRenderer, BrowsableAPIRenderer]
 
     def __init__(self):
-        self.chatbot_service = ChatbotService()
+        self.chatbot_service = get_chatbot_service()
+        self.rate_limit_service = get_rate_limit_service()
+        self.idempotency_service = get_idempotency_service()
 
     def post(self, request):
-        serializer = AskSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
+        ask = parse_ask_request(request.data)
 
-        session_id = serializer.data.get('session_id')
-        user_text = serializer.validated_data.get('text')
-        simplify = serializer.validated_data.get('simplify', False)
-        last_messages = serializer.validated_data.get('last_messages', [])
+        session_id = ask.session_id
+        user_text = ask.text
+        simplify = ask.simplify
+        last_messages = ask.last_messages
 
         if not user_text:
             return self._build_response("Não entendi. Pode escrever novamente?", "desconhecido")
 
-        try:
-            result = self.chatbot_service.get_response(
-                user_input=user_text,
-                session_id=session_id,
-                simplify=simplify,
-                last_messages=last_messages
+        # Idempotency-Key opcional: retentativas do app reaproveitam a primeira execução
+        idempotency_key = (request.headers.get("Idempotency-Key") or "").strip()
+        if len(idempotency_key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return Response({"idempotencyKey": [f"Ensure this field has no more than "
+                                                f"{IDEMPOTENCY_KEY_MAX_LENGTH} characters."]},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if idempotency_key:
+            idempotency_key = f"{session_id}:{idempotency_key}"
+            request_fingerprint = fingerprint(user_text, simplify, ask.channel)
+
+        # Retentativas de uma chave já conhecida não gastam o limite de taxa
+        if idempotency_key and self.idempotency_service.known(idempotency_key):
+            retry_after = None
+        else:
+            retry_after = self.rate_limit_service.check(session_id)
+        if retry_after is not None:
+            metrics.inc("chat_requests_total", labels={"outcome": "rate_limited", "channel": "http"})
+            response = self._build_response(
+                "Você enviou muitas mensagens seguidas. Aguarde alguns segundos e tente de novo.",
+                "limite_excedido", feedback_enabled=False
             )
+            response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+            return response
+
+        start = time.perf_counter()
+        try:
+            def answer():
+                return self.chatbot_service.get_response(
+                    user_input=user_text,
+                    session_id=session_id,
+                    simplify=simplify,
+                    last_messages=last_messages,
+                    channel=ask.channel,
+                    # Prazo opcional do cliente (ex.: o timeout do app), nunca maior que o padrão
+                    deadline_secs=client_deadline(request.headers.get("X-Deadline-Ms"))
+                )
 
-            reply_text = result.get("answer", "") if isinstance(result, dict) else str(result)
-            intent = result.get("intent", "generativo") if isinstance(result, dict) else "generativo"
+            replayed = False
+            if idempotency_key:
+                # Respostas degradadas (prazo esgotado) não são guardadas: a retentativa tenta de novo
+                result, origin = self.idempotency_service.execute(
+                    idempotency_key, request_fingerprint, answer,
+                    cacheable=lambda r: not (isinstance(r, dict) and r.get("intent") == "resposta_degradada"))
+                replayed = origin != "new"
+            else:
+                result = answer()
 
-            return self._build_response(reply_text, intent, feedback_enabled=(user_text != "Olá"))
+            metrics.inc("chat_requests_total", labels={"outcome": "replayed" if replayed else "ok", "channel": "http"})
+            return self._result_response(result, user_text, replayed)
+
+        except IdempotencyConflict as e:
+            return Response({"detail": str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        except OverloadedError:
+            # Load shedding: resposta rápida e determinística, sem tocar no LLM
+            metrics.inc("chat_requests_total", labels={"outcome": "shed", "channel": "http"})
+            response = self._build_response(
+                "Estou atendendo muitas pessoas agora. Pode tentar de novo em instantes?",
+                "sobrecarga", feedback_enabled=False
+            )
+            response["Retry-After"] = "2"
+            return response
 
         except Exception as e:
             print(f"Erro no controller: {e}")
+            metrics.inc("chat_requests_total", labels={"outcome": "error", "channel": "http"})
             return self._build_response("Ops, tive um erro por aqui. Pode tentar de novo?", "erro")
 
+        finally:
+            metrics.observe("chat_latency_ms", (time.perf_counter() - start) * 1000, {"channel": "http"})
+
+    def _result_response(self, result, user_text: str, replayed: bool = False):
+        reply_text = result.get("answer", "") if isinstance(result, dict) else str(result)
+        intent = result.get("intent", "generativo") if isinstance(result, dict) else "generativo"
+        response = self._build_response(reply_text, intent, feedback_enabled=(user_text != "Olá"))
+        if replayed:
+            response["Idempotent-Replayed"] = "true"
+        return response
+
     @staticmethod
     def _build_response(text: str, intent: str, feedback_enabled: bool = True):
         """Método auxiliar privado apenas para formatar o JSON de saída"""
-        out_serializer = BotMessageSerializer(
-            data={
-                'id': 1,
-                'role': 'bot',
-                'text': text,
-                'feedback_enabled': feedback_enabled,
-                'detected_intent': intent,
-            }
-        )
-        out_serializer.is_valid(raise_exception=True)
-        return Response(out_serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(bot_message(text, intent, feedback_enabled), status=status.HTTP_200_OK)
\ No newline at end of file
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict
+from urllib.parse import parse_qs
+
+from django.db import close_old_connections
+
+from ..core import OverloadedError, SessionState, _env, client_deadline, metrics, normalize_channel
+from ..models import Feedback
+from ..runtime import get_chatbot_service, get_rate_limit_service
+from ..serializers.chat_fast_serializer import TEXT_MAX_LENGTH, bot_message, dumps, loads
+
+logger = logging.getLogger(__name__)
+
+# Threads que executam os turnos (o pipeline é síncrono: banco, httpx, SDK do LLM)
+CHAT_SOCKET_WORKERS = _env("CHAT_SOCKET_WORKERS", 32, int)
+
+_TRUE = (True, 1, "1", "true", "True")
+
+
+class ChatSocketController:
+    """
+    Canal de chat por WebSocket (ASGI puro, roteado em config/asgi.py).
+
+    O contexto da sessão (histórico, turnos, feedback negativo pendente) fica na memória da
+    conexão: cada mensagem leva só o texto, e o banco é consultado uma vez, na abertura.
+    Protocolo, em frames de texto JSON:
+
+        -> {"type": "message", "text": "...", "simplify": false, "deadlineMs": 8000}
+        <- {"type": "chunk", "messageId": 3, "text": "..."}      (respostas generativas, em streaming)
+        <- {"type": "message", "id": 3, "role": "bot", "text": "...", ...}   (mesmo corpo do /api/chat)
+        -> {"type": "feedback", "messageId": 3, "helpful": false}
+        <- {"type": "feedback", "messageId": 3, "id": 812, "helpful": false}
+
+    O id da sessão vem da query (?sessionId=42) ou é criado na conexão e enviado em
+    {"type": "session", "sessionId": 42}. `?channel=tts` (ou libras) encurta as respostas generativas.
+    """
+
+    def __init__(self, max_workers: int = CHAT_SOCKET_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chat-ws")
+        self._connections = 0
+
+    async def __call__(self, scope, receive, send):
+        event = await receive()
+        if event["type"] != "websocket.connect":
+            return
+
+        loop = asyncio.get_running_loop()
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        channel = normalize_channel((query.get("channel") or ["ws"])[0])
+        try:
+            state = await loop.run_in_executor(self._executor, self._open_session, query)
+        except Exception as e:
+            logger.warning(f"Falha ao abrir sessão do WebSocket: {e}")
+            await send({"type": "websocket.close", "code": 1011})
+            return
+
+        await send({"type": "websocket.accept"})
+        self._connections += 1
+        metrics.set_gauge("chat_socket_connections", self._connections)
+        metrics.inc("chat_socket_connections_total")
+        try:
+            await self._send(send, {"type": "session", "sessionId": state.session_id})
+            while True:
+                event = await receive()
+                if event["type"] == "websocket.disconnect":
+                    break
+                if event["type"] != "websocket.receive":
+                    continue
+                try:
+                    data = loads(event.get("text") or event.get("bytes") or b"")
+                except ValueError:
+                    await self._send(send, {"type": "error", "detail": "JSON inválido."})
+                    continue
+                if not isinstance(data, dict):
+                    await self._send(send, {"type": "error", "detail": "Esperado um objeto JSON."})
+                    continue
+
+                kind = data.get("type")
+                if kind == "message":
+                    await self._handle_message(send, state, data, channel)
+                elif kind == "feedback":
+                    await self._send(send, await loop.run_in_executor(self._executor, self._submit_feedback,
+                                                                      state, data))
+                elif kind == "ping":
+                    await self._send(send, {"type": "pong"})
+                else:
+                    await self._send(send, {"type": "error", "detail": f"Tipo de mensagem desconhecido: {kind}"})
+        finally:
+            self._connections -= 1
+            metrics.set_gauge("chat_socket_connections", self._connections)
+
+    @staticmethod
+    async def _send(send, payload: Dict[str, Any]):
+        await send({"type": "websocket.send", "text": dumps(payload).decode("utf-8")})
+
+    async def _handle_message(self, send, state: SessionState, data: Dict[str, Any], channel: str):
+        text = str(data.get("text") or "").strip()
+        if len(text) > TEXT_MAX_LENGTH:
+            await self._send(send, {"type": "error",
+                                    "detail": f"Ensure this field has no more than {TEXT_MAX_LENGTH} characters."})
+            return
+
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        message_id = state.next_message_id
+
+        def on_chunk(chunk: str):
+            loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+
+        start = time.perf_counter()
+        future = loop.run_in_executor(self._executor, self._run_turn, state, text,
+                                      data.get("simplify", False) in _TRUE, on_chunk,
+                                      client_deadline(data.get("deadlineMs")), channel)
+        # Os pedaços chegam pela mesma fila do loop, antes do aviso de fim do turno
+        future.add_done_callback(lambda _: chunks.put_nowait(None))
+        first_chunk = True
+        while (chunk := await chunks.get()) is not None:
+            if first_chunk:
+                metrics.observe("chat_socket_first_chunk_ms", (time.perf_counter() - start) * 1000)
+                first_chunk = False
+            await self._send(send, {"type": "chunk", "messageId": message_id, "text": chunk})
+
+        payload = await future
+        metrics.observe("chat_latency_ms", (time.perf_counter() - start) * 1000, {"channel": "ws"})
+        await self._send(send, {"type": "message", **payload})
+
+    def _open_session(self, query: Dict[str, list]) -> SessionState:
+        """Cria o estado da conexão; o feedback da sessão é lido do banco só aqui."""
+        close_old_connections()
+        try:
+            raw_id = (query.get("sessionId") or query.get("session_id") or [""])[0]
+            feedback_service = get_chatbot_service().feedback_service
+            if raw_id.strip().lstrip("-").isdigit():
+                state = SessionState(int(raw_id))
+                state.pending_negative = feedback_service.get_last_unconsumed_negative(state.session_id)
+                state.needs_simplify = feedback_service.session_needs_simplify(state.session_id)
+            else:
+                state = SessionState(feedback_service.get_next_session_id())
+            return state
+        finally:
+            close_old_connections()
+
+    def _run_turn(self, state: SessionState, text: str, simplify: bool, on_chunk,
+                  deadline_secs: float | None = None, channel: str | None = None) -> Dict[str, Any]:
+        """Executa um turno (em thread), com as mesmas respostas de erro do /api/chat."""
+        labels = {"channel": "ws"}
+        if not text:
+            return bot_message("Não entendi. Pode escrever novamente?", "desconhecido", message_id=0)
+
+        retry_after = get_rate_limit_service().check(state.session_id)
+        if retry_after is not None:
+            metrics.inc("chat_requests_total", labels={"outcome": "rate_limited", **labels})
+            payload = bot_message("Você enviou muitas mensagens seguidas. Aguarde alguns segundos e tente de novo.",
+                                  "limite_excedido", feedback_enabled=False, message_id=0)
+            return {**payload, "retryAfter": max(1, math.ceil(retry_after))}
+
+        close_old_connections()
+        try:
+            result = get_chatbot_service().get_response(
+                user_input=text, session_id=state.session_id, simplify=simplify, state=state, on_chunk=on_chunk,
+                deadline_secs=deadline_secs, channel=channel
+            )
+        except OverloadedError:
+            metrics.inc("chat_requests_total", labels={"outcome": "shed", **labels})
+            payload = bot_message("Estou atendendo muitas pessoas agora. Pode tentar de novo em instantes?",
+                                  "sobrecarga", feedback_enabled=False, message_id=0)
+            return {**payload, "retryAfter": 2}
+        except Exception as e:
+            logger.exception(f"Erro no turno do WebSocket: {e}")
+            metrics.inc("chat_requests_total", labels={"outcome": "error", **labels})
+            return bot_message("Ops, tive um erro por aqui. Pode tentar de novo?", "erro", message_id=0)
+        finally:
+            close_old_connections()
+
+        reply_text = result.get("answer", "") if isinstance(result, dict) else str(result)
+        intent = result.get("intent", "generativo") if isinstance(result, dict) else "generativo"
+        turn = state.add_turn(text, reply_text, intent)
+        metrics.inc("chat_requests_total", labels={"outcome": "ok", **labels})
+        return bot_message(reply_text, intent, feedback_enabled=(text != "Olá"), message_id=turn.message_id)
+
+    def _submit_feedback(self, state: SessionState, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Feedback de um turno desta conexão: pergunta e resposta vêm do estado, não do cliente."""
+        turn = state.turns.get(data.get("messageId"))
+        helpful = data.get("helpful")
+        if turn is None:
+            return {"type": "error", "detail": "messageId desconhecido nesta conexão."}
+        if helpful is not None and not isinstance(helpful, bool):
+            return {"type": "error", "detail": "helpful deve ser true, false ou null."}
+
+        close_old_connections()
+        try:
+            feedback = get_chatbot_service().feedback_service.submit_feedback(
+                turn.feedback_id, state.session_id, turn.question, turn.answer, helpful, turn.intent
+            )
+        except Feedback.DoesNotExist:
+            return {"type": "error", "detail": "Feedback não encontrado."}
+        finally:
+            close_old_connections()
+        turn.feedback_id = feedback.id
+        state.record_feedback(feedback, helpful)
+        metrics.inc("chat_socket_feedback_total", labels={"helpful": str(helpful).lower()})
+        return {"type": "feedback", "messageId": turn.message_id, "id": feedback.id, "helpful": helpful}
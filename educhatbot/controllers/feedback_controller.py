@@ -1,7 +1,9 @@
-from drf_spectacular.utils import extend_schema
+from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from ..core.schema import extend_schema
+from ..models import Feedback
 from ..serializers import FeedbackRequestSerializer, FeedbackResponseSerializer
 from ..services import FeedbackService
 
@@ -29,14 +31,18 @@ class FeedbackController(APIView):
 
         data = serializer.validated_data
 
-        saved_feedback = self.service.submit_feedback(
-            data.get("id", None),
-            data.get("session_id"),
-            data.get("user_question"),
-            data.get("bot_answer"),
-            data.get("helpful", None),
-            data.get("detected_intent", None)
-        )
+        try:
+            saved_feedback = self.service.submit_feedback(
+                data.get("id", None),
+                data.get("session_id"),
+                data.get("user_question"),
+                data.get("bot_answer"),
+                data.get("helpful", None),
+                data.get("detected_intent", None)
+            )
+        except Feedback.DoesNotExist:
+            # Id inexistente ou ainda na fila do write-behind de outro worker (gravado em instantes)
+            return Response({"detail": "Feedback não encontrado."}, status=status.HTTP_404_NOT_FOUND)
 
         serializer = FeedbackResponseSerializer(saved_feedback)
         return Response(serializer.data)
@@ -0,0 +1,28 @@
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..core.schema import extend_schema
+from ..runtime import get_feedback_rollup_service
+from ..serializers import FeedbackMetricsQuerySerializer
+
+
+@extend_schema(
+    auth=None,
+    summary="Métricas agregadas de feedback",
+    description="Úteis, não úteis e sem avaliação por intent, caminho da resposta ou tamanho da sessão, "
+                "por hora ou dia. Lê só os agregados (comando rollup_feedback), não a tabela de feedbacks."
+)
+class FeedbackMetricsController(APIView):
+
+    @extend_schema(parameters=[FeedbackMetricsQuerySerializer])
+    def get(self, request):
+        params = request.query_params
+        serializer = FeedbackMetricsQuerySerializer(data={
+            **{k: params.get(k) for k in ("dimension", "granularity", "since", "until") if params.get(k)},
+            "key": params.getlist("key"),
+        })
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        return Response(get_feedback_rollup_service().summary(
+            data["dimension"], data["granularity"], data.get("since"), data.get("until"), data["key"]
+        ))
@@ -0,0 +1,33 @@
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .. import runtime
+from ..core.schema import extend_schema
+
+
+@extend_schema(
+    auth=None,
+    summary="Liveness do processo",
+    description="Retorna 200 enquanto o processo estiver respondendo."
+)
+class LivenessController(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        return Response({"alive": True})
+
+
+@extend_schema(
+    auth=None,
+    summary="Readiness do worker",
+    description="Retorna 200 somente após o warmup (serviços construídos e caches carregados); caso contrário 503."
+)
+class ReadinessController(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        report = runtime.readiness_report()
+        code = status.HTTP_200_OK if report["ready"] else status.HTTP_503_SERVICE_UNAVAILABLE
+        return Response(report, status=code)
@@ -0,0 +1,21 @@
+from django.http import HttpResponse
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..core import metrics
+from ..core.schema import extend_schema
+
+
+@extend_schema(
+    auth=None,
+    summary="Métricas do worker",
+    description="Exporta as métricas em memória do processo (texto do Prometheus; use ?format=json para JSON)."
+)
+class MetricsController(APIView):
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        if request.query_params.get("format") == "json":
+            return Response(metrics.snapshot())
+        return HttpResponse(metrics.render_prometheus(), content_type="text/plain; version=0.0.4")
@@ -0,0 +1,38 @@
+from django.http import FileResponse, Http404
+from rest_framework.permissions import BasePermission, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..core.profiling import ProfileStore
+from ..core.schema import extend_schema
+from ..middleware import has_profiling_secret
+
+
+class HasProfilingSecret(BasePermission):
+    def has_permission(self, request, view):
+        return has_profiling_secret(request)
+
+
+@extend_schema(
+    summary="Artefatos de profiling",
+    description="Lista os profilings gravados (admin ou cabeçalho X-Profile com o segredo)."
+)
+class ProfileListController(APIView):
+    permission_classes = [IsAdminUser | HasProfilingSecret]
+
+    def get(self, request):
+        return Response({"profiles": ProfileStore().list()})
+
+
+@extend_schema(
+    summary="Download de artefato de profiling",
+    description="Baixa um arquivo (.json, .pstats ou .folded) de um profiling gravado."
+)
+class ProfileDownloadController(APIView):
+    permission_classes = [IsAdminUser | HasProfilingSecret]
+
+    def get(self, request, name: str):
+        path = ProfileStore().path_for(name)
+        if path is None:
+            raise Http404("Artefato não encontrado.")
+        return FileResponse(path.open("rb"), as_attachment=True, filename=path.name)
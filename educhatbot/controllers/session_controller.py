@@ -1,7 +1,7 @@
-from drf_spectacular.utils import extend_schema
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from ..core.schema import extend_schema
 from ..serializers import SessionResponseSerializer
 from ..services import FeedbackService
 
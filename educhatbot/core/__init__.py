@@ -1,2 +1,18 @@
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .concurrency_limiter import ConcurrencyLimiter, OverloadedError
+from .deadline import (
+    CHAT_DEADLINE_MAX_SECS, CHAT_DEADLINE_SECS, DeadlineExceeded, check_deadline, client_deadline, current_deadline, deadline_scope
+)
 from .env import _env
-from .http_client_service import HttpClientService
\ No newline at end of file
+from .http_client_service import HttpClientService
+from .llm_backend import (
+    AdmissionControlledBackend, FakeLLMBackend, GeminiBackend, GeneratedText, LLMBackend, get_llm_backend
+)
+from .llm_router import LatencyTracker, ModelRouter, RouteDecision, get_model_router
+from .metrics import metrics
+from .output_budget import channel_scope, current_channel, estimate_tokens, normalize_channel, output_budget
+from .periodic_task import PeriodicTask
+from .rate_limiter import KeyedRateLimiter, TokenBucket
+from .session_state import Continuation, SessionState, SessionStateCache, Turn
+from .text import normalize_question, question_signature
+from .write_behind_queue import WriteBehindQueue
@@ -0,0 +1,81 @@
+import threading
+import time
+
+from .metrics import metrics
+
+_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpenError(Exception):
+    """Circuito aberto: a dependência falhou seguidamente e as chamadas estão suspensas."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuito '{name}' aberto (nova tentativa em {retry_in:.1f}s)")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Disjuntor clássico: após `failure_threshold` falhas seguidas o circuito abre e as chamadas
+    falham na hora por `reset_timeout` segundos; depois uma chamada de teste (half-open)
+    decide se fecha de novo ou volta a abrir.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._publish()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def _publish(self):
+        metrics.set_gauge("circuit_state", _STATE_VALUES[self._state], {"circuit": self.name})
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            metrics.inc("circuit_transitions_total", labels={"circuit": self.name, "to": state})
+        self._state = state
+        self._publish()
+
+    def before_call(self):
+        """Lança CircuitOpenError se a chamada não deve seguir."""
+        with self._lock:
+            if self._state == "closed":
+                return
+            elapsed = time.monotonic() - self._opened_at
+            if self._state == "open" and elapsed >= self.reset_timeout:
+                self._set_state("half_open")
+            if self._state == "half_open" and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return
+            metrics.inc("circuit_rejected_total", labels={"circuit": self.name})
+            raise CircuitOpenError(self.name, max(0.0, self.reset_timeout - elapsed))
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probe_in_flight = False
+            self._set_state("closed")
+
+    def release(self):
+        """A chamada terminou sem veredito (ex.: prazo da requisição): libera a de teste, sem mudar o estado."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._set_state("open")
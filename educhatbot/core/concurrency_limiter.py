@@ -0,0 +1,74 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from .metrics import metrics
+
+
+class OverloadedError(Exception):
+    """Fila de admissão cheia ou tempo de espera esgotado."""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Sobrecarga: {reason}")
+        self.reason = reason
+
+
+class ConcurrencyLimiter:
+    """
+    Semáforo limitado com fila: no máximo `max_concurrent` execuções simultâneas,
+    no máximo `max_queue` aguardando. Com a fila cheia a chamada é rejeitada na hora
+    (load shedding); quem espera mais que `timeout` segundos também é rejeitado.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, timeout: float):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._waiting = 0
+
+    def _publish(self):
+        metrics.set_gauge("admission_in_flight", self._in_flight, {"limiter": self.name})
+        metrics.set_gauge("admission_queue_depth", self._waiting, {"limiter": self.name})
+
+    def acquire(self, timeout: float | None = None):
+        timeout = self.timeout if timeout is None else timeout
+        start = time.monotonic()
+        with self._cond:
+            if self._in_flight >= self.max_concurrent:
+                if self._waiting >= self.max_queue:
+                    metrics.inc("admission_rejected_total", labels={"limiter": self.name, "reason": "queue_full"})
+                    raise OverloadedError("queue_full")
+
+                self._waiting += 1
+                self._publish()
+                try:
+                    deadline = start + timeout
+                    while self._in_flight >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            metrics.inc("admission_rejected_total", labels={"limiter": self.name, "reason": "timeout"})
+                            raise OverloadedError("timeout")
+                        self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+            self._in_flight += 1
+            self._publish()
+        metrics.observe("admission_wait_ms", (time.monotonic() - start) * 1000, {"limiter": self.name})
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._publish()
+            self._cond.notify()
+
+    @contextmanager
+    def slot(self, timeout: float | None = None):
+        self.acquire(timeout)
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,77 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from .env import _env
+
+# Prazo total de um turno do chat; o cliente pode pedir menos, nunca mais que ele (nem que o máximo)
+CHAT_DEADLINE_SECS = _env("CHAT_DEADLINE_SECS", 20.0, float)
+CHAT_DEADLINE_MIN_SECS = _env("CHAT_DEADLINE_MIN_SECS", 1.0, float)
+CHAT_DEADLINE_MAX_SECS = _env("CHAT_DEADLINE_MAX_SECS", 30.0, float)
+
+
+class DeadlineExceeded(Exception):
+    """O prazo da requisição acabou; `stage` é a etapa que não coube no tempo restante."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Prazo esgotado na etapa '{stage}'")
+        self.stage = stage
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, default: Optional[float] = None) -> float:
+        """Timeout de uma etapa: o seu próprio limite, cortado pelo que resta do prazo."""
+        remaining = self.remaining()
+        return remaining if default is None else min(default, remaining)
+
+    def check(self, stage: str):
+        if self.expired:
+            raise DeadlineExceeded(stage)
+
+
+# Propaga para as threads que usam contextvars.copy_context() (hedging, especulação)
+_current: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def check_deadline(stage: str):
+    deadline = _current.get()
+    if deadline is not None:
+        deadline.check(stage)
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """Define o prazo do trecho; None ou <= 0 deixa sem prazo."""
+    deadline = Deadline(seconds) if seconds and seconds > 0 else None
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def client_deadline(raw_ms) -> Optional[float]:
+    """Prazo pedido pelo cliente (ms), entre CHAT_DEADLINE_MIN_SECS e o prazo padrão (CHAT_DEADLINE_SECS/_MAX_SECS)."""
+    try:
+        seconds = float(raw_ms) / 1000
+    except (TypeError, ValueError):
+        return None
+    if seconds != seconds or seconds <= 0:  # NaN ou não positivo
+        return None
+    return min(max(seconds, CHAT_DEADLINE_MIN_SECS), CHAT_DEADLINE_SECS, CHAT_DEADLINE_MAX_SECS)
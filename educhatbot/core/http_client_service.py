@@ -2,25 +2,75 @@ import time
 import httpx
 from typing import Dict, Any, Optional
 
+from .circuit_breaker import CircuitBreaker
+from .deadline import DeadlineExceeded, current_deadline
+
 class HttpClientService:
-    def __init__(self, base_url: str, timeout: float = 6.0, retries: int = 3):
+    def __init__(self, base_url: str, timeout: float = 6.0, retries: int = 3,
+                 breaker: Optional[CircuitBreaker] = None):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         self.retries = retries
+        # Opcional: falhas de conexão e 5xx contam para o disjuntor; aberto, falha sem tentar
+        self.breaker = breaker
         self._client = httpx.Client(base_url=self.base_url, timeout=self.timeout)
 
     def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
-        last_exc = None
-        for attempt in range(1, self.retries + 1):
-            try:
-                return self._client.request(method, url, **kwargs)
-            except (httpx.ConnectError, httpx.ReadTimeout, httpx.RemoteProtocolError) as exc:
-                last_exc = exc
-                time.sleep(0.2 * (2 ** (attempt - 1)))
-        raise last_exc
+        # Com prazo na requisição, cada tentativa usa só o tempo que resta dele
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check("content_api")
+        if self.breaker is not None:
+            self.breaker.before_call()
+        # Veredito para o disjuntor; None (prazo nosso, erro inesperado) só libera a chamada de teste
+        outcome = None
+        try:
+            last_exc = None
+            for attempt in range(1, self.retries + 1):
+                timeout = self.timeout if deadline is None else deadline.timeout(self.timeout)
+                try:
+                    resp = self._client.request(method, url, timeout=timeout, **kwargs)
+                except httpx.TransportError as exc:
+                    last_exc = exc
+                    backoff = 0.2 * (2 ** (attempt - 1))
+                    if deadline is not None and deadline.remaining() <= backoff:
+                        # Não dá tempo de outra tentativa; o timeout foi nosso, não conta para o disjuntor
+                        raise DeadlineExceeded("content_api") from exc
+                    if attempt < self.retries:
+                        time.sleep(backoff)
+                    continue
+                outcome = "failure" if resp.status_code >= 500 else "success"
+                return resp
+            outcome = "failure"
+            raise last_exc
+        finally:
+            if self.breaker is not None:
+                if outcome == "success":
+                    self.breaker.record_success()
+                elif outcome == "failure":
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release()
 
     def get(self, path: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None):
         return self._request("GET", path, params=params, headers=headers)
 
+    def get_conditional(self, path: str, params: Optional[Dict[str, Any]] = None, etag: Optional[str] = None,
+                        last_modified: Optional[str] = None, headers: Optional[Dict[str, str]] = None):
+        """
+        GET condicional com os validadores da cópia local (If-None-Match / If-Modified-Since).
+        Um 304 significa que a cópia continua valendo; o corpo não é reenviado.
+        """
+        conditional = dict(headers or {})
+        if etag:
+            conditional["If-None-Match"] = etag
+        if last_modified:
+            conditional["If-Modified-Since"] = last_modified
+        return self.get(path, params=params, headers=conditional or None)
+
+    @staticmethod
+    def validators(resp: httpx.Response) -> Dict[str, Optional[str]]:
+        return {"etag": resp.headers.get("ETag"), "last_modified": resp.headers.get("Last-Modified")}
+
     def post(self, path: str, json: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None):
         return self._request("POST", path, json=json, headers=headers)
@@ -0,0 +1,293 @@
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Union
+
+from .concurrency_limiter import ConcurrencyLimiter, OverloadedError
+from .deadline import DeadlineExceeded, current_deadline
+from .env import _env
+from .metrics import metrics
+
+# Admissão das chamadas ao LLM: protege a cota do provedor contra rajadas.
+LLM_MAX_CONCURRENCY = _env("LLM_MAX_CONCURRENCY", 8, int)
+LLM_MAX_QUEUE = _env("LLM_MAX_QUEUE", 32, int)
+LLM_QUEUE_TIMEOUT_SECS = _env("LLM_QUEUE_TIMEOUT_SECS", 5.0, float)
+# Latência simulada do LLM_PROVIDER=fake (testes locais e de carga): fixa + por token de saída
+LLM_FAKE_LATENCY_MS = _env("LLM_FAKE_LATENCY_MS", 0.0, float)
+LLM_FAKE_MS_PER_TOKEN = _env("LLM_FAKE_MS_PER_TOKEN", 0.0, float)
+
+
+class GeneratedText(str):
+    """
+    Texto gerado com os metadados da geração; para o resto do código continua sendo uma str.
+    `truncated`: a geração parou no max_output_tokens; `output_tokens`: contagem do provedor, se houver.
+    """
+
+    truncated: bool = False
+    output_tokens: Optional[int] = None
+
+    def __new__(cls, text: str, truncated: bool = False, output_tokens: Optional[int] = None):
+        obj = super().__new__(cls, text)
+        obj.truncated = truncated
+        obj.output_tokens = output_tokens
+        return obj
+
+
+class LLMBackend(ABC):
+    """
+    Fronteira entre os serviços e o SDK do provedor de LLM.
+    Os SDKs pesados só são importados aqui, na primeira chamada real.
+    """
+
+    @abstractmethod
+    def generate(self, prompt: str, model: str, generation_config: Optional[Dict[str, Any]] = None,
+                 system_instruction: Optional[str] = None) -> str:
+        """Texto completo da resposta do modelo."""
+
+    def generate_stream(self, prompt: str, model: str, generation_config: Optional[Dict[str, Any]] = None,
+                        system_instruction: Optional[str] = None) -> Iterator[str]:
+        """Texto em pedaços, à medida que o modelo gera. Por padrão, um único pedaço."""
+        yield self.generate(prompt, model, generation_config, system_instruction)
+
+    def warmup(self) -> None:
+        """Carrega o SDK antecipadamente (preload/warmup). Sem efeito por padrão."""
+
+
+class GeminiBackend(LLMBackend):
+    def __init__(self, api_key: str):
+        if not api_key:
+            raise ValueError("A chave GEMINI_API_KEY não foi encontrada. Verifique seu arquivo .env")
+        self._api_key = api_key
+        self._genai = None
+        self._models: Dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _sdk(self):
+        if self._genai is None:
+            with self._lock:
+                if self._genai is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self._api_key)
+                    self._genai = genai
+        return self._genai
+
+    def warmup(self) -> None:
+        self._sdk()
+
+    def _get_model(self, model: str, generation_config: Optional[Dict[str, Any]], system_instruction: Optional[str]):
+        key = (model, tuple(sorted((generation_config or {}).items())), system_instruction)
+        cached = self._models.get(key)
+        if cached is None:
+            genai = self._sdk()
+            cached = genai.GenerativeModel(
+                model,
+                generation_config=generation_config,
+                system_instruction=system_instruction,
+            )
+            self._models[key] = cached
+        return cached
+
+    def generate(self, prompt: str, model: str, generation_config: Optional[Dict[str, Any]] = None,
+                 system_instruction: Optional[str] = None) -> str:
+        response = self._get_model(model, generation_config, system_instruction).generate_content(
+            prompt, request_options=self._request_options())
+        return GeneratedText(response.text, self._hit_token_limit(response), self._output_tokens(response))
+
+    @staticmethod
+    def _hit_token_limit(response) -> bool:
+        try:
+            reason = response.candidates[0].finish_reason
+        except (AttributeError, IndexError, TypeError):
+            return False
+        return getattr(reason, "name", str(reason)) == "MAX_TOKENS" or reason == 2
+
+    @staticmethod
+    def _output_tokens(response) -> Optional[int]:
+        usage = getattr(response, "usage_metadata", None)
+        return getattr(usage, "candidates_token_count", None) or None
+
+    @staticmethod
+    def _request_options() -> Optional[Dict[str, Any]]:
+        # O SDK cancela a chamada HTTP quando o prazo da requisição acaba
+        deadline = current_deadline()
+        return {"timeout": max(0.1, deadline.remaining())} if deadline is not None else None
+
+    def generate_stream(self, prompt: str, model: str, generation_config: Optional[Dict[str, Any]] = None,
+                        system_instruction: Optional[str] = None) -> Iterator[str]:
+        response = self._get_model(model, generation_config, system_instruction).generate_content(
+            prompt, stream=True, request_options=self._request_options())
+        for chunk in response:
+            # O motivo de parada e a contagem de tokens vêm no último pedaço (às vezes sem texto)
+            truncated = self._hit_token_limit(chunk)
+            text = chunk.text if chunk.parts else ""
+            if text or truncated:
+                yield GeneratedText(text, truncated, self._output_tokens(chunk))
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Backend local, sem rede, para testes, desenvolvimento e testes de carga.
+
+    `responder(prompt, model, generation_config, system_instruction)` define o texto devolvido;
+    sem ele, pedidos com saída JSON recebem uma intent "desconhecido" e os demais um texto fixo.
+    `latency_ms` é um valor único ou um dict por modelo (chave "*" como padrão); `ms_per_token`
+    soma latência por palavra gerada. O `max_output_tokens` do generation_config corta a resposta
+    (uma palavra = um token), como o provedor faria.
+    """
+
+    DEFAULT_JSON = '{"intent": "desconhecido", "entities": {}}'
+    DEFAULT_TEXT = "Resposta simulada."
+
+    def __init__(self, responder: Optional[Callable[..., str]] = None,
+                 latency_ms: Union[float, Dict[str, float]] = 0.0, ms_per_token: float = 0.0):
+        self.responder = responder
+        self.latency_ms = latency_ms
+        self.ms_per_token = ms_per_token
+        self.calls = 0
+        self.prompt_chars = 0  # aproximação do custo em tokens de entrada
+        self.recent: deque = deque(maxlen=100)  # (modelo, prompt) das últimas chamadas
+        self._lock = threading.Lock()
+
+    def _delay(self, model: str) -> float:
+        if isinstance(self.latency_ms, dict):
+            return self.latency_ms.get(model, self.latency_ms.get("*", 0.0))
+        return self.latency_ms
+
+    def generate(self, prompt: str, model: str, generation_config: Optional[Dict[str, Any]] = None,
+                 system_instruction: Optional[str] = None) -> str:
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            self.recent.append((model, prompt))
+        text = self._respond(prompt, model, generation_config, system_instruction)
+        self._sleep((self._delay(model) + self.ms_per_token * (text.output_tokens or 0)) / 1000)
+        return text
+
+    @staticmethod
+    def _sleep(seconds: float):
+        """Simula a latência; com prazo na requisição, estoura como o timeout do SDK."""
+        if not seconds:
+            return
+        deadline = current_deadline()
+        if deadline is not None and deadline.remaining() < seconds:
+            time.sleep(deadline.remaining())
+            raise TimeoutError("prazo da requisição esgotado")
+        time.sleep(seconds)
+
+    def _respond(self, prompt, model, generation_config, system_instruction) -> GeneratedText:
+        config = generation_config or {}
+        if self.responder is not None:
+            text = self.responder(prompt, model, generation_config, system_instruction)
+        elif config.get("response_mime_type") == "application/json":
+            text = self.DEFAULT_JSON
+        else:
+            text = self.DEFAULT_TEXT
+        words = text.split(" ")
+        limit = config.get("max_output_tokens")
+        if limit and len(words) > limit:
+            return GeneratedText(" ".join(words[:limit]), truncated=True, output_tokens=limit)
+        return GeneratedText(text, output_tokens=len(words))
+
+    def generate_stream(self, prompt: str, model: str, generation_config: Optional[Dict[str, Any]] = None,
+                        system_instruction: Optional[str] = None) -> Iterator[str]:
+        """Mesmo texto de generate(), uma palavra por pedaço, com a latência dividida entre elas."""
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            self.recent.append((model, prompt))
+        text = self._respond(prompt, model, generation_config, system_instruction)
+        words = text.split(" ")
+        delay = (self._delay(model) / max(1, len(words)) + self.ms_per_token) / 1000
+        for i, word in enumerate(words):
+            self._sleep(delay)
+            last = i == len(words) - 1
+            yield GeneratedText(word if i == 0 else " " + word, truncated=last and text.truncated,
+                                output_tokens=text.output_tokens if last else None)
+
+
+class AdmissionControlledBackend(LLMBackend):
+    """
+    Envolve outro backend com o semáforo de admissão e publica métricas por modelo.
+    Lança OverloadedError quando a fila está cheia ou a espera estoura o prazo.
+    """
+
+    def __init__(self, inner: LLMBackend, limiter: ConcurrencyLimiter):
+        self.inner = inner
+        self.limiter = limiter
+
+    def _queue_timeout(self) -> Optional[float]:
+        deadline = current_deadline()
+        return None if deadline is None else deadline.timeout(self.limiter.timeout)
+
+    @contextmanager
+    def _slot(self):
+        # Espera na fila até o menor entre o timeout da admissão e o prazo da requisição
+        timeout = self._queue_timeout()
+        try:
+            self.limiter.acquire(timeout)
+        except OverloadedError as e:
+            if e.reason == "timeout" and timeout is not None and timeout < self.limiter.timeout:
+                raise DeadlineExceeded("llm_queue") from e
+            raise
+        try:
+            yield
+        finally:
+            self.limiter.release()
+
+    def generate(self, prompt: str, model: str, generation_config: Optional[Dict[str, Any]] = None,
+                 system_instruction: Optional[str] = None) -> str:
+        with self._slot():
+            start = time.perf_counter()
+            try:
+                text = self.inner.generate(prompt, model, generation_config, system_instruction)
+            except Exception as e:
+                metrics.inc("llm_errors_total", labels={"model": model, "error": type(e).__name__})
+                raise
+            finally:
+                metrics.observe("llm_latency_ms", (time.perf_counter() - start) * 1000, {"model": model})
+        metrics.inc("llm_calls_total", labels={"model": model})
+        return text
+
+    def generate_stream(self, prompt: str, model: str, generation_config: Optional[Dict[str, Any]] = None,
+                        system_instruction: Optional[str] = None) -> Iterator[str]:
+        # A vaga fica ocupada até o último pedaço
+        with self._slot():
+            start = time.perf_counter()
+            try:
+                yield from self.inner.generate_stream(prompt, model, generation_config, system_instruction)
+            except Exception as e:
+                metrics.inc("llm_errors_total", labels={"model": model, "error": type(e).__name__})
+                raise
+            finally:
+                metrics.observe("llm_latency_ms", (time.perf_counter() - start) * 1000, {"model": model})
+        metrics.inc("llm_calls_total", labels={"model": model})
+
+    def warmup(self) -> None:
+        self.inner.warmup()
+
+
+_backend: Optional[LLMBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_llm_backend() -> LLMBackend:
+    """
+    Backend de LLM do processo, escolhido por LLM_PROVIDER (gemini, padrão, ou fake).
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                provider = _env("LLM_PROVIDER", "gemini").strip().lower()
+                if provider == "gemini":
+                    inner = GeminiBackend(os.getenv("GEMINI_API_KEY", ""))
+                elif provider == "fake":
+                    inner = FakeLLMBackend(latency_ms=LLM_FAKE_LATENCY_MS, ms_per_token=LLM_FAKE_MS_PER_TOKEN)
+                else:
+                    raise ValueError(f"LLM_PROVIDER desconhecido: {provider}")
+                limiter = ConcurrencyLimiter("llm", LLM_MAX_CONCURRENCY, LLM_MAX_QUEUE, LLM_QUEUE_TIMEOUT_SECS)
+                _backend = AdmissionControlledBackend(inner, limiter)
+    return _backend
@@ -0,0 +1,218 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeout
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Iterator, Optional
+
+from .deadline import Deadline, DeadlineExceeded, current_deadline
+from .env import _env
+from .llm_backend import LLM_MAX_CONCURRENCY, LLMBackend, get_llm_backend
+from .metrics import metrics
+
+GEMINI_MODEL = _env("GEMINI_MODEL", "gemini-1.5-flash")
+# Modelo por etapa: o NLU só precisa de um JSON curto; a geração pode usar um modelo maior
+GEMINI_NLU_MODEL = _env("GEMINI_NLU_MODEL", GEMINI_MODEL)
+GEMINI_GENERATIVE_MODEL = _env("GEMINI_GENERATIVE_MODEL", GEMINI_MODEL)
+GEMINI_FAST_MODEL = _env("GEMINI_FAST_MODEL", GEMINI_NLU_MODEL)
+
+LLM_ROUTER_WINDOW = _env("LLM_ROUTER_WINDOW", 200, int)
+LLM_ROUTER_MIN_SAMPLES = _env("LLM_ROUTER_MIN_SAMPLES", 20, int)
+# Gerações curtas ou destas intents vão direto para o modelo rápido (ex.: reescrever uma resposta mais simples)
+LLM_ROUTER_SHORT_INPUT_CHARS = _env("LLM_ROUTER_SHORT_INPUT_CHARS", 0, int)
+LLM_ROUTER_FAST_INTENTS = frozenset(
+    i.strip() for i in _env("LLM_ROUTER_FAST_INTENTS", "saudacao,simplificar_resposta").split(",") if i.strip()
+)
+# p95 do modelo de geração acima do qual o modelo rápido assume (se estiver melhor)
+LLM_ROUTER_MAX_P95_MS = _env("LLM_ROUTER_MAX_P95_MS", 8000.0, float)
+
+LLM_HEDGE_ENABLED = _env("LLM_HEDGE_ENABLED", True, bool)
+# Espera antes do pedido reserva: o p95 do modelo primário, ou este valor até haver amostras
+LLM_HEDGE_AFTER_MS = _env("LLM_HEDGE_AFTER_MS", 3000.0, float)
+LLM_HEDGE_MIN_AFTER_MS = _env("LLM_HEDGE_MIN_AFTER_MS", 300.0, float)
+
+
+class LatencyTracker:
+    """Janela móvel das últimas latências (ms) de cada modelo."""
+
+    def __init__(self, window: int = LLM_ROUTER_WINDOW, min_samples: int = LLM_ROUTER_MIN_SAMPLES):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, latency_ms: float):
+        with self._lock:
+            samples = self._samples.get(model)
+            if samples is None:
+                samples = self._samples[model] = deque(maxlen=self.window)
+            samples.append(latency_ms)
+
+    def p95(self, model: str) -> Optional[float]:
+        """p95 da janela, ou None com menos de `min_samples` amostras."""
+        with self._lock:
+            samples = list(self._samples.get(model, ()))
+        if len(samples) < self.min_samples:
+            return None
+        samples.sort()
+        return samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+@dataclass
+class RouteDecision:
+    model: str
+    reason: str
+    hedge_model: Optional[str] = None
+    hedge_after: float = 0.0  # segundos
+
+
+class ModelRouter:
+    """
+    Escolhe o modelo de cada chamada ao LLM pela etapa (nlu/generative/combined), intent, tamanho da
+    entrada e p95 móvel de cada modelo, e faz hedging: se o primário passar do limite, dispara
+    um pedido reserva no modelo rápido e usa a primeira resposta que chegar.
+
+    O pedido perdedor não é interrompido (o SDK não cancela a chamada HTTP); o resultado é
+    descartado e contado em `llm_hedge_wasted_total`.
+    """
+
+    def __init__(self, backend: LLMBackend | None = None, nlu_model: str = GEMINI_NLU_MODEL,
+                 generative_model: str = GEMINI_GENERATIVE_MODEL, fast_model: str = GEMINI_FAST_MODEL,
+                 hedge_enabled: bool = LLM_HEDGE_ENABLED, tracker: LatencyTracker | None = None):
+        self.backend = backend or get_llm_backend()
+        self.nlu_model = nlu_model
+        self.generative_model = generative_model
+        self.fast_model = fast_model
+        self.hedge_enabled = hedge_enabled
+        self.tracker = tracker or LatencyTracker()
+        self._executor = ThreadPoolExecutor(max_workers=max(2, LLM_MAX_CONCURRENCY * 2), thread_name_prefix="llm-hedge")
+
+    def model_for(self, stage: str) -> str:
+        # "combined" (NLU + rascunho de resposta) gera texto para o usuário: usa o modelo de geração
+        return self.nlu_model if stage == "nlu" else self.generative_model
+
+    def route(self, stage: str, intent: str | None = None, input_chars: int = 0) -> RouteDecision:
+        model, reason = self.model_for(stage), "stage"
+        if stage != "nlu" and model != self.fast_model:
+            if intent in LLM_ROUTER_FAST_INTENTS or input_chars < LLM_ROUTER_SHORT_INPUT_CHARS:
+                model, reason = self.fast_model, "light"
+            else:
+                p95_model, p95_fast = self.tracker.p95(model), self.tracker.p95(self.fast_model)
+                if p95_model is not None and p95_model > LLM_ROUTER_MAX_P95_MS and (p95_fast is None or p95_fast < p95_model):
+                    model, reason = self.fast_model, "latency"
+
+        decision = RouteDecision(model, reason)
+        if self.hedge_enabled and self.fast_model != model:
+            p95 = self.tracker.p95(model)
+            decision.hedge_model = self.fast_model
+            decision.hedge_after = max(LLM_HEDGE_MIN_AFTER_MS, p95 if p95 is not None else LLM_HEDGE_AFTER_MS) / 1000
+        return decision
+
+    def generate(self, stage: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+                 system_instruction: Optional[str] = None, intent: str | None = None,
+                 input_chars: int | None = None) -> str:
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check(stage)
+        decision = self.route(stage, intent, len(prompt) if input_chars is None else input_chars)
+        metrics.inc("llm_route_total", labels={"stage": stage, "model": decision.model, "reason": decision.reason})
+        args = (prompt, generation_config, system_instruction)
+        try:
+            if decision.hedge_model is None:
+                return self._call(decision.model, *args)
+            return self._hedged(stage, decision, args, deadline)
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            # Timeout do SDK (ou da fila) causado pelo prazo da requisição
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceeded(stage) from e
+            raise
+
+    def stream(self, stage: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None,
+               system_instruction: Optional[str] = None, intent: str | None = None,
+               input_chars: int | None = None) -> Iterator[str]:
+        """
+        Como generate(), mas devolve o texto em pedaços (WebSocket). Sem hedging: depois do
+        primeiro pedaço enviado não há como trocar de modelo.
+        """
+        deadline = current_deadline()
+        if deadline is not None:
+            deadline.check(stage)
+        decision = self.route(stage, intent, len(prompt) if input_chars is None else input_chars)
+        metrics.inc("llm_route_total", labels={"stage": stage, "model": decision.model, "reason": decision.reason})
+        start = time.perf_counter()
+        chunks = self.backend.generate_stream(prompt, model=decision.model, generation_config=generation_config,
+                                              system_instruction=system_instruction)
+        try:
+            for i, chunk in enumerate(chunks):
+                if i == 0:
+                    metrics.observe("llm_first_chunk_ms", (time.perf_counter() - start) * 1000,
+                                    {"model": decision.model})
+                yield chunk
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceeded(stage) from e
+            raise
+        self.tracker.record(decision.model, (time.perf_counter() - start) * 1000)
+
+    def _call(self, model: str, prompt: str, generation_config, system_instruction) -> str:
+        start = time.perf_counter()
+        text = self.backend.generate(prompt, model=model, generation_config=generation_config,
+                                     system_instruction=system_instruction)
+        latency = (time.perf_counter() - start) * 1000
+        self.tracker.record(model, latency)
+        p95 = self.tracker.p95(model)
+        if p95 is not None:
+            metrics.set_gauge("llm_model_p95_ms", p95, labels={"model": model})
+        return text
+
+    def _submit(self, model: str, args: tuple) -> Future:
+        # Cada chamada leva uma cópia do contexto (contextvars) da requisição
+        return self._executor.submit(contextvars.copy_context().run, self._call, model, *args)
+
+    def _hedged(self, stage: str, decision: RouteDecision, args: tuple, deadline: Deadline | None = None) -> str:
+        primary = self._submit(decision.model, args)
+        hedge_after = decision.hedge_after if deadline is None else deadline.timeout(decision.hedge_after)
+        try:
+            return primary.result(timeout=hedge_after)
+        except FuturesTimeout:
+            if deadline is not None and deadline.expired:
+                raise DeadlineExceeded(stage)
+
+        backup = self._submit(decision.hedge_model, args)
+        metrics.inc("llm_hedges_total", labels={"stage": stage, "outcome": "fired"})
+        pending, error = {primary, backup}, None
+        while pending:
+            done, pending = wait(pending, timeout=None if deadline is None else deadline.remaining(),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                # As chamadas em voo terminam sozinhas (o backend também recebe o prazo)
+                raise DeadlineExceeded(stage)
+            for future in done:
+                if future.exception() is None:
+                    winner = "primary" if future is primary else "backup"
+                    metrics.inc("llm_hedges_total", labels={"stage": stage, "outcome": f"{winner}_won"})
+                    for loser in pending:
+                        loser.add_done_callback(lambda f: metrics.inc("llm_hedge_wasted_total", labels={"stage": stage}))
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+_router: Optional[ModelRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """Roteador de modelos do processo, sobre o backend de get_llm_backend()."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ModelRouter()
+    return _router
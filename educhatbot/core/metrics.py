@@ -0,0 +1,129 @@
+import bisect
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+DEFAULT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+class _Histogram:
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.n = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.n += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimativa pelo limite superior do bucket (como no Prometheus)."""
+        if not self.n:
+            return None
+        target = q * self.n
+        acc = 0
+        for i, c in enumerate(self.counts):
+            acc += c
+            if acc >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas em memória (por processo): contadores, gauges e histogramas.
+    Exportado em /api/metrics no formato texto do Prometheus ou JSON.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+
+    def inc(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        with self._lock:
+            self._gauges.setdefault(name, {})[_label_key(labels)] = value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None,
+                buckets: Iterable[float] = DEFAULT_BUCKETS_MS):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = _Histogram(buckets)
+            hist.observe(value)
+
+    def counter_value(self, name: str, labels: Optional[Dict[str, str]] = None) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(_label_key(labels), 0)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict[str, list]:
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": n, "labels": dict(k), "value": v}
+                    for n, series in self._counters.items() for k, v in series.items()
+                ],
+                "gauges": [
+                    {"name": n, "labels": dict(k), "value": v}
+                    for n, series in self._gauges.items() for k, v in series.items()
+                ],
+                "histograms": [
+                    {
+                        "name": n, "labels": dict(k), "count": h.n, "sum": round(h.total, 3),
+                        "p50": h.quantile(0.5), "p95": h.quantile(0.95), "p99": h.quantile(0.99),
+                    }
+                    for n, series in self._histograms.items() for k, h in series.items()
+                ],
+            }
+
+    def render_prometheus(self) -> str:
+        def fmt(labels: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            items = labels + extra
+            if not items:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in self._counters.items():
+                lines.append(f"# TYPE {name} counter")
+                lines += [f"{name}{fmt(k)} {v}" for k, v in series.items()]
+            for name, series in self._gauges.items():
+                lines.append(f"# TYPE {name} gauge")
+                lines += [f"{name}{fmt(k)} {v}" for k, v in series.items()]
+            for name, series in self._histograms.items():
+                lines.append(f"# TYPE {name} histogram")
+                for k, h in series.items():
+                    acc = 0
+                    for bound, count in zip(h.buckets, h.counts):
+                        acc += count
+                        lines.append(f"{name}_bucket{fmt(k, (('le', str(bound)),))} {acc}")
+                    lines.append(f"{name}_bucket{fmt(k, (('le', '+Inf'),))} {h.n}")
+                    lines.append(f"{name}_sum{fmt(k)} {h.total}")
+                    lines.append(f"{name}_count{fmt(k)} {h.n}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,61 @@
+import contextvars
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from .env import _env
+
+
+def _parse_budgets(raw: str) -> Dict[str, int]:
+    """'tts:160,libras:120' -> {'tts': 160, 'libras': 120} (itens inválidos são ignorados)."""
+    budgets = {}
+    for item in raw.split(","):
+        name, _, value = item.partition(":")
+        if name.strip() and value.strip().isdigit():
+            budgets[name.strip()] = int(value.strip())
+    return budgets
+
+
+# Teto de tokens de saída das respostas generativas: o tempo de geração cresce com o tamanho da resposta
+OUTPUT_TOKENS_DEFAULT = _env("OUTPUT_TOKENS_DEFAULT", 512, int)
+# Por canal do cliente: voz (TTS) e Libras querem respostas curtas
+OUTPUT_TOKENS_BY_CHANNEL = _parse_budgets(_env("OUTPUT_TOKENS_BY_CHANNEL", "web:512,ws:512,tts:160,libras:120"))
+# Por intent (do NLU ou do caminho da resposta); vale o menor entre canal e intent
+OUTPUT_TOKENS_BY_INTENT = _parse_budgets(_env(
+    "OUTPUT_TOKENS_BY_INTENT", "saudacao:80,generativo_simplificado:200,simplificar_resposta:160,feedback_recovery:320"
+))
+OUTPUT_CHANNELS = frozenset(OUTPUT_TOKENS_BY_CHANNEL) | {"web"}
+DEFAULT_CHANNEL = "web"
+
+
+def output_budget(intent: Optional[str] = None, channel: Optional[str] = None) -> int:
+    budget = OUTPUT_TOKENS_BY_CHANNEL.get(channel or current_channel(), OUTPUT_TOKENS_DEFAULT)
+    if intent in OUTPUT_TOKENS_BY_INTENT:
+        budget = min(budget, OUTPUT_TOKENS_BY_INTENT[intent])
+    return budget
+
+
+def estimate_tokens(text: str) -> int:
+    """Aproximação (~4 caracteres por token) quando o provedor não informa a contagem."""
+    return max(1, len(text) // 4) if text else 0
+
+
+# Canal da requisição; como o prazo, segue para as threads que copiam o contexto
+_channel: contextvars.ContextVar[str] = contextvars.ContextVar("request_channel", default=DEFAULT_CHANNEL)
+
+
+def current_channel() -> str:
+    return _channel.get()
+
+
+def normalize_channel(raw) -> str:
+    channel = str(raw or "").strip().lower()
+    return channel if channel in OUTPUT_CHANNELS else DEFAULT_CHANNEL
+
+
+@contextmanager
+def channel_scope(channel: Optional[str]) -> Iterator[str]:
+    token = _channel.set(normalize_channel(channel))
+    try:
+        yield _channel.get()
+    finally:
+        _channel.reset(token)
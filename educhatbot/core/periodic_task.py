@@ -0,0 +1,54 @@
+import logging
+import threading
+from typing import Callable
+
+from django.db import connection
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """
+    Executa `fn` numa thread daemon: uma vez ao iniciar e depois a cada `interval` segundos.
+    Erros são logados e contados; a conexão de banco da thread é fechada a cada rodada.
+    """
+
+    def __init__(self, name: str, fn: Callable[[], object], interval: float, run_immediately: bool = True):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.run_immediately = run_immediately
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run_once(self):
+        try:
+            self.fn()
+        except Exception as e:
+            metrics.inc("periodic_task_errors_total", labels={"task": self.name})
+            logger.warning(f"Tarefa periódica '{self.name}' falhou: {e}")
+        finally:
+            connection.close()
+
+    def _run(self):
+        if self.run_immediately:
+            self._run_once()
+        while not self._stop.wait(self.interval):
+            self._run_once()
@@ -0,0 +1,239 @@
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from django.db import connection
+
+from .env import _env
+from .metrics import metrics
+
+PROFILING_DIR = _env("PROFILING_DIR", "/tmp/educhatbot-profiles")
+PROFILING_MAX_ARTIFACTS = _env("PROFILING_MAX_ARTIFACTS", 50, int)
+PROFILING_MAX_BYTES = _env("PROFILING_MAX_BYTES", 50 * 1024 * 1024, int)
+PROFILING_SAMPLE_INTERVAL_MS = _env("PROFILING_SAMPLE_INTERVAL_MS", 5.0, float)
+
+ARTIFACT_NAME = re.compile(r"^[\w-]+\.(json|pstats|folded)$")
+
+_current: contextvars.ContextVar[Optional["ProfileSession"]] = contextvars.ContextVar("profile_session", default=None)
+# O cProfile só admite um profiler ativo por processo; os demais pedidos usam o amostrador
+_cprofile_lock = threading.Lock()
+
+
+@contextmanager
+def profile_stage(name: str) -> Iterator[None]:
+    """Marca uma etapa do pedido; sem profiling ativo custa só a leitura do contextvar."""
+    session = _current.get()
+    if session is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        session.stages.append({
+            "name": name,
+            "start_ms": round((start - session.started) * 1000, 3),
+            "ms": round((time.perf_counter() - start) * 1000, 3),
+        })
+
+
+class StackSampler:
+    """
+    Amostrador estatístico: a cada intervalo lê a pilha da thread alvo (sys._current_frames)
+    e conta as pilhas no formato "folded" (a;b;c N), pronto para flamegraph.
+    """
+
+    def __init__(self, thread_id: int, interval_ms: float = PROFILING_SAMPLE_INTERVAL_MS):
+        self.thread_id = thread_id
+        self.interval = interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def top_functions(self, limit: int = 25) -> List[Dict[str, Any]]:
+        """Funções mais presentes no topo da pilha (tempo próprio)."""
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        total = sum(leaves.values()) or 1
+        return [{"function": f, "samples": n, "share": round(n / total, 4)} for f, n in leaves.most_common(limit)]
+
+
+class ProfileSession:
+    """
+    Profiling de um pedido: cProfile (ou amostrador), consultas SQL da conexão da thread
+    e as etapas marcadas com `profile_stage`.
+    """
+
+    def __init__(self, mode: str = "cprofile", trigger: str = "header", slow_sql: int = 10):
+        self.id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}"
+        self.mode = mode
+        self.trigger = trigger
+        self.slow_sql = slow_sql
+        self.stages: List[Dict[str, Any]] = []
+        self.queries: List[Dict[str, Any]] = []
+        self.started = 0.0
+        self.duration_ms = 0.0
+        self._profiler: cProfile.Profile | None = None
+        self._sampler: StackSampler | None = None
+        self._token = None
+        self._sql_context = None
+
+    def _sql_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({"sql": sql[:500], "ms": round((time.perf_counter() - start) * 1000, 3), "many": many})
+
+    def __enter__(self):
+        if self.mode == "cprofile" and not _cprofile_lock.acquire(blocking=False):
+            self.mode = "sampler"
+        if self.mode == "cprofile":
+            self._profiler = cProfile.Profile()
+        else:
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+
+        self._sql_context = connection.execute_wrapper(self._sql_wrapper)
+        self._sql_context.__enter__()
+        self._token = _current.set(self)
+        self.started = time.perf_counter()
+        if self._profiler is not None:
+            self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self._profiler is not None:
+            self._profiler.disable()
+            _cprofile_lock.release()
+        self.duration_ms = round((time.perf_counter() - self.started) * 1000, 3)
+        _current.reset(self._token)
+        self._sql_context.__exit__(*exc)
+        if self._sampler is not None:
+            self._sampler.stop()
+        return False
+
+    def top_functions(self, limit: int = 25) -> List[Dict[str, Any]]:
+        if self._sampler is not None:
+            return self._sampler.top_functions(limit)
+        stats = pstats.Stats(self._profiler, stream=io.StringIO()).sort_stats("cumulative")
+        rows = []
+        for (filename, line, func), (cc, nc, tt, ct, _) in stats.stats.items():
+            rows.append({
+                "function": f"{func} ({os.path.basename(filename)}:{line})",
+                "calls": nc,
+                "tottime_ms": round(tt * 1000, 3),
+                "cumtime_ms": round(ct * 1000, 3),
+            })
+        rows.sort(key=lambda r: r["cumtime_ms"], reverse=True)
+        return rows[:limit]
+
+    def summary(self, **request_info) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "trigger": self.trigger,
+            "duration_ms": self.duration_ms,
+            **request_info,
+            "stages": self.stages,
+            "sql": {
+                "count": len(self.queries),
+                "total_ms": round(sum(q["ms"] for q in self.queries), 3),
+                "slowest": sorted(self.queries, key=lambda q: q["ms"], reverse=True)[:self.slow_sql],
+            },
+            "top_functions": self.top_functions(),
+        }
+
+
+class ProfileStore:
+    """
+    Diretório limitado de artefatos: para cada pedido, <id>.json e <id>.pstats (ou .folded).
+    Ao salvar, os mais antigos são apagados até caber em PROFILING_MAX_ARTIFACTS e PROFILING_MAX_BYTES.
+    """
+
+    def __init__(self, directory: str = PROFILING_DIR, max_artifacts: int = PROFILING_MAX_ARTIFACTS,
+                 max_bytes: int = PROFILING_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_artifacts = max_artifacts
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def save(self, session: ProfileSession, summary: Dict[str, Any]) -> List[str]:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = [f"{session.id}.json"]
+        (self.directory / files[0]).write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
+        if session._profiler is not None:
+            files.append(f"{session.id}.pstats")
+            session._profiler.dump_stats(str(self.directory / files[-1]))
+        elif session._sampler is not None:
+            files.append(f"{session.id}.folded")
+            (self.directory / files[-1]).write_text(session._sampler.folded(), encoding="utf-8")
+        self._prune()
+        metrics.inc("profiles_saved_total", labels={"mode": session.mode, "trigger": session.trigger})
+        return files
+
+    def list(self) -> List[Dict[str, Any]]:
+        if not self.directory.is_dir():
+            return []
+        profiles: Dict[str, Dict[str, Any]] = {}
+        for path in self.directory.iterdir():
+            if not ARTIFACT_NAME.match(path.name):
+                continue
+            stat = path.stat()
+            entry = profiles.setdefault(path.stem, {"id": path.stem, "files": [], "bytes": 0, "mtime": 0.0})
+            entry["files"].append(path.name)
+            entry["bytes"] += stat.st_size
+            entry["mtime"] = max(entry["mtime"], stat.st_mtime)
+        return sorted(profiles.values(), key=lambda p: p["mtime"], reverse=True)
+
+    def path_for(self, name: str) -> Optional[Path]:
+        """Caminho de um artefato pelo nome (validado: nada fora do diretório)."""
+        if not ARTIFACT_NAME.match(name):
+            return None
+        path = self.directory / name
+        return path if path.is_file() else None
+
+    def _prune(self):
+        with self._lock:
+            profiles = self.list()
+            total = sum(p["bytes"] for p in profiles)
+            while profiles and (len(profiles) > self.max_artifacts or total > self.max_bytes):
+                oldest = profiles.pop()
+                total -= oldest["bytes"]
+                for name in oldest["files"]:
+                    (self.directory / name).unlink(missing_ok=True)
@@ -0,0 +1,64 @@
+import threading
+import time
+from typing import Hashable, Optional
+
+from cachetools import TTLCache
+
+
+class TokenBucket:
+    """
+    Token bucket clássico: `rate` tokens por segundo, até `capacity` acumulados (rajada).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self, tokens: float = 1) -> Optional[float]:
+        """
+        Consome `tokens` se houver saldo e retorna None.
+        Caso contrário retorna quantos segundos faltam para haver saldo.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return None
+            return (tokens - self._tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def refund(self, tokens: float = 1):
+        """Devolve tokens consumidos por uma requisição que acabou não seguindo."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+
+class KeyedRateLimiter:
+    """
+    Um TokenBucket por chave (ex.: session_id). Chaves inativas expiram sozinhas.
+    """
+
+    def __init__(self, rate: float, capacity: float, max_keys: int = 10000, idle_ttl: float = 600):
+        self.rate = rate
+        self.capacity = capacity
+        self._buckets: TTLCache = TTLCache(maxsize=max_keys, ttl=idle_ttl)
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key: Hashable, tokens: float = 1) -> Optional[float]:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.capacity)
+            # reatribui para renovar o TTL da chave
+            self._buckets[key] = bucket
+        return bucket.try_acquire(tokens)
+
+    def refund(self, key: Hashable, tokens: float = 1):
+        with self._lock:
+            bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket.refund(tokens)
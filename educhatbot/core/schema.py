@@ -0,0 +1,10 @@
+from django.conf import settings
+
+if getattr(settings, "API_SCHEMA_ENABLED", True):
+    from drf_spectacular.utils import extend_schema
+else:
+    def extend_schema(*args, **kwargs):
+        """Sem drf_spectacular: o decorator não faz nada."""
+        def decorator(target):
+            return target
+        return decorator
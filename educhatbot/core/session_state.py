@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional
+
+from cachetools import TTLCache
+
+from .env import _env
+
+# Mensagens do histórico enviadas ao NLU (usuário + bot) e turnos guardados para feedback
+SESSION_HISTORY_MESSAGES = _env("SESSION_HISTORY_MESSAGES", 10, int)
+SESSION_MAX_TURNS = _env("SESSION_MAX_TURNS", 50, int)
+# Estado das sessões HTTP no worker (última resposta e continuação de respostas cortadas)
+SESSION_CACHE_TTL_SECS = _env("SESSION_CACHE_TTL_SECS", 1800, int)
+SESSION_CACHE_MAXSIZE = _env("SESSION_CACHE_MAXSIZE", 20000, int)
+
+
+@dataclass
+class Turn:
+    message_id: int
+    question: str
+    answer: str
+    intent: Optional[str]
+    feedback_id: Optional[int] = None
+
+
+@dataclass
+class Continuation:
+    """Resposta generativa cortada no limite de tokens, guardada para o "quer que eu continue?"."""
+    prompt: str
+    partial: str
+    intent: Optional[str]
+    max_output_tokens: int
+
+
+@dataclass
+class SessionState:
+    """
+    Contexto de uma conversa mantido no servidor (ex.: numa conexão WebSocket): histórico,
+    turnos recentes (para o feedback sem reenviar pergunta e resposta) e o estado de
+    feedback negativo que, no HTTP, é consultado no banco a cada mensagem.
+    """
+
+    session_id: int
+    history: Deque[Dict[str, str]] = field(default_factory=lambda: deque(maxlen=SESSION_HISTORY_MESSAGES))
+    turns: "OrderedDict[int, Turn]" = field(default_factory=OrderedDict)
+    pending_negative: Any = None  # último Feedback "não ajudou" ainda não usado na recuperação
+    needs_simplify: bool = False  # o último feedback da sessão foi "não ajudou"
+    next_message_id: int = 1
+    continuation: Optional[Continuation] = None
+    last_answer: Optional[Turn] = None  # última resposta do bot, base do "simplificar"
+
+    def last_messages(self) -> List[Dict[str, str]]:
+        return list(self.history)
+
+    def add_turn(self, question: str, answer: str, intent: Optional[str]) -> Turn:
+        turn = Turn(self.next_message_id, question, answer, intent)
+        self.next_message_id += 1
+        self.turns[turn.message_id] = turn
+        while len(self.turns) > SESSION_MAX_TURNS:
+            self.turns.popitem(last=False)
+        self.history.append({"role": "user", "text": question})
+        self.history.append({"role": "bot", "text": answer})
+        return turn
+
+    def remember_answer(self, question: str, answer: str, intent: Optional[str]):
+        self.last_answer = Turn(0, question, str(answer), intent)
+
+    def take_continuation(self) -> Optional[Continuation]:
+        continuation, self.continuation = self.continuation, None
+        return continuation
+
+    def take_pending_negative(self) -> Any:
+        feedback, self.pending_negative = self.pending_negative, None
+        return feedback
+
+    def record_feedback(self, feedback: Any, helpful: Optional[bool]):
+        """Atualiza o estado local com um feedback enviado nesta conversa."""
+        if helpful is False:
+            self.pending_negative = feedback
+            self.needs_simplify = True
+        elif helpful is True:
+            self.needs_simplify = False
+            if self.pending_negative is not None and self.pending_negative.id == feedback.id:
+                self.pending_negative = None
+
+
+class SessionStateCache:
+    """
+    SessionState por sessão para o canal HTTP, na memória do worker (TTL). Sem afinidade de sessão
+    entre workers, uma mensagem pode cair noutro worker e não achar o estado: quem usa trata como ausente.
+    """
+
+    def __init__(self, ttl: int = SESSION_CACHE_TTL_SECS, maxsize: int = SESSION_CACHE_MAXSIZE):
+        self._states: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, session_id: Optional[int], create: bool = False) -> Optional[SessionState]:
+        if not session_id:
+            return None
+        with self._lock:
+            state = self._states.get(session_id)
+            if state is None and create:
+                state = self._states[session_id] = SessionState(session_id)
+            return state
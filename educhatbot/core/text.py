@@ -0,0 +1,30 @@
+import re
+import unicodedata
+
+_STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "de", "da", "do", "das", "dos", "e", "em", "no", "na", "nos", "nas",
+    "para", "pra", "por", "com", "que", "me", "eu", "voce", "qual", "quais", "se", "ao", "aos",
+}
+_NON_WORD = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(text: str | None) -> str:
+    """
+    Minúsculas, sem acentos, sem pontuação e com espaços colapsados.
+    É a chave do "cluster" de perguntas equivalentes.
+    """
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _SPACES.sub(" ", _NON_WORD.sub(" ", text)).strip()
+
+
+def question_signature(normalized: str) -> str:
+    """
+    Assinatura por palavras relevantes (sem stopwords, ordenadas, sem repetição):
+    agrupa variações como "horário da biblioteca?" e "biblioteca horário".
+    """
+    tokens = sorted({t for t in normalized.split(" ") if len(t) > 1 and t not in _STOPWORDS})
+    return " ".join(tokens) if len(tokens) >= 2 else ""
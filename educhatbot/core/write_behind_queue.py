@@ -0,0 +1,137 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Generic, List, TypeVar
+
+from django.db import connection
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class WriteBehindQueue(Generic[T]):
+    """
+    Fila limitada em memória com uma thread daemon que grava os itens em lote.
+
+    `submit` só enfileira; a thread junta até `batch_size` itens (esperando no máximo
+    `linger` segundos por mais itens) e chama `flush_fn(lote)`. Se o flush falha o mesmo
+    lote é tentado de novo com backoff (pelo menos uma vez): `flush_fn` deve ser idempotente.
+    Com a fila cheia, `submit` espera até `put_timeout` e retorna False para o chamador
+    gravar de forma síncrona (back-pressure). No encerramento do processo a fila é drenada.
+    """
+
+    def __init__(self, name: str, flush_fn: Callable[[List[T]], None], max_size: int = 10000,
+                 batch_size: int = 500, linger: float = 0.2, put_timeout: float = 0.05,
+                 max_backoff: float = 30.0, close_retries: int = 3):
+        self.name = name
+        self.flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.linger = linger
+        self.put_timeout = put_timeout
+        self.max_backoff = max_backoff
+        self.close_retries = close_retries
+        self._queue: "queue.Queue[T]" = queue.Queue(maxsize=max_size)
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._labels = {"queue": name}
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+            self._thread.start()
+            atexit.register(self.close)
+
+    def submit(self, item: T) -> bool:
+        if self._stop.is_set():
+            return False
+        self.start()
+        try:
+            self._queue.put(item, timeout=self.put_timeout)
+        except queue.Full:
+            metrics.inc("write_behind_rejected_total", labels=self._labels)
+            return False
+        metrics.set_gauge("write_behind_queue_depth", self._queue.qsize(), labels=self._labels)
+        return True
+
+    def pending(self) -> int:
+        """Itens enfileirados ou em um lote ainda não gravado."""
+        return self._queue.unfinished_tasks
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Espera até tudo o que foi enfileirado ser gravado. Retorna False se estourar o tempo."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: float = 10.0) -> bool:
+        """Para de aceitar itens, grava o que restou e encerra a thread."""
+        self._stop.set()
+        thread = self._thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        if self._queue.unfinished_tasks:
+            logger.error(f"Write-behind '{self.name}': {self._queue.unfinished_tasks} itens não gravados no encerramento.")
+            return False
+        return True
+
+    def _take_batch(self) -> List[T]:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + (0 if self._stop.is_set() else self.linger)
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._flush_with_retry(batch)
+            elif self._stop.is_set():
+                break
+
+    def _flush_with_retry(self, batch: List[T]):
+        attempt = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    self.flush_fn(batch)
+                    metrics.observe("write_behind_flush_ms", (time.perf_counter() - start) * 1000, labels=self._labels)
+                    metrics.inc("write_behind_flushed_total", len(batch), labels=self._labels)
+                    return
+                except Exception as e:
+                    attempt += 1
+                    metrics.inc("write_behind_flush_errors_total", labels=self._labels)
+                    logger.warning(f"Write-behind '{self.name}': falha ao gravar lote de {len(batch)} (tentativa {attempt}): {e}")
+                    connection.close()
+                    if self._stop.is_set() and attempt >= self.close_retries:
+                        metrics.inc("write_behind_dropped_total", len(batch), labels=self._labels)
+                        logger.error(f"Write-behind '{self.name}': lote de {len(batch)} itens descartado no encerramento.")
+                        return
+                    time.sleep(min(self.max_backoff, 0.5 * 2 ** (attempt - 1)))
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+            metrics.set_gauge("write_behind_queue_depth", self._queue.qsize(), labels=self._labels)
+            connection.close_if_unusable_or_obsolete()
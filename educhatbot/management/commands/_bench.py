@@ -0,0 +1,60 @@
+"""
+Utilitários compartilhados pelos comandos de benchmark (bench_*).
+Módulos com prefixo "_" não são registrados como comandos pelo Django.
+"""
+import json
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    n = len(ordered)
+    if not n:
+        return {"n": 0}
+    return {
+        "n": n,
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "p50_ms": round(ordered[n // 2], 4),
+        "p95_ms": round(ordered[min(n - 1, int(n * 0.95))], 4),
+        "max_ms": round(ordered[-1], 4),
+    }
+
+
+def time_call(fn: Callable[[], Any], repeat: int, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                       stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return ""
+
+
+def write_results(name: str, results: Dict[str, Any], output: str | None) -> Dict[str, Any]:
+    payload = {
+        "benchmark": name,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "results": results,
+    }
+    if output:
+        path = Path(output)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload, indent=2, ensure_ascii=False), encoding="utf-8")
+    return payload
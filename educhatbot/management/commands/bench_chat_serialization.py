@@ -0,0 +1,73 @@
+import io
+import json
+
+from django.core.management.base import BaseCommand
+from djangorestframework_camel_case.parser import CamelCaseJSONParser
+from djangorestframework_camel_case.render import CamelCaseJSONRenderer
+
+from educhatbot.serializers import (
+    AskSerializer, BotMessageSerializer, ChatJSONParser, ChatJSONRenderer, bot_message, parse_ask_request
+)
+
+from ._bench import time_call, write_results
+
+ANSWER = "Aqui estão alguns tópicos de **Matemática**:\n" + "\\- Porcentagem: É a parte de 100. Ex.: 20% de 150 = 30.\n" * 3
+
+
+def _body(history_size: int) -> bytes:
+    return json.dumps({
+        "sessionId": 42,
+        "role": "user",
+        "text": "Quais são os horários da biblioteca em São Leopoldo?",
+        "simplify": False,
+        "lastMessages": [
+            {"role": "user" if i % 2 == 0 else "bot", "text": f"Mensagem {i} do histórico " + "x" * 80}
+            for i in range(history_size)
+        ],
+    }).encode("utf-8")
+
+
+def drf_path(body: bytes) -> bytes:
+    data = CamelCaseJSONParser().parse(io.BytesIO(body), parser_context={})
+    serializer = AskSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    out = BotMessageSerializer(data={
+        "id": 1, "role": "bot", "text": ANSWER, "feedback_enabled": True, "detected_intent": "generativo",
+    })
+    out.is_valid(raise_exception=True)
+    return CamelCaseJSONRenderer().render(out.data)
+
+
+def lean_path(body: bytes) -> bytes:
+    data = ChatJSONParser().parse(io.BytesIO(body))
+    parse_ask_request(data)
+    return ChatJSONRenderer().render(bot_message(ANSWER, "generativo", True))
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark da (de)serialização do /api/chat: DRF + camel_case vs. caminho enxuto."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=2000)
+        parser.add_argument("--sizes", default="0,10,50", help="Tamanhos de histórico (lastMessages).")
+        parser.add_argument("--output", help="Arquivo JSON de saída.")
+
+    def handle(self, *args, **opts):
+        results = {}
+        for size in [int(s) for s in opts["sizes"].split(",")]:
+            body = _body(size)
+            drf = time_call(lambda: drf_path(body), opts["repeat"], warmup=50)
+            lean = time_call(lambda: lean_path(body), opts["repeat"], warmup=50)
+            results[f"history_{size}"] = {
+                "request_bytes": len(body),
+                "drf": drf,
+                "lean": lean,
+                "speedup_p50": round(drf["p50_ms"] / lean["p50_ms"], 2) if lean["p50_ms"] else None,
+            }
+            self.stdout.write(
+                f"history={size:>3}  drf p50={drf['p50_ms']:.4f} ms  lean p50={lean['p50_ms']:.4f} ms"
+            )
+
+        payload = write_results("chat_serialization", results, opts.get("output"))
+        if not opts.get("output"):
+            self.stdout.write(json.dumps(payload, indent=2, ensure_ascii=False))
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from ._bench import summarize, write_results
+
+QUESTIONS = (
+    "Me conta uma curiosidade sobre o espaço",
+    "Por que o céu é azul?",
+    "Como estudar melhor para as provas?",
+    "O que é inteligência artificial?",
+)
+
+
+def _cpu_seconds(pid: int) -> float | None:
+    """utime + stime do processo (Linux, /proc); None em outros sistemas."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ("Benchmark do canal de chat: HTTP (/api/chat) x WebSocket (/api/chat/ws) com N conexões "
+            "simultâneas. Sem --url, sobe um uvicorn com LLM_PROVIDER=fake e mede também a CPU do servidor.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--connections", type=int, default=1000)
+        parser.add_argument("--turns", type=int, default=3, help="Mensagens por conexão.")
+        parser.add_argument("--url", help="Servidor já em execução (ex.: http://127.0.0.1:8000).")
+        parser.add_argument("--server-pid", type=int, help="PID do servidor de --url, para medir a CPU.")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+        parser.add_argument("--modes", default="http,ws")
+        parser.add_argument("--output", help="Arquivo JSON de saída.")
+
+    def handle(self, *args, **opts):
+        try:
+            import websockets  # noqa: F401
+        except ImportError:
+            raise CommandError("O cliente WebSocket do benchmark usa o pacote 'websockets'.")
+
+        server, url, pid = None, opts.get("url"), opts.get("server_pid")
+        if not url:
+            server, url = self._start_server(opts)
+            pid = server.pid
+        try:
+            results = {"connections": opts["connections"], "turns": opts["turns"], "url": url}
+            for mode in [m.strip() for m in opts["modes"].split(",") if m.strip()]:
+                cpu_before = _cpu_seconds(pid) if pid else None
+                start = time.perf_counter()
+                samples = asyncio.run(self._run(mode, url, opts["connections"], opts["turns"]))
+                results[mode] = self._report(samples, time.perf_counter() - start, cpu_before, pid)
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+        payload = write_results("chat_socket", results, opts.get("output"))
+        self.stdout.write(json.dumps(payload, indent=2, ensure_ascii=False))
+
+    def _start_server(self, opts):
+        connections = str(opts["connections"])
+        env = {
+            **os.environ,
+            "LLM_PROVIDER": "fake",
+            "LLM_FAKE_LATENCY_MS": str(opts["llm_latency_ms"]),
+            "LLM_MAX_CONCURRENCY": connections,
+            "LLM_MAX_QUEUE": connections,
+            "CHAT_SOCKET_WORKERS": connections,
+            "CHAT_RATE_GLOBAL_PER_SEC": "1000000",
+            "CHAT_RATE_GLOBAL_BURST": "1000000",
+            "CHAT_RATE_SESSION_PER_MIN": "1000000",
+            "CHAT_RATE_SESSION_BURST": "1000000",
+            "WARMUP_ON_STARTUP": "true",
+        }
+        cmd = [sys.executable, "-m", "uvicorn", "config.asgi:application", "--port", str(opts["port"]),
+               "--backlog", str(max(2048, opts["connections"] * 2)), "--log-level", "warning", "--no-access-log"]
+        server = subprocess.Popen(cmd, cwd=settings.BASE_DIR, env=env)
+        url = f"http://127.0.0.1:{opts['port']}"
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            try:
+                if httpx.get(f"{url}/api/health/live", timeout=1).status_code == 200:
+                    return server, url
+            except httpx.TransportError:
+                pass
+            if server.poll() is not None:
+                raise CommandError(f"O servidor encerrou ao iniciar (código {server.returncode}).")
+            time.sleep(0.2)
+        server.terminate()
+        raise CommandError("O servidor não respondeu em 60s.")
+
+    async def _run(self, mode: str, url: str, connections: int, turns: int) -> Dict[str, List[float]]:
+        samples: Dict[str, List[float]] = {"turn_ms": [], "first_chunk_ms": [], "errors": []}
+        if mode == "http":
+            limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+            async with httpx.AsyncClient(base_url=url, limits=limits, timeout=120) as client:
+                await asyncio.gather(*(self._http_user(client, i, turns, samples) for i in range(connections)))
+        elif mode == "ws":
+            ws_url = url.replace("http", "ws", 1) + "/api/chat/ws"
+            await asyncio.gather(*(self._ws_user(ws_url, i, turns, samples) for i in range(connections)))
+        else:
+            raise CommandError(f"Modo desconhecido: {mode}")
+        return samples
+
+    @staticmethod
+    async def _http_user(client: httpx.AsyncClient, i: int, turns: int, samples):
+        # Como o front atual: cada POST reenvia o histórico da conversa
+        history: List[Dict[str, str]] = []
+        for t in range(turns):
+            text = QUESTIONS[(i + t) % len(QUESTIONS)]
+            body = {"sessionId": 900000 + i, "role": "user", "text": text, "lastMessages": history[-10:]}
+            start = time.perf_counter()
+            try:
+                resp = await client.post("/api/chat", json=body)
+                resp.raise_for_status()
+                answer = resp.json()["text"]
+            except Exception as e:
+                samples["errors"].append(type(e).__name__)
+                return
+            samples["turn_ms"].append((time.perf_counter() - start) * 1000)
+            history += [{"role": "user", "text": text}, {"role": "bot", "text": answer}]
+
+    @staticmethod
+    async def _ws_user(ws_url: str, i: int, turns: int, samples):
+        from websockets.asyncio.client import connect
+
+        try:
+            async with connect(f"{ws_url}?sessionId={900000 + i}", open_timeout=60, max_queue=None) as ws:
+                json.loads(await ws.recv())  # {"type": "session"}
+                for t in range(turns):
+                    start, first = time.perf_counter(), None
+                    await ws.send(json.dumps({"type": "message", "text": QUESTIONS[(i + t) % len(QUESTIONS)]}))
+                    while True:
+                        frame = json.loads(await ws.recv())
+                        if frame["type"] == "chunk" and first is None:
+                            first = (time.perf_counter() - start) * 1000
+                        elif frame["type"] == "message":
+                            break
+                    samples["turn_ms"].append((time.perf_counter() - start) * 1000)
+                    if first is not None:
+                        samples["first_chunk_ms"].append(first)
+        except Exception as e:
+            samples["errors"].append(type(e).__name__)
+
+    @staticmethod
+    def _report(samples, elapsed: float, cpu_before: float | None, pid: int | None) -> Dict[str, Any]:
+        turns = len(samples["turn_ms"])
+        report: Dict[str, Any] = {
+            "turn": summarize(samples["turn_ms"]),
+            "first_chunk": summarize(samples["first_chunk_ms"]),
+            "turns_per_sec": round(turns / elapsed, 2) if elapsed else 0.0,
+            "errors": len(samples["errors"]),
+            "error_types": sorted(set(samples["errors"])),
+        }
+        cpu_after = _cpu_seconds(pid) if pid else None
+        if cpu_before is not None and cpu_after is not None and turns:
+            report["server_cpu_s"] = round(cpu_after - cpu_before, 3)
+            report["server_cpu_ms_per_turn"] = round((cpu_after - cpu_before) * 1000 / turns, 3)
+        return report
@@ -0,0 +1,68 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from educhatbot.core import metrics
+from educhatbot.services import EducationalContentService
+
+from ._bench import summarize, write_results
+
+LOCAIS = ("biblioteca", "secretaria")
+CAMPI = ("São Leopoldo", "Porto Alegre")
+TOPICOS = ("equacoes", "porcentagem", "geometria", "fotossintese", "revolucao industrial")
+
+
+def _prime(service: EducationalContentService) -> int:
+    """Busca as chaves que um worker aquecido teria: disciplinas, conteúdos, locais e dados por local."""
+    service.prime_cache()
+    for local in LOCAIS:
+        for campus in CAMPI:
+            service.horarios(local, campus)
+            service.faq(local, campus)
+            service.contatos(local, campus)
+    for topico in TOPICOS:
+        service.get_aprofundamento(topico)
+    service.buscar_videos("matematica")
+    return len(service._copies)
+
+
+class Command(BaseCommand):
+    help = ("Benchmark do refresh em lote do conteúdo: GET completo x GET condicional (ETag/Last-Modified). "
+            "Rode contra apimock/content_server.py (EXTERNAL_API_BASE), que responde 304.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=20)
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--output", help="Arquivo JSON de saída.")
+
+    def _measure(self, service: EducationalContentService, rounds: int, workers: int, conditional: bool) -> dict:
+        metrics.reset()
+        samples, errors = [], 0
+        for _ in range(rounds):
+            stats = service.refresh_all(max_workers=workers, conditional=conditional)
+            samples.append(stats["ms"])
+            errors += stats["errors"]
+        counter = metrics.counter_value
+        return {
+            "round_ms": summarize(samples),
+            "errors": errors,
+            "not_modified": counter("content_requests_total", {"outcome": "not_modified"}),
+            "downloaded": counter("content_requests_total", {"outcome": "modified"}),
+            "bytes_downloaded_per_round": round(counter("content_bytes_downloaded_total") / rounds),
+            "bytes_saved_per_round": round(counter("content_bytes_saved_total") / rounds),
+            "parse_ms_saved_per_round": round(counter("content_parse_ms_saved_total") / rounds, 3),
+        }
+
+    def handle(self, *args, **opts):
+        service = EducationalContentService()
+        keys = _prime(service)
+        validated = sum(1 for c in service._copies.values() if c.etag or c.last_modified)
+        results = {"keys": keys, "keys_with_validators": validated, "workers": opts["workers"]}
+        if not validated:
+            self.stderr.write("A API não enviou ETag/Last-Modified: o modo condicional vai baixar tudo.")
+
+        results["full"] = self._measure(service, opts["rounds"], opts["workers"], conditional=False)
+        results["conditional"] = self._measure(service, opts["rounds"], opts["workers"], conditional=True)
+
+        payload = write_results("content_refresh", results, opts.get("output"))
+        self.stdout.write(json.dumps(payload, indent=2, ensure_ascii=False))
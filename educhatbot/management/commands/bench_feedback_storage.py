@@ -0,0 +1,148 @@
+import json
+import random
+from datetime import timedelta
+from difflib import SequenceMatcher
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from educhatbot.models import Feedback, TextContent
+from educhatbot.repositories import FeedbackRepository, TextContentRepository
+from educhatbot.services import FeedbackService
+
+from ._bench import time_call, write_results
+
+BENCH_INTENT = "__bench_feedback_storage__"
+INLINE_TABLE = "bench_feedback_inline"
+QUERY = "como calcular porcentagem de desconto"
+
+
+def _dataset(rows: int, distinct_questions: int, structured_share: float, seed: int):
+    """(pergunta, resposta) com cauda longa: poucas perguntas concentram o volume (Zipf)."""
+    rng = random.Random(seed)
+    questions = [f"como calcular porcentagem {i} de um valor na prova de matemática" for i in range(distinct_questions)]
+    weights = [1 / (rank + 1) for rank in range(distinct_questions)]
+    # Respostas estruturadas (horários, FAQ, explicar_funcionalidades) repetem o mesmo texto
+    structured = [f"Resposta estruturada {i}: " + "Horário de atendimento e orientações do campus. " * 25
+                  for i in range(20)]
+    out = []
+    for question_index in rng.choices(range(distinct_questions), weights=weights, k=rows):
+        if rng.random() < structured_share:
+            answer = structured[question_index % len(structured)]
+        else:
+            answer = f"Explicação {question_index}: " + "Para calcular a porcentagem, multiplique e divida por 100. " * 10
+        out.append((questions[question_index], answer))
+    return out
+
+
+def _table_bytes(table: str) -> int | None:
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute("SELECT pg_total_relation_size(%s)", [table])
+            return cursor.fetchone()[0]
+        if connection.vendor == "sqlite":
+            try:
+                cursor.execute("SELECT coalesce(sum(pgsize), 0) FROM dbstat WHERE name = %s", [table])
+                return cursor.fetchone()[0]
+            except Exception:
+                return None
+    return None
+
+
+class Command(BaseCommand):
+    help = ("Benchmark do armazenamento de feedback: textos por linha (layout antigo, tabela temporária) x "
+            "textos deduplicados em TextContent. Mede bytes ocupados e o tempo das varreduras de similaridade. "
+            "Roda numa transação desfeita no fim: nada do que grava (nem os textos) fica no banco.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20000)
+        parser.add_argument("--distinct-questions", type=int, default=300)
+        parser.add_argument("--structured-share", type=float, default=0.4,
+                            help="Fração de respostas estruturadas (texto idêntico entre feedbacks).")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Arquivo JSON de saída.")
+
+    def handle(self, *args, **opts):
+        data = _dataset(opts["rows"], opts["distinct_questions"], opts["structured_share"], opts["seed"])
+        repeat = opts["repeat"]
+        results = {"database": connection.vendor, "rows": len(data),
+                   "distinct_texts": len({q for q, _ in data} | {a for _, a in data}),
+                   "text_bytes": sum(len(q.encode()) + len(a.encode()) for q, a in data)}
+
+        # Tudo numa transação desfeita no fim: a tabela temporária, os feedbacks e os textos do benchmark
+        # somem juntos, sem apagar textos que feedbacks reais (de outros processos) passem a usar
+        try:
+            with transaction.atomic():
+                results["inline"] = self._bench_inline(data, repeat)
+                results["deduplicated"] = self._bench_deduplicated(data, repeat)
+                transaction.set_rollback(True)
+        finally:
+            # O cache de textos conhecidos deste processo viu chaves que o rollback desfez
+            TextContentRepository.forget()
+
+        before, after = results["inline"].get("bytes"), results["deduplicated"].get("bytes")
+        if before and after:
+            results["bytes_ratio"] = round(after / before, 4)
+
+        payload = write_results("feedback_storage", results, opts.get("output"))
+        self.stdout.write(json.dumps(payload, indent=2, ensure_ascii=False))
+
+    @staticmethod
+    def _bench_inline(data, repeat: int) -> dict:
+        now = timezone.now()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {INLINE_TABLE}")
+            cursor.execute(f"""
+                CREATE TABLE {INLINE_TABLE} (
+                    id integer PRIMARY KEY, user_question text NOT NULL, bot_answer text NOT NULL,
+                    helpful boolean NULL, detected_intent varchar(80) NULL, created_at timestamp NOT NULL
+                )
+            """)
+            cursor.executemany(
+                f"INSERT INTO {INLINE_TABLE} VALUES (%s, %s, %s, %s, %s, %s)",
+                [(i + 1, q, a, False, BENCH_INTENT, now - timedelta(seconds=i)) for i, (q, a) in enumerate(data)],
+            )
+
+        def similarity():
+            # Caminho antigo: 200 linhas com o texto completo, uma comparação por linha
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT user_question FROM {INLINE_TABLE} WHERE helpful = %s "
+                               f"ORDER BY created_at DESC LIMIT 200", [False])
+                return [SequenceMatcher(None, QUERY, q.lower()).ratio() for (q,) in cursor.fetchall()]
+
+        def full_scan():
+            with connection.cursor() as cursor:
+                cursor.execute(f"SELECT user_question, bot_answer FROM {INLINE_TABLE}")
+                return sum(len(q) + len(a) for q, a in cursor.fetchall())
+
+        return {"bytes": _table_bytes(INLINE_TABLE),
+                "similarity_scan": time_call(similarity, repeat),
+                "full_scan": time_call(full_scan, max(1, repeat // 4))}
+
+    @staticmethod
+    def _bench_deduplicated(data, repeat: int) -> dict:
+        TextContentRepository.forget()
+        tables = (Feedback._meta.db_table, TextContent._meta.db_table)
+        before = [_table_bytes(t) for t in tables]
+        FeedbackRepository.bulk_insert([
+            Feedback(user_question=q, bot_answer=a, helpful=False, detected_intent=BENCH_INTENT) for q, a in data
+        ])
+        after = [_table_bytes(t) for t in tables]
+
+        service = FeedbackService()
+
+        def full_scan():
+            keys = list(Feedback.objects.filter(detected_intent=BENCH_INTENT).values_list("question_id", "answer_id"))
+            texts = TextContentRepository.get_texts(k for pair in keys for k in pair)
+            return sum(len(texts.get(q, "")) + len(texts.get(a, "")) for q, a in keys)
+
+        report = {
+            "similarity_scan": time_call(lambda: service.find_similar_negative_feedbacks(QUERY), repeat),
+            "full_scan": time_call(full_scan, max(1, repeat // 4)),
+        }
+        if None not in before and None not in after:
+            report["bytes"] = sum(after) - sum(before)
+            report["feedback_bytes"], report["text_content_bytes"] = after[0] - before[0], after[1] - before[1]
+        return report
@@ -0,0 +1,90 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from educhatbot.models import Feedback
+from educhatbot.repositories import FeedbackRepository
+from educhatbot.services import FeedbackWriterService
+
+from ._bench import summarize, write_results
+
+BENCH_INTENT = "__bench_feedback_writes__"
+
+
+def _sync_round(repository: FeedbackRepository, i: int):
+    """Caminho antigo: save() na inserção, get_by_id + save() na atualização e no consumed."""
+    feedback = Feedback(session_id=i, user_question=f"pergunta {i}", bot_answer="resposta",
+                        helpful=None, detected_intent=BENCH_INTENT)
+    repository.save(feedback)
+    feedback = repository.get_by_id(feedback.id)
+    feedback.helpful = False
+    repository.save(feedback)
+    repository.mark_consumed(feedback)
+
+
+def _write_behind_round(writer: FeedbackWriterService, i: int):
+    feedback = writer.create(session_id=i, user_question=f"pergunta {i}", bot_answer="resposta",
+                             helpful=None, detected_intent=BENCH_INTENT)
+    writer.update(feedback.id, {"helpful": False})
+    writer.mark_consumed(feedback)
+
+
+class Command(BaseCommand):
+    help = ("Benchmark de gravação de feedbacks: caminho síncrono x fila write-behind "
+            "(cada rodada = inserção + atualização + consumed).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rounds", type=int, default=2000)
+        parser.add_argument("--threads", type=int, default=4)
+        parser.add_argument("--mode", choices=["sync", "write-behind", "both"], default="both")
+        parser.add_argument("--output", help="Arquivo JSON de saída.")
+
+    def _run(self, fn, rounds: int, threads: int):
+        def one(i):
+            t = time.perf_counter()
+            fn(i)
+            return (time.perf_counter() - t) * 1000
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(one, range(rounds)))
+        return latencies, time.perf_counter() - start
+
+    def handle(self, *args, **opts):
+        rounds, threads = opts["rounds"], opts["threads"]
+        results = {"database": connection.vendor, "rounds": rounds, "threads": threads}
+
+        try:
+            if opts["mode"] in ("sync", "both"):
+                repository = FeedbackRepository()
+                latencies, elapsed = self._run(lambda i: _sync_round(repository, i), rounds, threads)
+                results["sync"] = {
+                    "caller_latency": summarize(latencies),
+                    "rounds_per_sec": round(rounds / elapsed, 1),
+                    "writes_per_sec": round(rounds * 3 / elapsed, 1),
+                }
+
+            if opts["mode"] in ("write-behind", "both"):
+                writer = FeedbackWriterService()
+                latencies, elapsed = self._run(lambda i: _write_behind_round(writer, i), rounds, threads)
+                start = time.perf_counter()
+                writer.close(timeout=120)
+                drain = time.perf_counter() - start
+                results["write_behind"] = {
+                    "caller_latency": summarize(latencies),
+                    "rounds_per_sec": round(rounds / elapsed, 1),
+                    "drain_secs": round(drain, 3),
+                    # Vazão fim a fim: até a última escrita chegar ao banco
+                    "writes_per_sec": round(rounds * 3 / (elapsed + drain), 1),
+                    # Sem sequência (ex.: sqlite) as inserções são síncronas
+                    "async_inserts": bool(FeedbackRepository.reserve_ids(1)),
+                }
+        finally:
+            deleted, _ = Feedback.objects.filter(detected_intent=BENCH_INTENT).delete()
+            results["cleaned_rows"] = deleted
+
+        payload = write_results("feedback_writes", results, opts.get("output"))
+        self.stdout.write(json.dumps(payload, indent=2, ensure_ascii=False))
@@ -0,0 +1,132 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from educhatbot.models import Feedback
+from educhatbot.repositories import FeedbackRepository, TextContentRepository
+from educhatbot.services import (
+    ChatbotService, EducationalContentService, FeedbackService, IntentBlocklistService, NLUService
+)
+
+from ._bench import time_call, write_results
+
+BENCH_INTENT = "__bench_hotpaths__"
+GROUPS = ("clean_json", "similarity", "topicos", "formatters", "history")
+
+NLU_OUTPUTS = {
+    "json_puro": '{"intent": "buscar_conteudo_disciplina", "entities": {"disciplina": "matemática"}}',
+    "bloco_markdown": '```json\n{"intent": "aprofundar_topico", "entities": {"topico": "porcentagem"}}\n```',
+    "texto_em_volta": 'Claro! Segue a análise:\n{"intent": "saudacao", "entities": {}}\nEspero ter ajudado.',
+    "sem_json": "Não consegui identificar a intenção da mensagem.",
+    "json_grande": json.dumps({"intent": "modo_generativo", "entities": {f"k{i}": "v" * 40 for i in range(200)}}),
+    "texto_longo_sem_json": "palavra " * 5000,
+}
+
+
+def _topicos(n: int) -> dict:
+    return {"disciplina": "Matemática", "topicos": [
+        {"id": f"t{i}", "titulo": f"Tópico {i}", "resumo": "Resumo do tópico " * 5, "exemplo": "Ex.: 2 + 2 = 4"}
+        for i in range(n)
+    ]}
+
+
+def _payloads(n: int) -> dict:
+    local = {"local": "Biblioteca", "campus": "São Leopoldo"}
+    return {
+        "locais": {"campi": [
+            {"campus": f"Campus {c}", "locais": [{"id": f"l{i}", "nome": f"Local {i}"} for i in range(n)]}
+            for c in range(10)
+        ]},
+        "horarios": {**local, "descricao_curta": "Empréstimo, estudo e pesquisa.",
+                     "horarios": {"segunda_sexta": "08:00 às 21:30", "sabado": "09:00 às 13:00", "domingo": "Fechado"},
+                     "observacoes_acessibilidade": [f"Observação {i} " * 3 for i in range(n)]},
+        "faq": {**local, "faq": [{"pergunta": f"Pergunta {i}?", "resposta_simplificada": "Resposta " * 8} for i in range(n)]},
+        "contatos": {**local, "email": "biblioteca@unisinos.br", "telefone": "(51) 3591-1122", "site": "https://x",
+                     "endereco": "Av. Unisinos, 950", "mapa_url": "https://maps",
+                     "acessibilidade": [f"Item {i}" for i in range(n)]},
+    }
+
+
+def _history(n: int) -> list:
+    return [{"role": "user" if i % 2 == 0 else "bot", "text": f"Mensagem {i} " + "texto " * 30} for i in range(n)]
+
+
+class Command(BaseCommand):
+    help = ("Micro-benchmarks offline dos caminhos Python puros do chat: limpeza do JSON do NLU, similaridade "
+            "de feedbacks, resumo de tópicos, formatadores e montagem do histórico.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=500)
+        parser.add_argument("--only", default=",".join(GROUPS), help=f"Grupos separados por vírgula: {', '.join(GROUPS)}.")
+        parser.add_argument("--feedback-sizes", default="100,1000,5000",
+                            help="Quantidade de feedbacks negativos na tabela para os testes de similaridade.")
+        parser.add_argument("--output", help="Arquivo JSON de saída.")
+
+    def handle(self, *args, **opts):
+        repeat = opts["repeat"]
+        groups = [g.strip() for g in opts["only"].split(",") if g.strip()]
+        results = {}
+
+        if "clean_json" in groups:
+            results["clean_json"] = {
+                name: time_call(lambda: NLUService._clean_json_response(text), repeat)
+                for name, text in NLU_OUTPUTS.items()
+            }
+
+        if "topicos" in groups:
+            results["topicos"] = {}
+            for n in (3, 50, 500):
+                payload = _topicos(n)
+                results["topicos"][f"normalizar_topicos_{n}"] = time_call(
+                    lambda: EducationalContentService.normalizar_topicos(payload), repeat)
+
+        if "formatters" in groups:
+            results["formatters"] = {}
+            for n in (10, 200, 2000):
+                for name, data in _payloads(n).items():
+                    fn = getattr(ChatbotService, f"_formatar_{name}")
+                    results["formatters"][f"{name}_{n}"] = time_call(lambda: fn(data), repeat)
+
+        if "history" in groups:
+            results["history"] = {}
+            for n in (0, 10, 100, 1000):
+                messages = _history(n)
+                results["history"][f"last_messages_{n}"] = time_call(
+                    lambda: ChatbotService._build_history_text(messages), repeat)
+
+        if "similarity" in groups:
+            results["similarity"] = self._bench_similarity(
+                [int(s) for s in opts["feedback_sizes"].split(",")], max(1, repeat // 10))
+
+        payload = write_results("hotpaths", results, opts.get("output"))
+        self.stdout.write(json.dumps(payload, indent=2, ensure_ascii=False))
+
+    def _bench_similarity(self, sizes: list[int], repeat: int) -> dict:
+        service = FeedbackService()
+        blocklist = IntentBlocklistService()  # sem start(): só as chamadas medidas leem o banco
+        query = "como calcular porcentagem de desconto"
+        out = {}
+        inserted = 0
+        # Feedbacks sintéticos numa transação desfeita no fim: os workers em produção (blocklist,
+        # recuperação por feedback, rollups) nunca enxergam as linhas do benchmark
+        try:
+            with transaction.atomic():
+                for size in sorted(sizes):
+                    FeedbackRepository.bulk_insert([
+                        Feedback(user_question=f"como calcular porcentagem {i} de um valor", bot_answer="resposta",
+                                 helpful=False, detected_intent=BENCH_INTENT)
+                        for i in range(inserted, size)
+                    ])
+                    inserted = max(inserted, size)
+                    out[f"rows_{size}"] = {
+                        "find_similar_negative_feedbacks": time_call(
+                            lambda: service.find_similar_negative_feedbacks(query), repeat),
+                        "intent_blocklist_rebuild": time_call(blocklist.rebuild, repeat),
+                        "intent_blocklist_lookup": time_call(lambda: blocklist.lookup(query), repeat),
+                    }
+                transaction.set_rollback(True)
+        finally:
+            # O cache de textos conhecidos deste processo viu chaves que o rollback desfez
+            TextContentRepository.forget()
+        return out
@@ -0,0 +1,87 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from educhatbot.services import EducationalContentService, RetrievalService
+from educhatbot.services.retrieval_service import RETRIEVAL_ANSWER_THRESHOLD, RetrievalDocument
+
+from ._bench import summarize, write_results
+
+
+def _synthetic_documents(n: int, seed: int = 7) -> list[RetrievalDocument]:
+    rng = random.Random(seed)
+    words = [f"termo{i}" for i in range(4000)]
+    docs = []
+    for i in range(n):
+        title = " ".join(rng.sample(words, 6))
+        body = " ".join(rng.sample(words, 30))
+        docs.append(RetrievalDocument(f"syn:{i}", "faq", title, f"{title} {title} {body}", body, body))
+    return docs
+
+
+def _queries(docs: list[RetrievalDocument], seed: int = 7) -> list[tuple[str, str]]:
+    """(consulta, doc esperado): a pergunta original e duas variações (sem uma palavra, com ruído)."""
+    rng = random.Random(seed)
+    out = []
+    for d in docs:
+        words = d.title.split()
+        out.append((d.title, d.doc_id))
+        if len(words) > 2:
+            dropped = words[:]
+            dropped.pop(rng.randrange(len(dropped)))
+            out.append((" ".join(dropped), d.doc_id))
+        out.append((f"me diz uma coisa: {d.title.lower()} ?", d.doc_id))
+    return out
+
+
+class Command(BaseCommand):
+    help = "Benchmark de latência e recall da recuperação local (TF-IDF) sobre FAQ/aprofundamento."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--synthetic", type=int, default=0,
+                            help="Usa N documentos sintéticos em vez da API de conteúdos.")
+        parser.add_argument("--k", type=int, default=3)
+        parser.add_argument("--output", help="Arquivo JSON de saída.")
+
+    def handle(self, *args, **opts):
+        service = RetrievalService(EducationalContentService())
+
+        start = time.perf_counter()
+        docs = _synthetic_documents(opts["synthetic"]) if opts["synthetic"] else service.collect_documents()
+        collect_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        service.build(docs)
+        build_ms = (time.perf_counter() - start) * 1000
+
+        queries = _queries(docs)
+        latencies, hits_at_1, hits_at_k, answered, answered_correct = [], 0, 0, 0, 0
+        for query, expected in queries:
+            t = time.perf_counter()
+            hits = service.search(query, k=opts["k"])
+            latencies.append((time.perf_counter() - t) * 1000)
+
+            ids = [h.document.doc_id for h in hits]
+            hits_at_1 += bool(ids and ids[0] == expected)
+            hits_at_k += expected in ids
+            if hits and hits[0].score >= RETRIEVAL_ANSWER_THRESHOLD:
+                answered += 1
+                answered_correct += ids[0] == expected
+
+        n = len(queries) or 1
+        results = {
+            "documents": len(docs),
+            "vocabulary": len(service._index.vocabulary),
+            "collect_ms": round(collect_ms, 2),
+            "build_ms": round(build_ms, 2),
+            "search_latency": summarize(latencies),
+            "queries": len(queries),
+            "recall_at_1": round(hits_at_1 / n, 4),
+            f"recall_at_{opts['k']}": round(hits_at_k / n, 4),
+            "answered_rate": round(answered / n, 4),
+            "answered_precision": round(answered_correct / answered, 4) if answered else None,
+        }
+        payload = write_results("retrieval", results, opts.get("output"))
+        self.stdout.write(json.dumps(payload, indent=2, ensure_ascii=False))
@@ -0,0 +1,44 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from ._bench import summarize, write_results
+
+
+class Command(BaseCommand):
+    help = "Mede o tempo de inicialização: importação a frio de config.wsgi e duração do warmup."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5, help="Quantidade de importações a frio.")
+        parser.add_argument("--module", default="config.wsgi", help="Módulo importado em cada processo novo.")
+        parser.add_argument("--skip-warmup", action="store_true", help="Não executa o warmup no processo atual.")
+        parser.add_argument("--output", help="Arquivo JSON de saída.")
+
+    def handle(self, *args, **opts):
+        env = {**os.environ, "WARMUP_ON_STARTUP": ""}
+        code = f"import time; t=time.perf_counter(); import {opts['module']}; print((time.perf_counter()-t)*1000)"
+
+        samples = []
+        for _ in range(opts["runs"]):
+            start = time.perf_counter()
+            out = subprocess.run([sys.executable, "-c", code], cwd=settings.BASE_DIR, env=env,
+                                 capture_output=True, text=True, check=True)
+            wall_ms = (time.perf_counter() - start) * 1000
+            samples.append((float(out.stdout.strip().splitlines()[-1]), wall_ms))
+
+        results = {
+            "cold_import": summarize([s[0] for s in samples]),
+            "process_wall": summarize([s[1] for s in samples]),
+        }
+
+        if not opts["skip_warmup"]:
+            from educhatbot.runtime import warmup
+            results["warmup"] = warmup()
+
+        payload = write_results("startup", results, opts.get("output"))
+        self.stdout.write(json.dumps(payload, indent=2, ensure_ascii=False))
@@ -0,0 +1,119 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from educhatbot.core import FakeLLMBackend, ModelRouter, metrics
+from educhatbot.services import ChatbotService
+from educhatbot.services.chatbot_service import PIPELINE_MODES
+
+from ._bench import summarize, write_results
+
+# (mensagem, intent que o LLM simulado devolve)
+GENERATIVE_MESSAGES = [
+    ("Oi, tudo bem?", "saudacao"),
+    ("Me conta uma curiosidade sobre o espaço", "modo_generativo"),
+    ("Qual a diferença entre vírus e bactéria?", "modo_generativo"),
+    ("Você acha que vai chover amanhã?", "desconhecido"),
+]
+STRUCTURED_MESSAGES = [
+    ("Como você funciona?", "explicar_funcionalidades"),
+]
+
+
+def scripted_responder(script: dict):
+    """Responde como o Gemini responderia às mensagens do roteiro (JSON do NLU/combinado ou texto)."""
+    def respond(prompt, model, generation_config, system_instruction):
+        if (generation_config or {}).get("response_mime_type") != "application/json":
+            return "Resposta gerada para o teste de carga. [Buscar no site da Unisinos](https://www.unisinos.br)"
+        intent = next((i for msg, i in script.items() if f'"{msg}"' in prompt), "desconhecido")
+        result = {"intent": intent, "entities": {}}
+        if "MODO COMBINADO" in prompt:
+            result["answer"] = "" if intent == "explicar_funcionalidades" else "Rascunho do teste de carga."
+        return json.dumps(result, ensure_ascii=False)
+    return respond
+
+
+class Command(BaseCommand):
+    help = ("Teste de carga do ChatbotService em processo, comparando os modos de pipeline "
+            "(CHAT_PIPELINE_MODE). Por padrão usa um LLM simulado com latência configurável.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--modes", default=",".join(PIPELINE_MODES))
+        parser.add_argument("--turns", type=int, default=400)
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--generative-share", type=float, default=0.7,
+                            help="Fração das mensagens que terminam em intents não estruturadas.")
+        parser.add_argument("--provider", choices=["fake", "env"], default="fake",
+                            help="fake: LLM simulado; env: o backend configurado (LLM_PROVIDER), com custo real.")
+        parser.add_argument("--nlu-latency-ms", type=float, default=400.0)
+        parser.add_argument("--generative-latency-ms", type=float, default=1200.0)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Arquivo JSON de saída.")
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts["seed"])
+        turns = [
+            rng.choice(GENERATIVE_MESSAGES if rng.random() < opts["generative_share"] else STRUCTURED_MESSAGES)[0]
+            for _ in range(opts["turns"])
+        ]
+        script = dict(GENERATIVE_MESSAGES + STRUCTURED_MESSAGES)
+        results = {"turns": len(turns), "concurrency": opts["concurrency"], "provider": opts["provider"],
+                   "generative_share": opts["generative_share"]}
+
+        for mode in [m.strip() for m in opts["modes"].split(",") if m.strip()]:
+            backend, router = None, None
+            if opts["provider"] == "fake":
+                backend = FakeLLMBackend(scripted_responder(script), latency_ms={
+                    "fake-nlu": opts["nlu_latency_ms"], "fake-generative": opts["generative_latency_ms"]})
+                router = ModelRouter(backend, nlu_model="fake-nlu", generative_model="fake-generative",
+                                     fast_model="fake-nlu", hedge_enabled=False)
+            service = ChatbotService(pipeline_mode=mode, router=router)
+            metrics.reset()
+            results[mode] = self._run(service, turns, opts["concurrency"], backend)
+            if mode == "speculative":
+                results[mode]["speculation"] = self._speculation_report(service)
+
+        payload = write_results("loadtest_chat", results, opts.get("output"))
+        self.stdout.write(json.dumps(payload, indent=2, ensure_ascii=False))
+
+    @staticmethod
+    def _speculation_report(service: ChatbotService) -> dict:
+        # Espera as gerações descartadas terminarem para contar os tokens desperdiçados
+        service.speculation_service._executor.shutdown(wait=True)
+        report = {outcome: metrics.counter_value("speculation_total", {"outcome": outcome})
+                  for outcome in ("used", "cancelled", "discarded")}
+        report["started"] = sum(metrics.counter_value("speculation_total", {"outcome": "started", "class": label})
+                                for label in ("saudacao", "estruturada", "topico", "livre"))
+        report["skipped"] = sum(metrics.counter_value("speculation_total", {"outcome": "skipped", "reason": reason})
+                                for reason in ("low_probability", "saturated"))
+        report["wasted_tokens"] = metrics.counter_value("speculation_wasted_tokens_total")
+        report["latency_saved_ms_total"] = round(metrics.counter_value("speculation_latency_saved_ms_total"), 1)
+        return report
+
+    def _run(self, service: ChatbotService, turns: list[str], concurrency: int, backend: FakeLLMBackend | None):
+        intents = {}
+
+        def one(message):
+            t = time.perf_counter()
+            result = service.get_response(message)
+            return (time.perf_counter() - t) * 1000, result["intent"]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(one, turns))
+        elapsed = time.perf_counter() - start
+
+        for _, intent in outcomes:
+            intents[intent] = intents.get(intent, 0) + 1
+        out = {
+            "latency": summarize([ms for ms, _ in outcomes]),
+            "turns_per_sec": round(len(turns) / elapsed, 2),
+            "intents": intents,
+        }
+        if backend is not None:
+            out["llm_calls_per_turn"] = round(backend.calls / len(turns), 3)
+            out["prompt_chars_per_turn"] = round(backend.prompt_chars / len(turns), 1)
+        return out
@@ -0,0 +1,93 @@
+from datetime import date
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from educhatbot.core import _env
+from educhatbot.repositories import FeedbackPartitionRepository, TextContentRepository
+from educhatbot.repositories.feedback_partition_repository import add_months
+
+PARTITIONS_AHEAD = _env("FEEDBACK_PARTITIONS_AHEAD", 3, int)
+RETENTION_MONTHS = _env("FEEDBACK_RETENTION_MONTHS", 12, int)
+ARCHIVE_DIR = _env("FEEDBACK_ARCHIVE_DIR", "archive/feedback")
+
+
+class Command(BaseCommand):
+    help = (
+        "Mantém as partições mensais de feedback: cria as dos próximos meses e, pela política de "
+        "retenção, destaca as antigas, exporta para NDJSON.gz e remove, junto com os textos que ficaram "
+        "sem feedback. Rode diariamente (cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ahead", type=int, default=PARTITIONS_AHEAD,
+                            help="Quantos meses à frente devem ter partição.")
+        parser.add_argument("--retention-months", type=int, default=RETENTION_MONTHS,
+                            help="Meses mantidos no banco (0 desliga a retenção).")
+        parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+        parser.add_argument("--keep-detached", action="store_true",
+                            help="Exporta, mas mantém a tabela destacada no banco.")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **opts):
+        repository = FeedbackPartitionRepository()
+        if not repository.is_supported():
+            raise CommandError("A tabela de feedback não é particionada (requer PostgreSQL e a migração 0009).")
+
+        today = date.today().replace(day=1)
+        existing = {p.month: p for p in repository.list_partitions()}
+
+        for i in range(opts["ahead"] + 1):
+            month = add_months(today, i)
+            if month in existing:
+                continue
+            if opts["dry_run"]:
+                self.stdout.write(f"[dry-run] criaria {repository.partition_name(month)}")
+                continue
+            try:
+                name = repository.create_partition(month)
+                self.stdout.write(self.style.SUCCESS(f"Partição criada: {name}"))
+            except Exception as e:
+                # Ex.: a partição DEFAULT já recebeu linhas deste mês
+                self.stderr.write(f"Falha ao criar partição de {month:%Y-%m}: {e}")
+
+        if opts["retention_months"] <= 0:
+            return
+
+        cutoff = add_months(today, -opts["retention_months"])
+        archive_dir = Path(opts["archive_dir"])
+        dropped = 0
+        for partition in sorted(existing.values(), key=lambda p: p.month):
+            if partition.upper > cutoff:
+                continue
+            if opts["dry_run"]:
+                self.stdout.write(f"[dry-run] arquivaria {partition.name}")
+                continue
+
+            if partition.attached:
+                repository.detach_partition(partition)
+                self.stdout.write(f"Partição destacada: {partition.name}")
+
+            # A exportação grava num .tmp e só renomeia no fim: se o arquivo existe, está completo
+            path = archive_dir / f"{partition.name}.ndjson.gz"
+            if not path.exists():
+                with transaction.atomic():
+                    exported = repository.export_partition(partition, path)
+                expected = repository.count_rows(partition)
+                if exported != expected:
+                    path.unlink()
+                    raise CommandError(f"{partition.name}: exportadas {exported} de {expected} linhas; tabela mantida.")
+                self.stdout.write(self.style.SUCCESS(f"{partition.name}: {exported} linhas em {path}"))
+
+            if not opts["keep_detached"]:
+                repository.drop_partition(partition)
+                dropped += 1
+                self.stdout.write(f"Tabela removida: {partition.name}")
+
+        # Os textos deduplicados só apontados pelas partições removidas (o arquivo NDJSON já os traz na linha).
+        # Com --keep-detached as tabelas destacadas ainda referenciam os textos: a limpeza espera a remoção
+        if dropped:
+            with transaction.atomic():
+                removed = TextContentRepository.delete_orphans()
+            self.stdout.write(self.style.SUCCESS(f"Textos sem feedback removidos: {removed}"))
@@ -0,0 +1,42 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from educhatbot.runtime import get_chatbot_service
+from educhatbot.services.precomputed_answer_service import (
+    PRECOMPUTE_CONCURRENCY, PRECOMPUTE_LOOKBACK_DAYS, PRECOMPUTE_MIN_HELPFUL_RATE, PRECOMPUTE_MIN_RATED,
+    PRECOMPUTE_MIN_VOLUME, PRECOMPUTE_REFRESH_AFTER_HOURS, PRECOMPUTE_TOP_N
+)
+
+
+class Command(BaseCommand):
+    help = ("Pré-calcula as respostas das perguntas mais frequentes: agrupa as perguntas dos feedbacks "
+            "recentes, escolhe os --top-n grupos por volume com boa avaliação e gera (ou refaz as velhas) "
+            "com --concurrency chamadas simultâneas. Rode à noite (cron), fora do pico.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top-n", type=int, default=PRECOMPUTE_TOP_N)
+        parser.add_argument("--lookback-days", type=int, default=PRECOMPUTE_LOOKBACK_DAYS)
+        parser.add_argument("--concurrency", type=int, default=PRECOMPUTE_CONCURRENCY)
+        parser.add_argument("--refresh-after-hours", type=float, default=PRECOMPUTE_REFRESH_AFTER_HOURS,
+                            help="Respostas mais velhas que isto são geradas de novo.")
+        parser.add_argument("--min-volume", type=int, default=PRECOMPUTE_MIN_VOLUME)
+        parser.add_argument("--min-rated", type=int, default=PRECOMPUTE_MIN_RATED)
+        parser.add_argument("--min-helpful-rate", type=float, default=PRECOMPUTE_MIN_HELPFUL_RATE)
+        parser.add_argument("--dry-run", action="store_true", help="Só mostra os grupos escolhidos, sem gerar.")
+
+    def handle(self, *args, **opts):
+        chatbot = get_chatbot_service()
+        if not opts["dry_run"]:
+            # Mesmo contexto do chat: trechos da recuperação local (sem ele, gera sem contexto)
+            try:
+                chatbot.retrieval_service.refresh()
+            except Exception as e:
+                self.stderr.write(f"Índice de recuperação indisponível ({e}); gerando sem contexto.")
+
+        result = chatbot.precomputed_answer_service.precompute(
+            top_n=opts["top_n"], lookback_days=opts["lookback_days"], concurrency=opts["concurrency"],
+            refresh_after_hours=opts["refresh_after_hours"], dry_run=opts["dry_run"],
+            min_volume=opts["min_volume"], min_rated=opts["min_rated"], min_helpful_rate=opts["min_helpful_rate"],
+        )
+        self.stdout.write(json.dumps(result, indent=2, ensure_ascii=False))
@@ -0,0 +1,20 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from educhatbot.services import FeedbackRollupService
+from educhatbot.services.feedback_rollup_service import FEEDBACK_ROLLUP_LOOKBACK_HOURS
+
+
+class Command(BaseCommand):
+    help = ("Atualiza os agregados de feedback (FeedbackRollup) por upsert: recalcula as últimas "
+            "--lookback-hours horas (a partir da meia-noite). Rode a cada poucos minutos (cron).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lookback-hours", type=int, default=FEEDBACK_ROLLUP_LOOKBACK_HOURS)
+        parser.add_argument("--full", action="store_true",
+                            help="Recalcula todo o histórico (carga inicial ou depois de mudar as faixas).")
+
+    def handle(self, *args, **opts):
+        result = FeedbackRollupService(lookback_hours=opts["lookback_hours"]).refresh(full=opts["full"])
+        self.stdout.write(json.dumps(result, ensure_ascii=False))
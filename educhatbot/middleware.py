@@ -0,0 +1,67 @@
+import hmac
+import logging
+import random
+
+from .core import _env, metrics
+from .core.profiling import ProfileSession, ProfileStore
+
+logger = logging.getLogger(__name__)
+
+PROFILING_SECRET = _env("PROFILING_SECRET", "")
+PROFILING_SAMPLE_RATE = _env("PROFILING_SAMPLE_RATE", 0.0, float)
+PROFILING_MODE = _env("PROFILING_MODE", "cprofile")
+PROFILING_PATHS = tuple(p.strip() for p in _env("PROFILING_PATHS", "/api/chat").split(",") if p.strip())
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+PROFILE_MODE_HEADER = "HTTP_X_PROFILE_MODE"
+
+
+def has_profiling_secret(request) -> bool:
+    """Compara o cabeçalho X-Profile com PROFILING_SECRET (vazio = desabilitado)."""
+    provided = request.META.get(PROFILE_HEADER, "")
+    return bool(PROFILING_SECRET) and bool(provided) and hmac.compare_digest(provided, PROFILING_SECRET)
+
+
+class ProfilingMiddleware:
+    """
+    Profiling sob demanda dos pedidos em PROFILING_PATHS (padrão: /api/chat).
+
+    Ativa com o cabeçalho `X-Profile: <PROFILING_SECRET>` (modo opcional em `X-Profile-Mode`:
+    cprofile ou sampler) ou por amostragem (PROFILING_SAMPLE_RATE). Grava o pstats (ou as
+    pilhas do amostrador), as consultas SQL e as etapas do ChatbotService no ProfileStore e
+    devolve o id do artefato no cabeçalho `X-Profile-Id`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.store = ProfileStore()
+
+    def _trigger(self, request) -> str | None:
+        if not request.path.startswith(PROFILING_PATHS):
+            return None
+        if has_profiling_secret(request):
+            return "header"
+        if PROFILING_SAMPLE_RATE > 0 and random.random() < PROFILING_SAMPLE_RATE:
+            return "sample"
+        return None
+
+    def __call__(self, request):
+        trigger = self._trigger(request)
+        if trigger is None:
+            return self.get_response(request)
+
+        mode = PROFILING_MODE
+        if trigger == "header" and request.META.get(PROFILE_MODE_HEADER) in ("cprofile", "sampler"):
+            mode = request.META[PROFILE_MODE_HEADER]
+
+        with ProfileSession(mode=mode, trigger=trigger) as session:
+            response = self.get_response(request)
+
+        try:
+            summary = session.summary(method=request.method, path=request.path, status=response.status_code)
+            self.store.save(session, summary)
+            response["X-Profile-Id"] = session.id
+        except Exception as e:
+            metrics.inc("profiles_failed_total")
+            logger.warning(f"Falha ao salvar profiling {session.id}: {e}")
+        return response
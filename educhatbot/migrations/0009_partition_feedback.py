@@ -0,0 +1,119 @@
+"""
+Converte educhatbot_feedback numa tabela particionada por mês em created_at (PostgreSQL).
+
+A tabela atual é renomeada, a nova é criada com PARTITION BY RANGE (created_at),
+recebe partições mensais do primeiro registro até alguns meses à frente (mais uma
+partição DEFAULT de segurança) e os dados são copiados. A chave primária passa a ser
+(id, created_at), exigência do particionamento; o id continua vindo de uma sequência.
+
+Em outros bancos (ex.: sqlite em desenvolvimento) a migração não faz nada.
+As partições seguintes são criadas pelo comando `manage_feedback_partitions`.
+"""
+from datetime import date
+
+from django.db import migrations
+
+TABLE = "educhatbot_feedback"
+LEGACY = "educhatbot_feedback_legacy"
+SEQUENCE = "educhatbot_feedback_id_seq"
+MONTHS_AHEAD = 3
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"SELECT min(created_at)::date, max(id) FROM {TABLE}")
+        first_day, max_id = cursor.fetchone()
+
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}")
+        cursor.execute(f"ALTER TABLE {LEGACY} RENAME CONSTRAINT {TABLE}_pkey TO {LEGACY}_pkey")
+        # A sequência (identity/serial) da tabela antiga libera o nome para a nova
+        cursor.execute(f"SELECT pg_get_serial_sequence('{LEGACY}', 'id')")
+        legacy_sequence = cursor.fetchone()[0]
+        if legacy_sequence:
+            cursor.execute(f"ALTER SEQUENCE {legacy_sequence} RENAME TO {LEGACY}_id_seq")
+        cursor.execute(f"CREATE SEQUENCE {SEQUENCE}")
+        cursor.execute(f"""
+            CREATE TABLE {TABLE} (
+                id bigint NOT NULL DEFAULT nextval('{SEQUENCE}'),
+                user_question text NOT NULL,
+                bot_answer text NOT NULL,
+                helpful boolean NULL,
+                created_at timestamp with time zone NOT NULL,
+                session_id bigint NULL,
+                consumed boolean NOT NULL,
+                detected_intent varchar(80) NULL,
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at)
+        """)
+        cursor.execute(f"ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id")
+        cursor.execute(f"CREATE INDEX {TABLE}_session_created_idx ON {TABLE} (session_id, created_at DESC)")
+        cursor.execute(f"CREATE INDEX {TABLE}_created_idx ON {TABLE} (created_at DESC)")
+
+        today = date.today().replace(day=1)
+        month = (first_day or today).replace(day=1)
+        while month <= _add_months(today, MONTHS_AHEAD):
+            upper = _add_months(month, 1)
+            cursor.execute(
+                f"CREATE TABLE {TABLE}_p{month:%Y_%m} PARTITION OF {TABLE} "
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+            )
+            month = upper
+        cursor.execute(f"CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT")
+
+        cursor.execute(f"""
+            INSERT INTO {TABLE} (id, user_question, bot_answer, helpful, created_at, session_id, consumed, detected_intent)
+            SELECT id, user_question, bot_answer, helpful, created_at, session_id, consumed, detected_intent
+            FROM {LEGACY}
+        """)
+        cursor.execute(f"SELECT setval('{SEQUENCE}', %s, %s)", [max_id or 1, max_id is not None])
+        cursor.execute(f"DROP TABLE {LEGACY}")
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {TABLE} RENAME TO {LEGACY}")
+        cursor.execute(f"ALTER TABLE {LEGACY} RENAME CONSTRAINT {TABLE}_pkey TO {LEGACY}_pkey")
+        cursor.execute(f"ALTER SEQUENCE {SEQUENCE} RENAME TO {LEGACY}_id_seq")
+        cursor.execute(f"""
+            CREATE TABLE {TABLE} (
+                id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+                user_question text NOT NULL,
+                bot_answer text NOT NULL,
+                helpful boolean NULL,
+                created_at timestamp with time zone NOT NULL,
+                session_id bigint NULL,
+                consumed boolean NOT NULL,
+                detected_intent varchar(80) NULL
+            )
+        """)
+        cursor.execute(f"""
+            INSERT INTO {TABLE} (id, user_question, bot_answer, helpful, created_at, session_id, consumed, detected_intent)
+            SELECT id, user_question, bot_answer, helpful, created_at, session_id, consumed, detected_intent
+            FROM {LEGACY}
+        """)
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), coalesce(max(id), 1), max(id) IS NOT NULL) FROM {TABLE}"
+        )
+        cursor.execute(f"DROP TABLE {LEGACY} CASCADE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educhatbot', '0008_alter_feedback_bot_answer_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,97 @@
+"""
+Cria a tabela de textos deduplicados (TextContent) e as referências question/answer do Feedback,
+preenchidas a partir de user_question/bot_answer. As colunas antigas saem na 0011, numa transação
+separada (no PostgreSQL, ALTER TABLE depois de UPDATE com FK adiada falha na mesma transação).
+
+A chave de cada texto são os 16 primeiros bytes do sha256 do texto em UTF-8 — a mesma conta de
+TextContent.key_for —, feita no próprio banco no PostgreSQL e em Python nos outros bancos.
+Textos vazios viram referência nula.
+"""
+import hashlib
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+TABLE = "educhatbot_feedback"
+TEXTS = "educhatbot_textcontent"
+BATCH = 2000
+COLUMNS = (("user_question", "question_id"), ("bot_answer", "answer_id"))
+
+
+def _key(text: str) -> uuid.UUID:
+    return uuid.UUID(bytes=hashlib.sha256(text.encode("utf-8")).digest()[:16])
+
+
+def _pg_key(column: str) -> str:
+    return f"encode(substring(sha256(convert_to({column}, 'UTF8')) from 1 for 16), 'hex')::uuid"
+
+
+def forwards(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            for text_column, key_column in COLUMNS:
+                cursor.execute(f"""
+                    INSERT INTO {TEXTS} (id, text)
+                    SELECT DISTINCT {_pg_key(text_column)}, {text_column}
+                    FROM {TABLE} WHERE {text_column} <> ''
+                    ON CONFLICT DO NOTHING
+                """)
+                cursor.execute(f"UPDATE {TABLE} SET {key_column} = {_pg_key(text_column)} WHERE {text_column} <> ''")
+        return
+
+    Feedback = apps.get_model("educhatbot", "Feedback")
+    TextContent = apps.get_model("educhatbot", "TextContent")
+    rows = Feedback.objects.values_list("id", "user_question", "bot_answer").order_by("id")
+    last = 0
+    while batch := list(rows.filter(id__gt=last)[:BATCH]):
+        texts, updates = {}, []
+        for pk, question, answer in batch:
+            fields = {}
+            for name, text in (("question", question), ("answer", answer)):
+                if text:
+                    fields[f"{name}_id"] = _key(text)
+                    texts[fields[f"{name}_id"]] = TextContent(id=fields[f"{name}_id"], text=text)
+            if fields:
+                updates.append(Feedback(id=pk, **fields))
+        TextContent.objects.bulk_create(list(texts.values()), ignore_conflicts=True)
+        Feedback.objects.bulk_update(updates, ["question", "answer"])
+        last = batch[-1][0]
+
+
+def backwards(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        for text_column, key_column in COLUMNS:
+            cursor.execute(f"""
+                UPDATE {TABLE} SET {text_column} = (SELECT t.text FROM {TEXTS} t WHERE t.id = {TABLE}.{key_column})
+                WHERE {key_column} IS NOT NULL
+            """)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educhatbot', '0009_partition_feedback'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TextContent',
+            fields=[
+                ('id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('text', models.TextField(help_text='Texto completo (pergunta do usuário ou resposta do bot).', max_length=8000)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='feedback',
+            name='question',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Pergunta do usuário no momento do feedback (texto deduplicado; vazio = nulo).', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='educhatbot.textcontent'),
+        ),
+        migrations.AddField(
+            model_name='feedback',
+            name='answer',
+            field=models.ForeignKey(blank=True, db_index=False, help_text='Resposta do bot que foi avaliada (texto deduplicado; vazio = nulo).', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='educhatbot.textcontent'),
+        ),
+        migrations.RunPython(forwards, backwards),
+    ]
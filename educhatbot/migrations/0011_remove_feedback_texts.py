@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educhatbot', '0010_textcontent'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='feedback',
+            name='user_question',
+        ),
+        migrations.RemoveField(
+            model_name='feedback',
+            name='bot_answer',
+        ),
+    ]
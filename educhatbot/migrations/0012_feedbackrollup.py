@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educhatbot', '0011_remove_feedback_texts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedbackRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('hour', 'Hora'), ('day', 'Dia')], max_length=5)),
+                ('bucket_start', models.DateTimeField(help_text='Início do período (hora ou dia, no fuso do servidor).')),
+                ('dimension', models.CharField(choices=[('intent', 'Intent detectada'), ('path', 'Caminho da resposta'), ('session_length', 'Tamanho da sessão')], max_length=20)),
+                ('key', models.CharField(help_text="Valor da dimensão (ex.: nome da intent, 'generativo', '4-7').", max_length=80)),
+                ('helpful', models.PositiveIntegerField(default=0)),
+                ('unhelpful', models.PositiveIntegerField(default=0)),
+                ('unrated', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(help_text='Última atualização (usada para remover chaves que sumiram do período).')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('granularity', 'dimension', 'bucket_start', 'key'), name='feedback_rollup_bucket_uniq')],
+            },
+        ),
+    ]
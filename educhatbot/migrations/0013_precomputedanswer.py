@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('educhatbot', '0012_feedbackrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecomputedAnswer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cluster_key', models.CharField(help_text='Assinatura das perguntas do grupo (palavras relevantes, ordenadas).', max_length=255, unique=True)),
+                ('question', models.TextField(help_text='Variante mais frequente da pergunta (usada no prompt).')),
+                ('answer', models.TextField()),
+                ('volume', models.PositiveIntegerField(default=0, help_text='Feedbacks do grupo no período analisado.')),
+                ('helpful_rate', models.FloatField(blank=True, null=True)),
+                ('max_output_tokens', models.PositiveIntegerField(help_text='Teto de saída usado na geração.')),
+                ('generated_at', models.DateTimeField(help_text='Quando a resposta foi gerada (idade = defasagem).')),
+                ('updated_at', models.DateTimeField(help_text='Última rodada que selecionou o grupo.')),
+            ],
+        ),
+    ]
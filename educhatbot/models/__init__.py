@@ -1 +1,4 @@
-from .feedback_model import Feedback
\ No newline at end of file
+from .feedback_model import TEXT_FIELDS, Feedback
+from .feedback_rollup_model import FeedbackRollup
+from .precomputed_answer_model import PrecomputedAnswer
+from .text_content_model import TextContent
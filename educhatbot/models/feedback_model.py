@@ -1,13 +1,25 @@
 from operator import truediv
 
 from django.db import models
+from django.utils import timezone
+
+from .text_content_model import TextContent
+
+# Propriedade de texto -> chave estrangeira que guarda o texto deduplicado
+TEXT_FIELDS = {"user_question": "question", "bot_answer": "answer"}
 
 
 class Feedback(models.Model):
     id = models.BigAutoField(primary_key=True)
     session_id = models.BigIntegerField(null=True, blank=True, help_text="ID da sessão no momento do feedback (opcional).")
-    user_question = models.TextField(default='', blank=True, max_length=8000, help_text="Pergunta do usuário no momento do feedback.")
-    bot_answer = models.TextField(default='', blank=True, max_length=8000, help_text="Resposta do bot que foi avaliada.")
+    question = models.ForeignKey(
+        TextContent, on_delete=models.PROTECT, null=True, blank=True, related_name="+", db_index=False,
+        help_text="Pergunta do usuário no momento do feedback (texto deduplicado; vazio = nulo)."
+    )
+    answer = models.ForeignKey(
+        TextContent, on_delete=models.PROTECT, null=True, blank=True, related_name="+", db_index=False,
+        help_text="Resposta do bot que foi avaliada (texto deduplicado; vazio = nulo)."
+    )
     helpful = models.BooleanField(blank=True, null=True, help_text="True = ajudou (like), False = não ajudou (dislike).")
     consumed = models.BooleanField(default=False, help_text="Se o backend já usou este feedback para adaptar a resposta.")
     detected_intent = models.CharField(
@@ -16,7 +28,31 @@ class Feedback(models.Model):
         blank=True,
         help_text="Intent que o NLU detectou quando essa resposta foi gerada."
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    # default (e não auto_now_add): o write-behind define o instante ao enfileirar e ele não pode mudar no
+    # flush, porque faz parte da chave (id, created_at) da tabela particionada
+    created_at = models.DateTimeField(default=timezone.now)
+
+    # user_question/bot_answer continuam valendo como atributos (e kwargs do construtor):
+    # ler busca o texto pela chave estrangeira, escrever calcula a chave pelo conteúdo.
+    def _get_text(self, name: str) -> str:
+        content = getattr(self, name)
+        return content.text if content is not None else ""
+
+    def _set_text(self, name: str, value):
+        setattr(self, name, TextContent.of(value) if value else None)
+
+    user_question = property(lambda self: self._get_text("question"),
+                             lambda self, value: self._set_text("question", value))
+    bot_answer = property(lambda self: self._get_text("answer"),
+                          lambda self, value: self._set_text("answer", value))
+
+    def text_contents(self) -> list[TextContent]:
+        """Textos já carregados/atribuídos nesta instância (os que uma gravação precisa garantir)."""
+        contents = []
+        for name in TEXT_FIELDS.values():
+            if self._meta.get_field(name).is_cached(self) and getattr(self, name) is not None:
+                contents.append(getattr(self, name))
+        return contents
 
     def __str__(self):
         return f'Feedback em {self.created_at.strftime("%Y-%m-%d %H:%M:%S")} {'T' if self.helpful else 'F'}] {self.bot_answer[:40]}'
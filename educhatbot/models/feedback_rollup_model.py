@@ -0,0 +1,35 @@
+from django.db import models
+
+
+class FeedbackRollup(models.Model):
+    """
+    Contagens de feedback pré-agregadas por período (hora/dia) e dimensão: intent detectada,
+    caminho da resposta ou tamanho da sessão. Mantidas por upsert (FeedbackRollupService.refresh);
+    a API de métricas lê só esta tabela, sem varrer os feedbacks.
+    """
+
+    GRANULARITIES = (("hour", "Hora"), ("day", "Dia"))
+    DIMENSIONS = (("intent", "Intent detectada"), ("path", "Caminho da resposta"),
+                  ("session_length", "Tamanho da sessão"))
+
+    granularity = models.CharField(max_length=5, choices=GRANULARITIES)
+    bucket_start = models.DateTimeField(help_text="Início do período (hora ou dia, no fuso do servidor).")
+    dimension = models.CharField(max_length=20, choices=DIMENSIONS)
+    key = models.CharField(max_length=80, help_text="Valor da dimensão (ex.: nome da intent, 'generativo', '4-7').")
+    helpful = models.PositiveIntegerField(default=0)
+    unhelpful = models.PositiveIntegerField(default=0)
+    unrated = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(help_text="Última atualização (usada para remover chaves que sumiram do período).")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["granularity", "dimension", "bucket_start", "key"],
+                                    name="feedback_rollup_bucket_uniq"),
+        ]
+
+    @property
+    def total(self) -> int:
+        return self.helpful + self.unhelpful + self.unrated
+
+    def __str__(self):
+        return f"{self.granularity} {self.bucket_start:%Y-%m-%d %H:%M} {self.dimension}={self.key}"
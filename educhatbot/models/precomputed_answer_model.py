@@ -0,0 +1,21 @@
+from django.db import models
+
+
+class PrecomputedAnswer(models.Model):
+    """
+    Resposta gerada fora do horário de pico para um grupo de perguntas frequentes (mesma assinatura
+    de palavras). Mantida pelo comando precompute_answers; o chat consulta antes de chamar o LLM.
+    """
+
+    cluster_key = models.CharField(max_length=255, unique=True,
+                                   help_text="Assinatura das perguntas do grupo (palavras relevantes, ordenadas).")
+    question = models.TextField(help_text="Variante mais frequente da pergunta (usada no prompt).")
+    answer = models.TextField()
+    volume = models.PositiveIntegerField(default=0, help_text="Feedbacks do grupo no período analisado.")
+    helpful_rate = models.FloatField(null=True, blank=True)
+    max_output_tokens = models.PositiveIntegerField(help_text="Teto de saída usado na geração.")
+    generated_at = models.DateTimeField(help_text="Quando a resposta foi gerada (idade = defasagem).")
+    updated_at = models.DateTimeField(help_text="Última rodada que selecionou o grupo.")
+
+    def __str__(self):
+        return f"{self.cluster_key} ({self.volume})"
@@ -0,0 +1,27 @@
+import hashlib
+import uuid
+
+from django.db import models
+
+
+class TextContent(models.Model):
+    """
+    Texto deduplicado (perguntas e respostas do feedback), endereçado pelo conteúdo.
+
+    O id são os 16 primeiros bytes do sha256 do texto (UTF-8): quem grava calcula a chave
+    sem consultar o banco, e o mesmo texto em milhões de feedbacks ocupa uma linha só.
+    """
+
+    id = models.UUIDField(primary_key=True, editable=False)
+    text = models.TextField(max_length=8000, help_text="Texto completo (pergunta do usuário ou resposta do bot).")
+
+    @staticmethod
+    def key_for(text: str) -> uuid.UUID:
+        return uuid.UUID(bytes=hashlib.sha256(text.encode("utf-8")).digest()[:16])
+
+    @classmethod
+    def of(cls, text: str) -> "TextContent":
+        return cls(id=cls.key_for(text), text=text)
+
+    def __str__(self):
+        return self.text[:40]
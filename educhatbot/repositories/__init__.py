@@ -1 +1,6 @@
-from .feedback_repository import FeedbackRepository
\ No newline at end of file
+from .content_snapshot_repository import ContentSnapshot, ContentSnapshotRepository, SnapshotEntry
+from .feedback_partition_repository import FeedbackPartitionRepository
+from .feedback_repository import FeedbackRepository
+from .feedback_rollup_repository import FeedbackRollupRepository
+from .precomputed_answer_repository import PrecomputedAnswerRepository
+from .text_content_repository import TextContentRepository
@@ -0,0 +1,96 @@
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..core import _env, metrics
+
+logger = logging.getLogger(__name__)
+
+CONTENT_SNAPSHOT_PATH = _env("CONTENT_SNAPSHOT_PATH", "/tmp/educhatbot-content.snapshot")
+
+SNAPSHOT_MAGIC = b"EDCS"
+SNAPSHOT_VERSION = 1
+# magic, versão, flags (reservado), criado em (epoch), tamanho do payload comprimido, crc32 do payload
+_HEADER = struct.Struct("<4sHHdII")
+
+
+@dataclass
+class SnapshotEntry:
+    path: str
+    params: List[List[Any]]
+    data: Any
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    fetched_at: float = 0.0
+
+
+@dataclass
+class ContentSnapshot:
+    created_at: float
+    aliases: Dict[str, str] = field(default_factory=dict)
+    entries: List[SnapshotEntry] = field(default_factory=list)
+    version: int = SNAPSHOT_VERSION
+
+    @property
+    def age_seconds(self) -> float:
+        return max(0.0, time.time() - self.created_at)
+
+
+class ContentSnapshotRepository:
+    """
+    Arquivo compacto com os dados de conteúdo em memória (aliases e respostas da API):
+    cabeçalho binário versionado + JSON comprimido com zlib. A escrita é atômica (arquivo
+    temporário + rename), então vários workers podem gravar o mesmo caminho.
+    """
+
+    def __init__(self, path: str = CONTENT_SNAPSHOT_PATH):
+        self.path = Path(path)
+
+    def write(self, snapshot: ContentSnapshot) -> int:
+        payload = zlib.compress(json.dumps({
+            "aliases": snapshot.aliases,
+            "entries": [[e.path, e.params, e.data, e.etag, e.last_modified, e.fetched_at] for e in snapshot.entries],
+        }, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+        header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0, snapshot.created_at,
+                              len(payload), zlib.crc32(payload))
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        tmp.write_bytes(header + payload)
+        os.replace(tmp, self.path)
+        size = _HEADER.size + len(payload)
+        metrics.set_gauge("content_snapshot_bytes", size)
+        return size
+
+    def read(self) -> Optional[ContentSnapshot]:
+        """Snapshot do disco, ou None se não existir ou for inválido (versão, tamanho ou crc)."""
+        try:
+            raw = self.path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        try:
+            magic, version, _, created_at, length, crc = _HEADER.unpack_from(raw)
+            payload = raw[_HEADER.size:]
+            if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError(f"formato {magic!r} v{version} não suportado")
+            if len(payload) != length or zlib.crc32(payload) != crc:
+                raise ValueError("arquivo truncado ou corrompido")
+            data = json.loads(zlib.decompress(payload))
+        except (struct.error, zlib.error, ValueError) as e:
+            metrics.inc("content_snapshot_invalid_total")
+            logger.warning(f"Snapshot de conteúdo ignorado ({self.path}): {e}")
+            return None
+
+        return ContentSnapshot(
+            created_at=created_at,
+            aliases=data.get("aliases") or {},
+            entries=[SnapshotEntry(*entry) for entry in data.get("entries", [])],
+            version=version,
+        )
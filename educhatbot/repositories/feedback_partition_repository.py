@@ -0,0 +1,124 @@
+import gzip
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import List
+
+from django.db import connection
+
+from ..models import Feedback, TextContent
+
+PARTITION_PREFIX = f"{Feedback._meta.db_table}_p"
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+@dataclass
+class FeedbackPartition:
+    name: str
+    month: date
+    attached: bool
+
+    @property
+    def upper(self) -> date:
+        return add_months(self.month, 1)
+
+
+class FeedbackPartitionRepository:
+    """
+    Manutenção das partições mensais de educhatbot_feedback (PostgreSQL, ver migração 0009).
+    Partições seguem o nome educhatbot_feedback_pAAAA_MM e cobrem [mês, mês seguinte).
+    """
+
+    table = Feedback._meta.db_table
+
+    @staticmethod
+    def is_supported() -> bool:
+        if connection.vendor != "postgresql":
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+                           [FeedbackPartitionRepository.table])
+            return cursor.fetchone() is not None
+
+    @staticmethod
+    def partition_name(month: date) -> str:
+        return f"{PARTITION_PREFIX}{month:%Y_%m}"
+
+    def list_partitions(self) -> List[FeedbackPartition]:
+        """Partições mensais, anexadas ou já destacadas (aguardando exportação)."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT c.relname, i.inhrelid IS NOT NULL
+                FROM pg_class c
+                LEFT JOIN pg_inherits i ON i.inhrelid = c.oid AND i.inhparent = %s::regclass
+                WHERE c.relkind = 'r' AND c.relname LIKE %s
+                ORDER BY c.relname
+                """,
+                [self.table, PARTITION_PREFIX.replace("_", r"\_") + "%"],
+            )
+            rows = cursor.fetchall()
+
+        partitions = []
+        for name, attached in rows:
+            suffix = name[len(PARTITION_PREFIX):]
+            try:
+                year, month = (int(p) for p in suffix.split("_"))
+            except ValueError:
+                continue
+            partitions.append(FeedbackPartition(name, date(year, month, 1), attached))
+        return partitions
+
+    def create_partition(self, month: date) -> str:
+        name = self.partition_name(month)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {self.table} "
+                f"FOR VALUES FROM (%s) TO (%s)",
+                [month.isoformat(), add_months(month, 1).isoformat()],
+            )
+        return name
+
+    def detach_partition(self, partition: FeedbackPartition):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {self.table} DETACH PARTITION {partition.name}")
+        partition.attached = False
+
+    def export_partition(self, partition: FeedbackPartition, path: Path, chunk_size: int = 2000) -> int:
+        """Grava as linhas da partição em NDJSON comprimido (gzip). Retorna o total de linhas."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        rows = 0
+        texts = TextContent._meta.db_table
+        # chunked_cursor: cursor no servidor, sem trazer a partição inteira para a memória.
+        # Os textos deduplicados entram na linha: o arquivo não depende da tabela de textos.
+        with gzip.open(tmp, "wt", encoding="utf-8") as out, connection.chunked_cursor() as cursor:
+            cursor.execute(f"""
+                SELECT row_to_json(t)::text FROM (
+                    SELECT f.*, coalesce(q.text, '') AS user_question, coalesce(a.text, '') AS bot_answer
+                    FROM {partition.name} f
+                    LEFT JOIN {texts} q ON q.id = f.question_id
+                    LEFT JOIN {texts} a ON a.id = f.answer_id
+                ) t ORDER BY created_at, id
+            """)
+            while True:
+                chunk = cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                out.writelines(f"{line}\n" for (line,) in chunk)
+                rows += len(chunk)
+        tmp.replace(path)
+        return rows
+
+    def count_rows(self, partition: FeedbackPartition) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT count(*) FROM {partition.name}")
+            return cursor.fetchone()[0]
+
+    def drop_partition(self, partition: FeedbackPartition):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE {partition.name}")
@@ -1,10 +1,30 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+from django.db import connection, router, transaction
 from django.db.models import Max
+from django.utils import timezone
+
+from ..core import _env
+from ..models import TEXT_FIELDS, Feedback
+from .text_content_repository import TextContentRepository
 
-from ..models import Feedback
+# Janelas de consulta: com a tabela particionada por mês, o filtro em created_at
+# faz o PostgreSQL ler só as partições recentes.
+SESSION_WINDOW_HOURS = _env("FEEDBACK_SESSION_WINDOW_HOURS", 24, int)
+RECENT_WINDOW_DAYS = _env("FEEDBACK_RECENT_WINDOW_DAYS", 90, int)
 
 
 class FeedbackRepository:
 
+    @staticmethod
+    def session_cutoff() -> datetime:
+        return timezone.now() - timedelta(hours=SESSION_WINDOW_HOURS)
+
+    @staticmethod
+    def recent_cutoff() -> datetime:
+        return timezone.now() - timedelta(days=RECENT_WINDOW_DAYS)
+
     @staticmethod
     def get_next_session_id() -> int:
         last = (
@@ -20,12 +40,62 @@ class FeedbackRepository:
         return Feedback.objects.get(pk=feedback_id)
 
     @staticmethod
-    def save(model: Feedback):
-        return model.save()
+    def get_fields(feedback_id, fields: Iterable[str]) -> Dict:
+        """Só as colunas pedidas de um feedback (levanta Feedback.DoesNotExist)."""
+        columns = {f: f"{TEXT_FIELDS[f]}__text" if f in TEXT_FIELDS else f for f in fields}
+        row = Feedback.objects.values(*columns.values()).get(pk=feedback_id)
+        return {f: (row[c] or "") if f in TEXT_FIELDS else row[c] for f, c in columns.items()}
+
+    @staticmethod
+    def save(model: Feedback, force_insert: bool = False):
+        with transaction.atomic(using=router.db_for_write(Feedback)):
+            TextContentRepository.ensure(model.text_contents())
+            return model.save(force_insert=force_insert)
+
+    @staticmethod
+    def reserve_ids(count: int) -> List[int]:
+        """
+        Reserva `count` ids na sequência da tabela (PostgreSQL) para inserir depois em lote
+        já sabendo o id. Em outros bancos retorna lista vazia.
+        """
+        if connection.vendor != "postgresql" or count <= 0:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM generate_series(1, %s)",
+                [Feedback._meta.db_table, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    @staticmethod
+    def bulk_insert(feedbacks: List[Feedback]):
+        # ignore_conflicts: regravar um lote já persistido (retentativa) não duplica nem falha. Vale porque
+        # id e created_at chegam prontos do write-behind (created_at não é recalculado na gravação)
+        TextContentRepository.ensure(c for fb in feedbacks for c in fb.text_contents())
+        return Feedback.objects.bulk_create(feedbacks, ignore_conflicts=True)
+
+    @staticmethod
+    def bulk_update_fields(updates: Dict[int, Dict]) -> List[Feedback]:
+        """Aplica {id: {campo: valor}} com um UPDATE por conjunto de campos."""
+        groups: Dict[tuple, List[Feedback]] = {}
+        for pk, fields in updates.items():
+            groups.setdefault(tuple(sorted(fields)), []).append(Feedback(id=pk, **fields))
+        TextContentRepository.ensure(c for objs in groups.values() for fb in objs for c in fb.text_contents())
+        for fields, objs in groups.items():
+            Feedback.objects.bulk_update(objs, [TEXT_FIELDS.get(f, f) for f in fields])
+        return [obj for objs in groups.values() for obj in objs]
+
+    @staticmethod
+    def bulk_mark_consumed(ids: Iterable[int]) -> int:
+        return Feedback.objects.filter(pk__in=list(ids)).update(consumed=True)
 
     @staticmethod
     def get_all():
-        return Feedback.objects.all()
+        return Feedback.objects.select_related("question", "answer")
+
+    @staticmethod
+    def get_by_ids(ids: Iterable[int]) -> List[Feedback]:
+        return list(Feedback.objects.filter(pk__in=list(ids)).select_related("question", "answer"))
 
     @staticmethod
     def mark_consumed(feedback: Feedback):
@@ -33,12 +103,45 @@ class FeedbackRepository:
         feedback.save(update_fields=["consumed"])
 
     @staticmethod
-    def get_last_unconsumed_negative(session_id: int | None):
+    def get_last_unconsumed_negative(session_id: int | None, exclude_ids: Iterable[int] = ()):
+        if not session_id:
+            return None
+        qs = Feedback.objects.filter(
+            session_id=session_id, helpful=False, consumed=False,
+            created_at__gte=FeedbackRepository.session_cutoff(),
+        )
+        if exclude_ids:
+            qs = qs.exclude(pk__in=list(exclude_ids))
+        return qs.select_related("question", "answer").order_by("-created_at").first()
+
+    @staticmethod
+    def get_last_feedback(session_id: int | None):
         if not session_id:
             return None
         return (
             Feedback.objects
-            .filter(session_id=session_id, helpful=False, consumed=False)
+            .filter(session_id=session_id, created_at__gte=FeedbackRepository.session_cutoff())
             .order_by("-created_at")
             .first()
         )
+
+    @staticmethod
+    def get_recent_negative_intents(limit: int):
+        """(pergunta, intent) dos últimos feedbacks negativos que têm intent detectada."""
+        return list(
+            Feedback.objects
+            .filter(helpful=False, created_at__gte=FeedbackRepository.recent_cutoff())
+            .exclude(detected_intent__isnull=True)
+            .exclude(detected_intent__exact="")
+            .order_by("-created_at")
+            .values_list("question__text", "detected_intent")[:limit]
+        )
+
+    @staticmethod
+    def get_recent_negative_questions(limit: int) -> List[tuple]:
+        """
+        (id, id do texto da pergunta) dos últimos feedbacks negativos. Só a chave de 16 bytes
+        sai do banco: o texto de cada pergunta distinta é lido uma vez, com `TextContentRepository.get_texts`.
+        """
+        qs = Feedback.objects.filter(helpful=False, created_at__gte=FeedbackRepository.recent_cutoff())
+        return list(qs.order_by("-created_at").values_list("id", "question_id")[:limit])
@@ -0,0 +1,67 @@
+from datetime import datetime
+from typing import Iterable, List, Optional
+
+from django.db import router, transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+from ..models import Feedback, FeedbackRollup
+
+ROLLUP_COUNTS = ("helpful", "unhelpful", "unrated")
+
+
+class FeedbackRollupRepository:
+
+    @staticmethod
+    def aggregate_since(since: Optional[datetime]) -> List[dict]:
+        """
+        Feedbacks desde `since` agrupados por (hora, sessão, intent, helpful), numa consulta só.
+        Com o filtro em created_at, a tabela particionada lê só as partições do período.
+        """
+        qs = Feedback.objects.all()
+        if since is not None:
+            qs = qs.filter(created_at__gte=since)
+        return list(
+            qs.annotate(hour=TruncHour("created_at"))
+            .values("hour", "session_id", "detected_intent", "helpful")
+            .annotate(n=Count("id"))
+            .order_by()
+        )
+
+    @staticmethod
+    def earliest_created_at() -> Optional[datetime]:
+        return Feedback.objects.order_by("created_at").values_list("created_at", flat=True).first()
+
+    @staticmethod
+    def replace_since(since: Optional[datetime], rollups: List[FeedbackRollup], stamp: datetime) -> int:
+        """
+        INSERT ... ON CONFLICT (período, dimensão, chave) DO UPDATE com as contagens recalculadas;
+        as linhas a partir de `since` que não vieram no recálculo (ex.: a sessão mudou de faixa) são removidas.
+        Nada antes de `since` é apagado (sem `since`, nada é): os agregados de meses cujas partições já
+        foram removidas são o único registro deles. Retorna quantas linhas antigas saíram.
+        """
+        with transaction.atomic(using=router.db_for_write(FeedbackRollup)):
+            FeedbackRollup.objects.bulk_create(
+                rollups, batch_size=1000, update_conflicts=True,
+                unique_fields=["granularity", "dimension", "bucket_start", "key"],
+                update_fields=[*ROLLUP_COUNTS, "updated_at"],
+            )
+            if since is None:
+                return 0
+            deleted, _ = FeedbackRollup.objects.filter(updated_at__lt=stamp, bucket_start__gte=since).delete()
+        return deleted
+
+    @staticmethod
+    def query(granularity: str, dimension: str, since: datetime, until: datetime,
+              keys: Iterable[str] = ()) -> List[dict]:
+        qs = FeedbackRollup.objects.filter(
+            granularity=granularity, dimension=dimension, bucket_start__gte=since, bucket_start__lt=until
+        )
+        keys = list(keys)
+        if keys:
+            qs = qs.filter(key__in=keys)
+        return list(qs.order_by("bucket_start", "key").values("bucket_start", "key", *ROLLUP_COUNTS))
+
+    @staticmethod
+    def last_updated() -> Optional[datetime]:
+        return FeedbackRollup.objects.order_by("-updated_at").values_list("updated_at", flat=True).first()
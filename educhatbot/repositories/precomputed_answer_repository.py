@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import List
+
+from django.db import router, transaction
+from django.db.models import Count, Max
+
+from ..models import Feedback, PrecomputedAnswer
+
+
+class PrecomputedAnswerRepository:
+
+    @staticmethod
+    def question_stats(since: datetime) -> List[dict]:
+        """
+        Feedbacks desde `since` agrupados por (pergunta, intent, helpful), com a contagem e o último uso.
+        O agrupamento é pela chave do texto: cada pergunta distinta vem uma vez, sem o texto.
+        """
+        return list(
+            Feedback.objects.filter(created_at__gte=since, question_id__isnull=False)
+            .values("question_id", "detected_intent", "helpful")
+            .annotate(n=Count("id"), last_seen=Max("created_at"))
+            .order_by()
+        )
+
+    @staticmethod
+    def get_all() -> List[PrecomputedAnswer]:
+        return list(PrecomputedAnswer.objects.all())
+
+    @staticmethod
+    def replace_all(entries: List[PrecomputedAnswer], stamp: datetime) -> int:
+        """
+        Upsert por cluster_key; os grupos que não foram selecionados nesta rodada saem da tabela.
+        Retorna quantos saíram.
+        """
+        with transaction.atomic(using=router.db_for_write(PrecomputedAnswer)):
+            PrecomputedAnswer.objects.bulk_create(
+                entries, batch_size=500, update_conflicts=True, unique_fields=["cluster_key"],
+                update_fields=["question", "answer", "volume", "helpful_rate", "max_output_tokens",
+                               "generated_at", "updated_at"],
+            )
+            deleted, _ = PrecomputedAnswer.objects.filter(updated_at__lt=stamp).delete()
+        return deleted
@@ -0,0 +1,67 @@
+import threading
+import uuid
+from typing import Dict, Iterable, List
+
+from cachetools import TTLCache
+from django.db import connection, router, transaction
+
+from ..core import _env, metrics
+from ..models import Feedback, TextContent
+
+# Chaves que este worker já sabe que estão gravadas (evita reinserir os textos repetidos). O prazo fica
+# bem abaixo da retenção: um texto conhecido tem feedback recente apontando para ele e não é órfão na limpeza
+TEXT_CONTENT_KNOWN_MAXSIZE = _env("TEXT_CONTENT_KNOWN_MAXSIZE", 50000, int)
+TEXT_CONTENT_KNOWN_TTL_SECS = _env("TEXT_CONTENT_KNOWN_TTL_SECS", 86400, int)
+
+
+class TextContentRepository:
+    _known: TTLCache = TTLCache(maxsize=TEXT_CONTENT_KNOWN_MAXSIZE, ttl=TEXT_CONTENT_KNOWN_TTL_SECS)
+    _lock = threading.Lock()
+
+    @classmethod
+    def ensure(cls, contents: Iterable[TextContent]) -> int:
+        """
+        Garante que os textos existem antes de gravar os feedbacks que apontam para eles.
+        Um INSERT ... ON CONFLICT DO NOTHING só com os que o worker ainda não viu; retorna quantos foram enviados.
+        """
+        with cls._lock:
+            pending = {c.id: c for c in contents if c.id not in cls._known}
+        if not pending:
+            metrics.inc("text_content_ensure_total", labels={"outcome": "known"})
+            return 0
+
+        TextContent.objects.bulk_create(list(pending.values()), ignore_conflicts=True)
+        metrics.inc("text_content_ensure_total", labels={"outcome": "insert"})
+
+        def remember():
+            with cls._lock:
+                for key in pending:
+                    cls._known[key] = True
+
+        # Só depois do commit: se a transação voltar atrás, a próxima tentativa reinsere
+        transaction.on_commit(remember, using=router.db_for_write(TextContent))
+        return len(pending)
+
+    @staticmethod
+    def get_texts(ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, str]:
+        keys: List[uuid.UUID] = list({k for k in ids if k is not None})
+        if not keys:
+            return {}
+        return dict(TextContent.objects.filter(pk__in=keys).values_list("id", "text"))
+
+    @staticmethod
+    def delete_orphans() -> int:
+        """Remove os textos que nenhum feedback referencia mais (ex.: depois da retenção). Retorna quantos."""
+        texts, feedback = TextContent._meta.db_table, Feedback._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                DELETE FROM {texts}
+                WHERE NOT EXISTS (SELECT 1 FROM {feedback} f WHERE f.question_id = {texts}.id)
+                  AND NOT EXISTS (SELECT 1 FROM {feedback} f WHERE f.answer_id = {texts}.id)
+            """)
+            return cursor.rowcount
+
+    @classmethod
+    def forget(cls):
+        with cls._lock:
+            cls._known.clear()
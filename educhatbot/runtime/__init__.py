@@ -0,0 +1,9 @@
+from .service_registry import (
+    get_chatbot_service,
+    get_feedback_rollup_service,
+    get_feedback_writer_service,
+    get_idempotency_service,
+    get_intent_blocklist_service,
+    get_rate_limit_service,
+)
+from .warmup import is_ready, preload, readiness_report, shutdown, warmup
@@ -0,0 +1,73 @@
+import threading
+from typing import Any, Callable, Dict
+
+_lock = threading.RLock()  # reentrante: fábricas podem pedir outros serviços
+_instances: Dict[str, Any] = {}
+
+
+def _get_or_create(name: str, factory: Callable[[], Any]) -> Any:
+    instance = _instances.get(name)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(name)
+            if instance is None:
+                instance = _instances[name] = factory()
+    return instance
+
+
+def get_chatbot_service(create: bool = True):
+    """
+    Retorna o ChatbotService compartilhado do processo (um por worker).
+
+    Construir o serviço a cada requisição recria clientes HTTP e modelos do Gemini;
+    aqui ele é criado uma única vez e reaproveitado por todas as requisições.
+    Com create=False retorna None se ele ainda não foi criado neste processo.
+    """
+    if not create:
+        return _instances.get("chatbot")
+
+    from ..services import ChatbotService
+    return _get_or_create("chatbot", ChatbotService)
+
+
+def get_rate_limit_service():
+    """Limitadores de taxa do /api/chat, compartilhados pelo worker."""
+    from ..services import RateLimitService
+    return _get_or_create("rate_limit", RateLimitService)
+
+
+def get_idempotency_service():
+    """Resultados por Idempotency-Key do /api/chat (por worker)."""
+    from ..services import IdempotencyService
+    return _get_or_create("idempotency", IdempotencyService)
+
+
+def get_feedback_writer_service(create: bool = True):
+    """
+    Fila write-behind de feedbacks do worker.
+    Com create=False retorna None se ela ainda não foi criada neste processo.
+    """
+    if not create:
+        return _instances.get("feedback_writer")
+
+    from ..services import FeedbackWriterService
+    return _get_or_create("feedback_writer", FeedbackWriterService)
+
+
+def get_intent_blocklist_service(create: bool = True):
+    """
+    Índice de intents rejeitadas do worker. A atualização em background só começa no warmup:
+    comandos de gerenciamento e benchmarks usam o índice sem iniciar a thread.
+    Com create=False retorna None se o índice ainda não existe neste processo.
+    """
+    if not create:
+        return _instances.get("intent_blocklist")
+
+    from ..services import IntentBlocklistService
+    return _get_or_create("intent_blocklist", IntentBlocklistService)
+
+
+def get_feedback_rollup_service():
+    """Agregados de feedback (leitura da API de métricas e atualização periódica opcional)."""
+    from ..services import FeedbackRollupService
+    return _get_or_create("feedback_rollup", FeedbackRollupService)
@@ -0,0 +1,122 @@
+import logging
+import threading
+import time
+from typing import Any, Dict
+
+from ..core import _env
+from .service_registry import (
+    get_chatbot_service, get_feedback_rollup_service, get_feedback_writer_service, get_intent_blocklist_service
+)
+
+logger = logging.getLogger(__name__)
+
+# Se True, falhas ao pré-carregar conteúdos mantêm o worker como "não pronto".
+WARMUP_REQUIRE_CONTENT = _env("WARMUP_REQUIRE_CONTENT", False, bool)
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {
+    "ready": False,
+    "started_at": None,
+    "finished_at": None,
+    "duration_ms": None,
+    "steps": {},
+    "errors": {},
+}
+
+
+def preload() -> None:
+    """
+    Importa os módulos pesados (URLconf, serviços, SDKs) sem abrir conexões.
+    Pensado para rodar no processo master do Gunicorn (preload_app), antes do fork.
+    """
+    from django.urls import get_resolver
+    get_resolver().url_patterns
+
+    from ..core import get_llm_backend
+    get_llm_backend().warmup()
+
+
+def _run_step(name: str, fn) -> Any:
+    start = time.perf_counter()
+    try:
+        result = fn()
+        _state["steps"][name] = {"ok": True, "ms": round((time.perf_counter() - start) * 1000, 2), "result": result}
+        return result
+    except Exception as e:
+        _state["steps"][name] = {"ok": False, "ms": round((time.perf_counter() - start) * 1000, 2)}
+        _state["errors"][name] = str(e)
+        logger.warning(f"Warmup: etapa '{name}' falhou: {e}")
+        return None
+
+
+def warmup() -> Dict[str, Any]:
+    """
+    Prepara o worker antes de aceitar tráfego:
+    1. constrói os serviços compartilhados (NLU, generativo, conteúdo, feedback);
+    2. carrega o snapshot de conteúdo do disco (se houver) e resolve os aliases de disciplinas;
+    3. pré-carrega o cache de conteúdos (disciplinas, tópicos, locais) e regrava o snapshot.
+    """
+    with _lock:
+        if _state["ready"]:
+            return readiness_report()
+
+        _state["started_at"] = time.time()
+        _state["steps"] = {}
+        _state["errors"] = {}
+        start = time.perf_counter()
+
+        chatbot = _run_step("build_services", get_chatbot_service)
+        if chatbot is not None:
+            _run_step("load_llm_sdk", chatbot.generative_service.backend.warmup)
+            _run_step("load_nlu_provider", chatbot.nlu_service.provider.warmup)
+            content = chatbot.content_service
+            _run_step("load_content_snapshot", content.load_snapshot)
+            _run_step("load_aliases", lambda: len(content.load_aliases()))
+            _run_step("prime_content_cache", content.prime_cache)
+            _run_step("save_content_snapshot", content.save_snapshot)
+            content.start_snapshots()
+            content.start_refresh()
+            blocklist = get_intent_blocklist_service()
+            _run_step("load_intent_blocklist", blocklist.rebuild)
+            blocklist.start()
+            _run_step("build_retrieval_index", chatbot.retrieval_service.refresh)
+            chatbot.retrieval_service.start()
+            _run_step("load_precomputed_answers", chatbot.precomputed_answer_service.refresh)
+            chatbot.precomputed_answer_service.start()
+            get_feedback_rollup_service().start()
+
+        content_ok = not any(k in _state["errors"] for k in ("load_aliases", "prime_content_cache"))
+        _state["ready"] = chatbot is not None and (content_ok or not WARMUP_REQUIRE_CONTENT)
+        _state["finished_at"] = time.time()
+        _state["duration_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+        logger.info(f"Warmup concluído em {_state['duration_ms']} ms (ready={_state['ready']}).")
+        return readiness_report()
+
+
+def shutdown(timeout: float = 10.0) -> bool:
+    """
+    Encerramento do worker: grava o que ainda está na fila write-behind de feedbacks.
+    (Também roda via atexit; aqui fica explícito para o hook worker_exit do Gunicorn.)
+    """
+    writer = get_feedback_writer_service(create=False)
+    if writer is None:
+        return True
+    return writer.close(timeout)
+
+
+def is_ready() -> bool:
+    return bool(_state["ready"])
+
+
+def readiness_report() -> Dict[str, Any]:
+    report = {
+        "ready": _state["ready"],
+        "duration_ms": _state["duration_ms"],
+        "steps": {k: {"ok": v["ok"], "ms": v["ms"]} for k, v in _state["steps"].items()},
+        "errors": dict(_state["errors"]),
+    }
+    chatbot = get_chatbot_service(create=False)
+    if chatbot is not None:
+        report["content"] = chatbot.content_service.freshness()
+    return report
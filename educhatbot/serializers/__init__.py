@@ -1,5 +1,7 @@
 from .ask_serializer import AskSerializer
 from .bot_message_serializer import BotMessageSerializer
+from .chat_fast_serializer import AskRequest, ChatJSONParser, ChatJSONRenderer, bot_message, parse_ask_request
+from .feedback_metrics_serializer import FeedbackMetricsQuerySerializer
 from .feedback_request_serializer import FeedbackRequestSerializer
 from .feedback_response_serializer import FeedbackResponseSerializer
-from .session_response_serializer import SessionResponseSerializer
\ No newline at end of file
+from .session_response_serializer import SessionResponseSerializer
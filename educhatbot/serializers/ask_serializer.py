@@ -9,6 +9,8 @@ class AskSerializer(serializers.Serializer):
     role = serializers.CharField(help_text="Quem enviou a mensagem: 'user' ou 'bot'")
     text = serializers.CharField(max_length=500, help_text="A mensagem de texto do usuário para o chatbot.")
     simplify = serializers.BooleanField(required=False, default=False, help_text="Indica se o texto deve ser simplificado no chatbot.")
+    channel = serializers.CharField(required=False, default="web",
+                                    help_text="Canal do cliente (web, ws, tts, libras): define o tamanho máximo das respostas generativas.")
     last_messages = HistoryItemSerializer(
         many=True,
         required=False,
@@ -0,0 +1,202 @@
+"""
+Caminho enxuto de (de)serialização do /api/chat.
+
+O AskSerializer/BotMessageSerializer continuam documentando o contrato no schema,
+mas a requisição é validada à mão (mesmas regras e mensagens do DRF), a resposta
+é montada direto em camelCase sem revalidar o que o próprio servidor produziu,
+e o JSON é lido/escrito sem a conversão recursiva de chaves do camel_case.
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from rest_framework import serializers
+from rest_framework.exceptions import ParseError, ValidationError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+from ..core.output_budget import DEFAULT_CHANNEL, normalize_channel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - fallback para a stdlib
+    orjson = None
+
+TEXT_MAX_LENGTH = 500
+
+# Mapas pré-calculados (camelCase <-> snake_case) dos campos do endpoint
+REQUEST_FIELDS = {
+    "sessionId": "session_id",
+    "session_id": "session_id",
+    "role": "role",
+    "text": "text",
+    "simplify": "simplify",
+    "channel": "channel",
+    "lastMessages": "last_messages",
+    "last_messages": "last_messages",
+}
+ERROR_KEYS = {"session_id": "sessionId", "last_messages": "lastMessages"}
+
+# Mesmos valores aceitos pelo serializers.BooleanField do DRF
+_TRUE = {"t", "T", "y", "Y", "yes", "Yes", "YES", "true", "True", "TRUE", "on", "On", "ON", "1", 1, True}
+_FALSE = {"f", "F", "n", "N", "no", "No", "NO", "false", "False", "FALSE", "off", "Off", "OFF", "0", 0, 0.0, False}
+
+
+@dataclass
+class AskRequest:
+    session_id: int
+    role: str
+    text: str
+    simplify: bool = False
+    last_messages: List[Dict[str, str]] = field(default_factory=list)
+    channel: str = DEFAULT_CHANNEL
+
+
+def _char(data: Dict[str, Any], key: str, errors: Dict[str, Any], max_length: int | None = None) -> str | None:
+    """Equivalente ao CharField obrigatório do DRF (trim, sem vazio, max_length)."""
+    if key not in data:
+        errors[key] = ["This field is required."]
+        return None
+    value = data[key]
+    if value is None:
+        errors[key] = ["This field may not be null."]
+        return None
+    if isinstance(value, (bool, dict, list)):
+        errors[key] = ["Not a valid string."]
+        return None
+    value = str(value).strip()
+    if not value:
+        errors[key] = ["This field may not be blank."]
+        return None
+    if max_length is not None and len(value) > max_length:
+        errors[key] = [f"Ensure this field has no more than {max_length} characters."]
+        return None
+    return value
+
+
+_INTEGER_FIELD = serializers.IntegerField()
+
+
+def _integer(data: Dict[str, Any], key: str, errors: Dict[str, Any]) -> int | None:
+    if key not in data:
+        errors[key] = ["This field is required."]
+        return None
+    value = data[key]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    # Demais formatos ("42", "1.0", "--5", "²") com a conversão e as mensagens do próprio DRF
+    try:
+        return _INTEGER_FIELD.run_validation(value)
+    except ValidationError as e:
+        errors[key] = list(e.detail)
+        return None
+
+
+def _boolean(data: Dict[str, Any], key: str, errors: Dict[str, Any], default: bool = False) -> bool:
+    value = data.get(key, default)
+    if isinstance(value, (str, int, float)):
+        if value in _TRUE:
+            return True
+        if value in _FALSE:
+            return False
+    errors[key] = ["Must be a valid boolean."]
+    return default
+
+
+def _history(data: Dict[str, Any], key: str, errors: Dict[str, Any]) -> List[Dict[str, str]]:
+    value = data.get(key, [])
+    if not isinstance(value, list):
+        errors[key] = {"non_field_errors": [f'Expected a list of items but got type "{type(value).__name__}".']}
+        return []
+
+    items: List[Dict[str, str]] = []
+    item_errors: List[Dict[str, Any]] = []
+    for raw in value:
+        err: Dict[str, Any] = {}
+        if not isinstance(raw, dict):
+            err["non_field_errors"] = [f"Invalid data. Expected a dictionary, but got {type(raw).__name__}."]
+        else:
+            role = _char(raw, "role", err)
+            text = _char(raw, "text", err)
+            if not err:
+                items.append({"role": role, "text": text})
+        item_errors.append(err)
+
+    if any(item_errors):
+        errors[key] = item_errors
+    return items
+
+
+def parse_ask_request(data: Any) -> AskRequest:
+    """
+    Valida o corpo do /api/chat com as mesmas regras do AskSerializer.
+    Lança ValidationError (400) com as chaves em camelCase.
+    """
+    if not isinstance(data, dict):
+        raise ValidationError({"non_field_errors": [f"Invalid data. Expected a dictionary, but got {type(data).__name__}."]})
+
+    errors: Dict[str, Any] = {}
+    request = AskRequest(
+        session_id=_integer(data, "session_id", errors),
+        role=_char(data, "role", errors),
+        text=_char(data, "text", errors, TEXT_MAX_LENGTH),
+        simplify=_boolean(data, "simplify", errors),
+        last_messages=_history(data, "last_messages", errors),
+        # Canal desconhecido não é erro: vale o orçamento padrão (web)
+        channel=normalize_channel(data.get("channel")),
+    )
+    if errors:
+        raise ValidationError({ERROR_KEYS.get(k, k): v for k, v in errors.items()})
+    return request
+
+
+def bot_message(text: str, intent: str | None, feedback_enabled: bool = True, message_id: int = 1) -> Dict[str, Any]:
+    """Resposta do bot já em camelCase (sem passar pelo BotMessageSerializer)."""
+    return {
+        "id": message_id,
+        "role": "bot",
+        "text": text,
+        "feedbackEnabled": feedback_enabled,
+        "detectedIntent": intent,
+    }
+
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(raw: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class ChatJSONParser(BaseParser):
+    """
+    Lê o JSON e renomeia só as chaves de primeiro nível pelo mapa pré-calculado
+    (os itens do histórico já usam 'role'/'text').
+    """
+    media_type = "application/json"
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            raw = stream.read() if stream is not None else b""
+            data = loads(raw)
+        except ValueError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+        if isinstance(data, dict):
+            return {REQUEST_FIELDS.get(k, k): v for k, v in data.items()}
+        return data
+
+
+class ChatJSONRenderer(BaseRenderer):
+    media_type = "application/json"
+    format = "json"
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return dumps(data)
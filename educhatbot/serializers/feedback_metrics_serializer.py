@@ -0,0 +1,18 @@
+from rest_framework import serializers
+
+from ..models import FeedbackRollup
+
+
+class FeedbackMetricsQuerySerializer(serializers.Serializer):
+    dimension = serializers.ChoiceField(choices=FeedbackRollup.DIMENSIONS,
+                                        help_text="intent, path (caminho da resposta) ou session_length.")
+    granularity = serializers.ChoiceField(choices=FeedbackRollup.GRANULARITIES, default="day")
+    since = serializers.DateTimeField(required=False, help_text="Início (ISO 8601); padrão: 7 dias (hora) ou 30 dias (dia).")
+    until = serializers.DateTimeField(required=False, help_text="Fim, exclusivo (ISO 8601); padrão: agora.")
+    key = serializers.ListField(child=serializers.CharField(max_length=80), required=False, default=list,
+                                help_text="Filtra valores da dimensão (pode repetir: ?key=a&key=b).")
+
+    def validate(self, attrs):
+        if attrs.get("since") and attrs.get("until") and attrs["since"] >= attrs["until"]:
+            raise serializers.ValidationError("since deve ser anterior a until.")
+        return attrs
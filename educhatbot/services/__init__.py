@@ -1,5 +1,14 @@
 from .chatbot_service import ChatbotService
 from .educational_content_service import EducationalContentService
+from .feedback_rollup_service import FeedbackRollupService
 from .feedback_service import FeedbackService
+from .feedback_writer_service import FeedbackWriterService
 from .generative_service import GenerativeService
-from .nlu_service import NLUService
\ No newline at end of file
+from .idempotency_service import IdempotencyConflict, IdempotencyService
+from .intent_blocklist_service import IntentBlocklistService
+from .nlu_service import NLUService
+from .precomputed_answer_service import PrecomputedAnswerService
+from .prefetch_service import PrefetchService
+from .rate_limit_service import RateLimitService
+from .retrieval_service import RetrievalService
+from .simplification_service import SimplificationService
@@ -1,52 +1,150 @@
 import logging
+import re
+from typing import Callable
+
+from ..core import (
+    CHAT_DEADLINE_SECS, DeadlineExceeded, ModelRouter, SessionState, SessionStateCache, Turn, _env, channel_scope,
+    deadline_scope, metrics, normalize_question, output_budget
+)
+from ..core.profiling import profile_stage
 from .feedback_service import FeedbackService
 from .educational_content_service import EducationalContentService
 from .generative_service import GenerativeService
-from .nlu_service import NLUService
+from .nlu_service import NON_STRUCTURED_INTENTS, NLUService
+from .precomputed_answer_service import PrecomputedAnswerService
+from .prefetch_service import PrefetchService
+from .retrieval_service import RetrievalService
+from .simplification_service import SimplificationService
+from .speculation_service import SpeculationService
 
 # Configuração básica de log
 logger = logging.getLogger(__name__)
 
+# "sequential": NLU e depois o gerador; "combined": uma só chamada devolve intent, entities e rascunho
+# "speculative": o gerador roda em paralelo com o NLU quando o turno provavelmente termina nele
+PIPELINE_MODES = ("sequential", "combined", "speculative")
+CHAT_PIPELINE_MODE = _env("CHAT_PIPELINE_MODE", "sequential").strip().lower()
+
+# Resposta cortada no teto de tokens: a próxima mensagem afirmativa continua de onde parou.
+# Só afirmativos "puros" (texto normalizado): "pode explicar o que é mitose?" é uma pergunta nova
+CONTINUE_OFFER = "\n\nQuer que eu continue?"
+_CONTINUE_CUES = r"sim|s|ss|claro|quero|pode|ok|okay|continu[ae]|continuar|prossiga|segue|mais|manda|vai"
+_CONTINUE_FILLERS = r"por favor|pfv|pf|ai|entao|isso|agora"
+CONTINUE_REQUEST = re.compile(rf"^({_CONTINUE_CUES})( ({_CONTINUE_CUES}|{_CONTINUE_FILLERS}))*$")
+
 class ChatbotService:
     """
     Serviço orquestrador que utiliza o NLUService e o GenerativeService
     para fornecer uma resposta completa ao usuário.
     """
 
-    def __init__(self):
-        self.nlu_service = NLUService()
-        self.generative_service = GenerativeService()
+    def __init__(self, pipeline_mode: str | None = None, router: ModelRouter | None = None):
+        self.pipeline_mode = pipeline_mode or CHAT_PIPELINE_MODE
+        if self.pipeline_mode not in PIPELINE_MODES:
+            logger.warning(f"CHAT_PIPELINE_MODE desconhecido: {self.pipeline_mode}; usando 'sequential'.")
+            self.pipeline_mode = "sequential"
         self.content_service = EducationalContentService()
         self.feedback_service = FeedbackService()
+        self.nlu_service = NLUService(self.content_service, self.feedback_service, router=router)
+        self.generative_service = GenerativeService(router=router)
+        self.retrieval_service = RetrievalService(self.content_service)
+        self.prefetch_service = PrefetchService(self.content_service)
+        self.speculation_service = SpeculationService(self.generative_service)
+        self.simplification_service = SimplificationService(self.generative_service)
+        self.precomputed_answer_service = PrecomputedAnswerService(self.generative_service, self.retrieval_service)
+        # Estado das sessões HTTP neste worker (no WebSocket o estado vem da conexão): última resposta e continuação
+        self.sessions = SessionStateCache()
         logger.info("ChatbotService inicializado, pronto para orquestrar.")
 
     def get_response(self, user_input: str, session_id: int | None = None,
-                     simplify: bool = False, last_messages: list = None) -> dict:
+                     simplify: bool = False, last_messages: list = None,
+                     state: SessionState | None = None, on_chunk: Callable[[str], None] | None = None,
+                     deadline_secs: float | None = None, channel: str | None = None) -> dict:
+        """
+        `state` é o contexto mantido no servidor (WebSocket): dele vêm o histórico e o feedback
+        negativo pendente, sem consultas ao banco por mensagem. `on_chunk` recebe os pedaços
+        das respostas generativas à medida que são gerados.
+
+        O turno tem prazo (`deadline_secs`, ou CHAT_DEADLINE_SECS): NLU, API de conteúdo e LLM
+        recebem só o tempo que resta dele, e se ele acabar a resposta é degradada, porém imediata.
+        O `channel` do cliente (web, ws, tts, libras) define, com a intent, o teto de tokens da geração.
+        """
+        with deadline_scope(deadline_secs or CHAT_DEADLINE_SECS) as deadline, channel_scope(channel):
+            try:
+                result = self._respond(user_input, session_id, simplify, last_messages, state, on_chunk)
+            except DeadlineExceeded as e:
+                metrics.inc("chat_deadline_exceeded_total", labels={"stage": e.stage})
+                logger.warning(f"Prazo de {deadline.budget:.1f}s esgotado na etapa {e.stage}.")
+                return self._degraded_answer(user_input)
+            session = state if state is not None else self.sessions.get(session_id, create=True)
+            if session is not None:
+                session.remember_answer(user_input, result["answer"], result["intent"])
+            return self._offer_continuation(result, session, on_chunk)
+
+    def _offer_continuation(self, result: dict, session: SessionState | None,
+                            on_chunk: Callable[[str], None] | None) -> dict:
+        """Resposta cortada no teto de tokens: guarda o contexto na sessão e pergunta se deve continuar."""
+        continuation = getattr(result.get("answer"), "continuation", None)
+        if continuation is None or session is None:
+            return result
+        session.continuation = continuation
+        if on_chunk is not None:
+            on_chunk(CONTINUE_OFFER)
+        return {**result, "answer": result["answer"] + CONTINUE_OFFER}
+
+    def _degraded_answer(self, user_input: str) -> dict:
+        """Resposta sem rede nem LLM: a recuperação local, se tiver algo, ou um pedido para tentar de novo."""
+        retrieval = self.retrieval_service.retrieve(user_input)
+        if retrieval.answer:
+            return {"answer": retrieval.answer, "intent": "resposta_recuperada"}
+        if retrieval.passages:
+            trechos = "\n".join(f"• {p}" for p in retrieval.passages[:2])
+            return {"answer": f"Não consegui completar a resposta a tempo, mas isto pode ajudar:\n{trechos}",
+                    "intent": "resposta_degradada"}
+        return {"answer": "Desculpe, demorei mais do que devia para responder. Pode tentar de novo?",
+                "intent": "resposta_degradada"}
+
+    def _respond(self, user_input: str, session_id: int | None, simplify: bool, last_messages: list | None,
+                 state: SessionState | None, on_chunk: Callable[[str], None] | None) -> dict:
 
         # Garante que last_messages seja uma lista, mesmo que venha None
         if last_messages is None:
-            last_messages = []
-
-        # 0. Simplificação direta (Prioridade máxima)
+            last_messages = state.last_messages() if state is not None else []
+
+        # Continuação de uma resposta cortada ("Quer que eu continue?" -> "sim"); qualquer outra
+        # mensagem descarta o contexto guardado
+        session = state if state is not None else self.sessions.get(session_id)
+        continuation = session.take_continuation() if session is not None else None
+        if continuation is not None and CONTINUE_REQUEST.match(normalize_question(user_input)):
+            metrics.inc("generative_continuations_total")
+            with profile_stage("continuation"):
+                answer = self.generative_service.continue_response(continuation, on_chunk=on_chunk)
+            return {"answer": answer, "intent": "generativo_continuacao"}
+
+        # 0. Simplificação direta (Prioridade máxima): reescreve a resposta anterior quando o pedido
+        # se refere a ela; senão, gera a resposta da pergunta já no formato simplificado
         if simplify:
+            previous = self.simplification_service.previous_answer(user_input, session, last_messages)
+            if previous is not None:
+                with profile_stage("simplify"):
+                    answer = self.simplification_service.simplify(previous, on_chunk=on_chunk)
+                return {"answer": answer, "intent": "generativo_simplificado"}
+            metrics.inc("simplify_requests_total", labels={"source": "regenerate"})
             prompt_simplificado = (
                 f"O usuário pediu: '{user_input}'.\n"
                 "Instrução obrigatória: Explique de forma MUITO RESUMIDA, "
                 "usando linguagem simples, sem jargões técnicos e, se possível, com uma analogia do dia a dia."
             )
-            answer = self.generative_service.generate_free_response(prompt_simplificado)
+            with profile_stage("simplify"):
+                answer = self.generative_service.generate_free_response(
+                    prompt_simplificado, intent="generativo_simplificado", on_chunk=on_chunk)
             return {"answer": answer, "intent": "generativo_simplificado"}
 
         # ---------------------------------------------------------------------
         # 1. Preparação do Contexto para NLU
         # ---------------------------------------------------------------------
 
-        history_text = ""
-        for msg in last_messages:
-            role_label = "Usuário" if msg.get('role') == 'user' else "Bot"
-            content = msg.get('text', '')
-            if content:
-                history_text += f"{role_label}: {content}\n"
+        history_text = self._build_history_text(last_messages)
 
         if history_text:
             nlu_input = (
@@ -58,41 +156,109 @@ class ChatbotService:
         else:
             nlu_input = user_input
 
-        # Chama o NLU
-        nlu_result = self.nlu_service.analyze_text(nlu_input)
-        intent = nlu_result.get('intent')
-        entities = nlu_result.get('entities', {})
-
-        # ---------------------------------------------------------------------
-
-        # 2. Verifica feedback negativo
-        fb = self.feedback_service.get_last_unconsumed_negative(session_id)
-        if fb:
-            answer = self._answer_with_feedback(user_input, session_id)
-            self.feedback_service.mark_consumed(fb)
-            return {"answer": answer, "intent": "feedback_recovery"}
-
-        # 3. Tenta resolver via Intents Estruturadas
-        ignored_intents = ['saudacao', 'desconhecido', 'modo_generativo', 'erro_processamento']
-
-        if intent and intent not in ignored_intents:
-            answer = self._handle_structured_intent(intent, entities)
-            if answer:
-                return {"answer": answer, "intent": intent}
-
-        # 4. Resposta Generativa (Fallback)
-        answer = self.generative_service.generate_free_response(user_input)
-        return {"answer": answer, "intent": "generativo"}
+        # Nos modos combinado e especulativo a recuperação local vem antes do NLU: embasa o
+        # rascunho/geração antecipada (e, se já houver resposta curada ou pré-calculada, não há o que especular)
+        retrieval, precomputed, speculation = None, None, None
+        if self.pipeline_mode in ("combined", "speculative"):
+            with profile_stage("retrieval"):
+                retrieval = self.retrieval_service.retrieve(user_input)
+            if self.pipeline_mode == "speculative" and not retrieval.answer:
+                precomputed = self.precomputed_answer_service.lookup(user_input)
+                if precomputed is None:
+                    speculation = self.speculation_service.start(user_input, retrieval.passages)
+
+        try:
+            # Chama o NLU
+            with profile_stage("nlu"):
+                if self.pipeline_mode == "combined":
+                    nlu_result = self.nlu_service.analyze_and_answer(
+                        nlu_input, question=user_input,
+                        answer_prompt=self.generative_service.build_prompt(user_input, retrieval.passages,
+                                                                           output_budget()))
+                else:
+                    nlu_result = self.nlu_service.analyze_text(nlu_input, question=user_input)
+            intent = nlu_result.get('intent')
+            entities = nlu_result.get('entities', {})
+
+            # ---------------------------------------------------------------------
+
+            # 2. Verifica feedback negativo
+            with profile_stage("feedback_lookup"):
+                if state is not None:
+                    fb = state.take_pending_negative()
+                else:
+                    fb = self.feedback_service.get_last_unconsumed_negative(session_id)
+            if fb:
+                with profile_stage("feedback_recovery"):
+                    answer = self._answer_with_feedback(user_input, session_id, state, on_chunk, fb, intent)
+                    self.feedback_service.mark_consumed(fb)
+                return {"answer": answer, "intent": "feedback_recovery"}
+
+            # 3. Tenta resolver via Intents Estruturadas
+            ignored_intents = ['saudacao', 'desconhecido', 'modo_generativo', 'erro_processamento']
+
+            if intent and intent not in ignored_intents:
+                with profile_stage("structured_intent"):
+                    answer = self._handle_structured_intent(intent, entities, session_id)
+                if answer:
+                    return {"answer": answer, "intent": intent}
+
+            # 4. Recuperação local (FAQ/aprofundamento): responde sem LLM quando a similaridade é alta
+            if retrieval is None:
+                with profile_stage("retrieval"):
+                    retrieval = self.retrieval_service.retrieve(user_input)
+            if retrieval.answer:
+                return {"answer": retrieval.answer, "intent": "resposta_recuperada"}
+
+            # 5. Modo combinado: o rascunho já veio na chamada do NLU
+            if self.pipeline_mode == "combined":
+                draft = nlu_result.get("answer") if intent in NON_STRUCTURED_INTENTS else ""
+                metrics.inc("chat_combined_total", labels={"outcome": "draft_used" if draft else "no_draft"})
+                if draft:
+                    return {"answer": draft, "intent": "generativo"}
+
+            # 6. Resposta pré-calculada (perguntas frequentes, geradas à noite pelo precompute_answers);
+            # no modo especulativo a consulta já foi feita junto com a recuperação
+            if self.pipeline_mode != "speculative":
+                precomputed = self.precomputed_answer_service.lookup(user_input)
+            if precomputed is not None:
+                if on_chunk is not None:
+                    on_chunk(precomputed.answer)
+                return {"answer": precomputed.answer, "intent": "resposta_precomputada"}
+
+            # 7. Resposta Generativa (Fallback), com os trechos recuperados como contexto
+            with profile_stage("generative"):
+                if speculation is not None:
+                    speculation.generative = True
+                if speculation is not None and speculation.started:
+                    answer = self.speculation_service.use(speculation)
+                else:
+                    answer = self.generative_service.generate_free_response(
+                        user_input, contexto=retrieval.passages, intent=intent, on_chunk=on_chunk)
+            return {"answer": answer, "intent": "generativo"}
+        finally:
+            if speculation is not None:
+                self.speculation_service.finish(speculation)
+
+    @staticmethod
+    def _build_history_text(last_messages: list) -> str:
+        linhas = []
+        for msg in last_messages:
+            role_label = "Usuário" if msg.get('role') == 'user' else "Bot"
+            content = msg.get('text', '')
+            if content:
+                linhas.append(f"{role_label}: {content}\n")
+        return "".join(linhas)
 
-    def _handle_structured_intent(self, intent: str, entities: dict) -> str | None:
+    def _handle_structured_intent(self, intent: str, entities: dict, session_id: int | None = None) -> str | None:
         if intent == 'buscar_conteudo_disciplina':
-            return self._handle_buscar_conteudo_disciplina(entities)
+            return self._handle_buscar_conteudo_disciplina(entities, session_id)
 
         elif intent == "aprofundar_topico":
             return self._handle_aprofundar_topico(entities)
 
         elif intent == 'consultar_informacao_institucional':
-            return self._handle_institucional(entities)
+            return self._handle_institucional(entities, session_id)
 
         elif intent == 'buscar_video_educacional':
             return self._handle_videos(entities)
@@ -106,10 +272,24 @@ class ChatbotService:
 
         return None
 
-    def _answer_with_feedback(self, user_input: str, session_id: int | None) -> str:
+    def _answer_with_feedback(self, user_input: str, session_id: int | None, state: SessionState | None = None,
+                              on_chunk: Callable[[str], None] | None = None, feedback=None,
+                              intent: str | None = None) -> str:
         extra_instructions = []
 
-        if session_id and self.feedback_service.session_needs_simplify(session_id):
+        if state is not None:
+            needs_simplify = state.needs_simplify
+        else:
+            needs_simplify = bool(session_id) and self.feedback_service.session_needs_simplify(session_id)
+
+        # A resposta que não ajudou está no feedback: se o aluno repete a pergunta ou só diz que não
+        # entendeu, reescreve esse texto mais simples em vez de gerar tudo de novo
+        if needs_simplify and feedback is not None:
+            previous = Turn(0, feedback.user_question, feedback.bot_answer, feedback.detected_intent)
+            if self.simplification_service.refers_to(user_input, previous):
+                return self.simplification_service.simplify(previous, on_chunk=on_chunk)
+
+        if needs_simplify:
             extra_instructions.append(
                 "A resposta anterior NÃO ajudou este aluno. Agora explique de forma BEM mais simples, "
                 "em passos curtos, sem termos técnicos e com um exemplo do dia a dia."
@@ -128,11 +308,12 @@ class ChatbotService:
                     "\n".join(extra_instructions) +
                     "\nResponda em português claro e no final pergunte se ele quer outro exemplo."
             )
-            return self.generative_service.generate_free_response(prompt)
+            return self.generative_service.generate_free_response(prompt, intent="feedback_recovery", on_chunk=on_chunk)
 
-        return self.generative_service.generate_free_response(user_input)
+        # Sem instruções de recuperação é a geração normal da pergunta: teto e modelo da intent do NLU
+        return self.generative_service.generate_free_response(user_input, intent=intent, on_chunk=on_chunk)
 
-    def _handle_buscar_conteudo_disciplina(self, entities: dict) -> str:
+    def _handle_buscar_conteudo_disciplina(self, entities: dict, session_id: int | None = None) -> str:
         disciplina = (entities.get('disciplina') or "").strip().lower()
         if not disciplina:
             discs = self.content_service.list_disciplinas()
@@ -147,6 +328,9 @@ class ChatbotService:
         if not resumo:
             return f"Não encontrei tópicos para **{disciplina}** agora. Quer tentar outra disciplina?"
 
+        # O próximo turno costuma ser "aprofunde X": adianta a busca dos tópicos listados
+        self.prefetch_service.prefetch_topicos(session_id, payload.get("topicos", []))
+
         return (
             f"Aqui estão alguns tópicos de **{payload.get('disciplina', disciplina)}**:\n"
             f"{resumo}\n"
@@ -183,7 +367,7 @@ class ChatbotService:
 
         return resposta
 
-    def _handle_institucional(self, entities: dict) -> str:
+    def _handle_institucional(self, entities: dict, session_id: int | None = None) -> str:
         local = (entities.get("local") or "").strip().lower()
         campus = (entities.get("campus") or "").strip()
         info = (entities.get("info") or "").strip().lower()
@@ -193,6 +377,7 @@ class ChatbotService:
         # Verifica se deve retornar a lista genérica de locais
         if not local and not campus and (not info or info == "horarios"):
             locs = self.content_service.locais()
+            self.prefetch_service.prefetch_locais(session_id, locs)
             return self._formatar_locais(locs)
 
         # Validações de contexto para pedir mais informações
@@ -251,7 +436,8 @@ class ChatbotService:
 
         return resposta
 
-    def _formatar_locais(self, data: dict) -> str:
+    @staticmethod
+    def _formatar_locais(data: dict) -> str:
         campi = data.get("campi", []) or []
         if not campi:
             return "No momento não encontrei a lista de locais por campus."
@@ -264,7 +450,8 @@ class ChatbotService:
         linhas.append("Diga: 'horários da biblioteca em São Leopoldo', por exemplo.")
         return "\n".join(linhas)
 
-    def _formatar_horarios(self, data: dict) -> str:
+    @staticmethod
+    def _formatar_horarios(data: dict) -> str:
         h = (data.get("horarios") or {})
         obs = data.get("observacoes_acessibilidade") or []
         linhas = [
@@ -282,7 +469,8 @@ class ChatbotService:
             linhas += [f"• {o}" for o in obs]
         return "\n".join(linhas)
 
-    def _formatar_faq(self, data: dict) -> str:
+    @staticmethod
+    def _formatar_faq(data: dict) -> str:
         faq = data.get("faq") or []
         if not faq:
             return "Não há itens de FAQ disponíveis."
@@ -294,7 +482,8 @@ class ChatbotService:
             linhas.append(f"   → {resp}")
         return "\n".join(linhas)
 
-    def _formatar_contatos(self, data: dict) -> str:
+    @staticmethod
+    def _formatar_contatos(data: dict) -> str:
         linhas = [f"**Contatos – {data.get('local', 'Local')} – {data.get('campus', 'Campus')}**"]
         campos = [
             ("email", "E-mail"), ("telefone", "Telefone"),
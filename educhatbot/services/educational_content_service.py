@@ -1,10 +1,49 @@
-from typing import Any, Dict, List
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
 
-from educhatbot.core import HttpClientService, _env
+import httpx
+from cachetools import LRUCache, TTLCache
+
+from educhatbot.core import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, HttpClientService, PeriodicTask, _env, metrics
+)
+from educhatbot.repositories import ContentSnapshot, ContentSnapshotRepository, SnapshotEntry
+
+logger = logging.getLogger(__name__)
 
 API_BASE = _env("EXTERNAL_API_BASE", "http://localhost:3001/api")
 TIMEOUT = float(_env("EXTERNAL_TIMEOUT_SECS", "6"))
 RETRIES = int(_env("EXTERNAL_RETRY_TOTAL", "3"))
+CACHE_TTL_SECS = _env("CONTENT_CACHE_TTL_SECS", 300, int)
+CACHE_MAXSIZE = _env("CONTENT_CACHE_MAXSIZE", 512, int)
+# Requisições condicionais (ETag/Last-Modified) ao renovar entradas vencidas do cache
+CONDITIONAL_REQUESTS = _env("CONTENT_CONDITIONAL_REQUESTS", True, bool)
+# Cópias validadas mantidas além do TTL (base para o 304 e lista de chaves do refresh em lote)
+VALIDATED_MAXSIZE = _env("CONTENT_VALIDATED_MAXSIZE", 2048, int)
+# Refresh em lote periódico de todas as chaves conhecidas (0 = desligado) e sua concorrência
+REFRESH_SECS = _env("CONTENT_REFRESH_SECS", 0.0, float)
+REFRESH_WORKERS = _env("CONTENT_REFRESH_WORKERS", 4, int)
+# Disjuntor da API de conteúdo: falhas seguidas para abrir e segundos até a nova tentativa
+BREAKER_FAILURES = _env("CONTENT_BREAKER_FAILURES", 5, int)
+BREAKER_RESET_SECS = _env("CONTENT_BREAKER_RESET_SECS", 30.0, float)
+# Gravação periódica do snapshot em disco (0 = só no warmup) e idade máxima para servir do cache
+SNAPSHOT_SECS = _env("CONTENT_SNAPSHOT_SECS", 300.0, float)
+SNAPSHOT_MAX_AGE_SECS = _env("CONTENT_SNAPSHOT_MAX_AGE_SECS", 3600.0, float)
+
+
+@dataclass
+class ValidatedCopy:
+    data: Any
+    etag: Optional[str]
+    last_modified: Optional[str]
+    body_bytes: int
+    parse_ms: float
+    fetched_at: float = 0.0  # última vez que a API confirmou os dados (200 ou 304)
 
 
 class EducationalContentService:
@@ -13,20 +52,249 @@ class EducationalContentService:
     para conteúdos, busca e quiz.
     """
 
-    def __init__(self):
-        self.http = HttpClientService(base_url=API_BASE, timeout=TIMEOUT, retries=RETRIES)
+    def __init__(self, snapshot_repository: ContentSnapshotRepository | None = None):
+        self.breaker = CircuitBreaker("content_api", BREAKER_FAILURES, BREAKER_RESET_SECS)
+        self.http = HttpClientService(base_url=API_BASE, timeout=TIMEOUT, retries=RETRIES, breaker=self.breaker)
+        self.snapshot_repository = snapshot_repository or ContentSnapshotRepository()
+        self.snapshot_created_at: float | None = None
+        self._snapshot_task: PeriodicTask | None = None
         self.aliases_map: Dict[str, str] = {}
         self.aliases_loaded = False
+        self._cache: TTLCache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL_SECS)
+        self._cache_lock = threading.Lock()
+        # Chaves aquecidas pelo prefetch e ainda não lidas por uma requisição (chave -> tipo)
+        self._prefetched: TTLCache = TTLCache(maxsize=CACHE_MAXSIZE, ttl=CACHE_TTL_SECS)
+        self._prefetch_local = threading.local()
+        self.conditional_requests = CONDITIONAL_REQUESTS
+        self._copies: LRUCache = LRUCache(maxsize=VALIDATED_MAXSIZE)
+        self._refresh_task: PeriodicTask | None = None
+
+    @contextmanager
+    def prefetching(self, kind: str):
+        """
+        Marca as leituras da thread atual como prefetch: o que for buscado na API fica
+        registrado para medir depois se a requisição seguinte aproveitou o cache.
+        """
+        self._prefetch_local.kind = kind
+        try:
+            yield
+        finally:
+            self._prefetch_local.kind = None
+
+    @staticmethod
+    def _cache_key(path: str, params: Optional[Dict[str, Any]]) -> Tuple[str, Tuple]:
+        return path, tuple(sorted((params or {}).items()))
+
+    def _get_json(self, path: str, params: Optional[Dict[str, Any]] = None, raise_for_status: bool = False) -> Any:
+        """
+        GET com cache em memória (TTL). Só respostas 2xx são guardadas.
+        """
+        key = self._cache_key(path, params)
+        prefetch_kind = getattr(self._prefetch_local, "kind", None)
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            used_kind = self._prefetched.pop(key, None) if cached is not None and not prefetch_kind else None
+        if cached is not None:
+            if used_kind:
+                metrics.inc("prefetch_used_total", labels={"kind": used_kind})
+            elif prefetch_kind:
+                metrics.inc("prefetch_skipped_total", labels={"kind": prefetch_kind, "reason": "cached"})
+            return cached
+
+        data, success = self._fetch(key, path, params, raise_for_status)
+        if success:
+            with self._cache_lock:
+                self._cache[key] = data
+                if prefetch_kind:
+                    self._prefetched[key] = prefetch_kind
+            if prefetch_kind:
+                metrics.inc("prefetch_fetched_total", labels={"kind": prefetch_kind})
+        return data
+
+    def _fetch(self, key: Tuple[str, Tuple], path: str, params: Optional[Dict[str, Any]],
+               raise_for_status: bool = False, conditional: bool | None = None) -> Tuple[Any, bool]:
+        """
+        Busca na API. Havendo cópia validada, o GET é condicional e um 304 reaproveita os
+        dados já interpretados (sem download nem parse). Devolve (dados, sucesso).
+        """
+        if conditional is None:
+            conditional = self.conditional_requests
+        with self._cache_lock:
+            copy: ValidatedCopy | None = self._copies.get(key)
+        try:
+            if conditional and copy is not None and (copy.etag or copy.last_modified):
+                resp = self.http.get_conditional(path, params=params, etag=copy.etag,
+                                                 last_modified=copy.last_modified)
+            else:
+                resp = self.http.get(path, params=params)
+        except (CircuitOpenError, DeadlineExceeded, httpx.TransportError) as e:
+            if copy is None:
+                raise
+            if isinstance(e, CircuitOpenError):
+                reason = "circuit_open"
+            else:
+                reason = "deadline" if isinstance(e, DeadlineExceeded) else "unavailable"
+            return self._serve_stale(copy, reason)
+
+        if resp.status_code >= 500 and copy is not None:
+            return self._serve_stale(copy, "server_error")
+
+        if resp.status_code == 304 and copy is not None:
+            metrics.inc("content_requests_total", labels={"outcome": "not_modified"})
+            metrics.inc("content_bytes_saved_total", copy.body_bytes)
+            metrics.inc("content_parse_ms_saved_total", copy.parse_ms)
+            copy.fetched_at = time.time()
+            return copy.data, True
+
+        if raise_for_status:
+            resp.raise_for_status()
+        start = time.perf_counter()
+        data = resp.json()
+        parse_ms = (time.perf_counter() - start) * 1000
+        metrics.inc("content_requests_total", labels={"outcome": "modified" if copy is not None else "full"})
+        metrics.inc("content_bytes_downloaded_total", len(resp.content))
+        metrics.observe("content_parse_ms", parse_ms, labels={"path": path})
+
+        with self._cache_lock:
+            if resp.is_success:
+                validators = self.http.validators(resp)
+                self._copies[key] = ValidatedCopy(data, validators["etag"], validators["last_modified"],
+                                                  len(resp.content), parse_ms, time.time())
+            else:
+                self._copies.pop(key, None)
+        return data, resp.is_success
+
+    @staticmethod
+    def _serve_stale(copy: ValidatedCopy, reason: str) -> Tuple[Any, bool]:
+        """API fora (ou circuito aberto): serve a última cópia conhecida, sem guardá-la no cache."""
+        metrics.inc("content_stale_served_total", labels={"reason": reason})
+        metrics.observe("content_stale_age_seconds", time.time() - copy.fetched_at,
+                        buckets=(60, 300, 900, 3600, 4 * 3600, 24 * 3600, 7 * 24 * 3600))
+        return copy.data, False
+
+    def refresh_all(self, max_workers: int = REFRESH_WORKERS, conditional: bool | None = None) -> Dict[str, Any]:
+        """
+        Refresh em lote de todas as chaves já buscadas (cópias validadas), com concorrência
+        limitada. Com validadores, cada chave custa um 304 quando nada mudou.
+        """
+        with self._cache_lock:
+            keys = list(self._copies.keys())
+        stats = {"keys": len(keys), "updated": 0, "errors": 0}
+
+        def refresh(key):
+            path, params = key[0], dict(key[1]) or None
+            data, success = self._fetch(key, path, params, conditional=conditional)
+            if success:
+                with self._cache_lock:
+                    self._cache[key] = data
+            return success
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="content-refresh") as pool:
+            futures = [pool.submit(refresh, key) for key in keys]
+            for future in futures:
+                try:
+                    stats["updated" if future.result() else "errors"] += 1
+                except Exception:
+                    stats["errors"] += 1
+        stats["ms"] = round((time.perf_counter() - start) * 1000, 2)
+        metrics.inc("content_refresh_runs_total")
+        metrics.set_gauge("content_refresh_keys", len(keys))
+        return stats
+
+    def start_refresh(self, interval: float = REFRESH_SECS) -> bool:
+        """Agenda o refresh em lote (CONTENT_REFRESH_SECS); interval <= 0 mantém desligado."""
+        if interval <= 0:
+            return False
+        if self._refresh_task is None:
+            self._refresh_task = PeriodicTask("content-refresh", self.refresh_all, interval, run_immediately=False)
+        self._refresh_task.start()
+        return True
+
+    def save_snapshot(self) -> Dict[str, Any]:
+        """Grava aliases e as cópias validadas no snapshot em disco."""
+        with self._cache_lock:
+            entries = [SnapshotEntry(path, [list(p) for p in params], c.data, c.etag, c.last_modified, c.fetched_at)
+                       for (path, params), c in self._copies.items()]
+        aliases = dict(self.aliases_map) if self.aliases_loaded else {}
+        created_at = time.time()
+        size = self.snapshot_repository.write(ContentSnapshot(created_at, aliases, entries))
+        self.snapshot_created_at = created_at
+        metrics.inc("content_snapshot_writes_total")
+        return {"entries": len(entries), "bytes": size}
+
+    def load_snapshot(self) -> Dict[str, Any]:
+        """
+        Carrega o snapshot do disco: aliases e cópias (base do 304 e do fallback offline).
+        Se tiver menos de CONTENT_SNAPSHOT_MAX_AGE_SECS, também abastece o cache, e o worker já
+        nasce respondendo sem ir à API.
+        """
+        start = time.perf_counter()
+        snapshot = self.snapshot_repository.read()
+        if snapshot is None:
+            return {"loaded": False}
+
+        fresh = snapshot.age_seconds <= SNAPSHOT_MAX_AGE_SECS
+        with self._cache_lock:
+            for entry in snapshot.entries:
+                key = self._cache_key(entry.path, dict(entry.params))
+                if key not in self._copies:
+                    self._copies[key] = ValidatedCopy(entry.data, entry.etag, entry.last_modified, 0, 0.0,
+                                                      entry.fetched_at)
+                if fresh and key not in self._cache:
+                    self._cache[key] = entry.data
+        # Aliases antigos não são reaproveitados: load_aliases() refaz a lista (da API ou das cópias)
+        if fresh and snapshot.aliases and not self.aliases_loaded:
+            self.aliases_map.update(snapshot.aliases)
+            self.aliases_loaded = True
+
+        self.snapshot_created_at = snapshot.created_at
+        metrics.set_gauge("content_snapshot_age_seconds", round(snapshot.age_seconds, 1))
+        metrics.observe("content_snapshot_load_ms", (time.perf_counter() - start) * 1000)
+        return {"loaded": True, "entries": len(snapshot.entries), "fresh": fresh,
+                "age_seconds": round(snapshot.age_seconds, 1)}
+
+    def start_snapshots(self, interval: float = SNAPSHOT_SECS) -> bool:
+        """Regrava o snapshot a cada CONTENT_SNAPSHOT_SECS; interval <= 0 mantém desligado."""
+        if interval <= 0:
+            return False
+        if self._snapshot_task is None:
+            self._snapshot_task = PeriodicTask("content-snapshot", self.save_snapshot, interval, run_immediately=False)
+        self._snapshot_task.start()
+        return True
+
+    def freshness(self) -> Dict[str, Any]:
+        """Estado dos dados de conteúdo para a readiness: disjuntor, idade do snapshot e da cópia mais velha."""
+        now = time.time()
+        with self._cache_lock:
+            fetched = [c.fetched_at for c in self._copies.values() if c.fetched_at]
+        snapshot_age = round(now - self.snapshot_created_at, 1) if self.snapshot_created_at else None
+        if snapshot_age is not None:
+            metrics.set_gauge("content_snapshot_age_seconds", snapshot_age)
+        return {
+            "circuit": self.breaker.state,
+            "snapshot_age_seconds": snapshot_age,
+            "oldest_data_age_seconds": round(now - min(fetched), 1) if fetched else None,
+            "entries": len(fetched),
+        }
+
+    def prime_cache(self) -> Dict[str, int]:
+        """
+        Pré-carrega aliases, disciplinas, conteúdos e locais no cache (usado no warmup).
+        """
+        self.load_aliases()
+        discs = self.list_disciplinas()
+        for d in discs:
+            if d.get("id"):
+                self.get_conteudos(d["id"])
+        self.locais()
+        return {"disciplinas": len(discs), "entradas_cache": len(self._cache)}
 
     def list_disciplinas(self) -> List[Dict[str, Any]]:
-        resp = self.http.get("/disciplinas")
-        resp.raise_for_status()
-        return resp.json().get("disciplinas", [])
+        return self._get_json("/disciplinas", raise_for_status=True).get("disciplinas", [])
 
     def get_conteudos(self, disciplina: str) -> Dict[str, Any]:
-        resp = self.http.get("/disciplinas/conteudos", params={"disciplina": disciplina})
-        resp.raise_for_status()
-        data = resp.json() or {}
+        data = self._get_json("/disciplinas/conteudos", params={"disciplina": disciplina}, raise_for_status=True) or {}
         topicos = []
         for t in data.get("topicos", []):
             topicos.append({
@@ -45,32 +313,29 @@ class EducationalContentService:
             return {"erro": "Tópico não informado."}
 
         try:
-            r = self.http.get("/disciplinas/conteudos/aprofundamento", params={"topico": topico})
-            return r.json()
+            return self._get_json("/disciplinas/conteudos/aprofundamento", params={"topico": topico})
         except Exception as e:
             print(f"[EducationalContentService] Erro em get_aprofundamento: {e}")
             return {"erro": str(e)}
 
     def locais(self) -> dict:
-        return self.http.get("/institucional/locais").json()
+        return self._get_json("/institucional/locais")
 
     def horarios(self, local: str, campus: str) -> dict:
-        return self.http.get("/institucional/horarios", params={"local": local, "campus": campus}).json()
+        return self._get_json("/institucional/horarios", params={"local": local, "campus": campus})
 
     def faq(self, local: str, campus: str) -> dict:
-        return self.http.get("/institucional/faq", params={"local": local, "campus": campus}).json()
+        return self._get_json("/institucional/faq", params={"local": local, "campus": campus})
 
     def contatos(self, local: str, campus: str) -> dict:
-        return self.http.get("/institucional/contatos", params={"local": local, "campus": campus}).json()
+        return self._get_json("/institucional/contatos", params={"local": local, "campus": campus})
 
     def buscar_videos(self, assunto: str) -> list:
-        resp = self.http.get("/videos/educacional/videos", params={"assunto": assunto}).json()
+        resp = self._get_json("/videos/educacional/videos", params={"assunto": assunto})
         return resp.get('videos', [])
 
     def buscar(self, termo: str) -> Dict[str, Any]:
-        resp = self.http.get("/busca", params={"q": termo})
-        resp.raise_for_status()
-        return resp.json() or {"q": termo, "resultados": []}
+        return self._get_json("/busca", params={"q": termo}, raise_for_status=True) or {"q": termo, "resultados": []}
 
     def quiz(self, disciplina: str, n: int = 3) -> Dict[str, Any]:
         resp = self.http.get("/quiz", params={"disciplina": disciplina, "n": n})
@@ -80,9 +345,7 @@ class EducationalContentService:
     def load_aliases(self):
         if self.aliases_loaded:
             return self.aliases_map
-        r = self.http.get("/disciplinas")
-        r.raise_for_status()
-        for d in r.json().get("disciplinas", []):
+        for d in self.list_disciplinas():
             did = d.get("id", "").strip().lower()
             nome = d.get("nome", "").strip().lower()
             aliases: List[str] = [a.strip().lower() for a in (d.get("aliases") or [])]
@@ -0,0 +1,167 @@
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.utils import timezone
+
+from ..core import PeriodicTask, _env, metrics
+from ..models import FeedbackRollup
+from ..repositories.feedback_rollup_repository import ROLLUP_COUNTS, FeedbackRollupRepository
+
+logger = logging.getLogger(__name__)
+
+# Período recalculado a cada rodada: cobre feedbacks que mudam depois de gravados (like/dislike tardio)
+FEEDBACK_ROLLUP_LOOKBACK_HOURS = _env("FEEDBACK_ROLLUP_LOOKBACK_HOURS", 48, int)
+# Intervalo da atualização em background no worker (0 = desligado; use o comando rollup_feedback no cron)
+FEEDBACK_ROLLUP_SECS = _env("FEEDBACK_ROLLUP_SECS", 0, float)
+
+# Caminho da resposta a partir da intent gravada no feedback; o resto são intents estruturadas
+ANSWER_PATHS = {
+    "generativo": "generativo",
+    "generativo_simplificado": "generativo",
+    "generativo_continuacao": "generativo",
+    "feedback_recovery": "feedback_recovery",
+    "resposta_precomputada": "precomputada",
+    "resposta_recuperada": "recuperada",
+    "resposta_degradada": "degradada",
+}
+# Faixas de tamanho da sessão (feedbacks na sessão): limite superior inclusivo -> rótulo
+SESSION_LENGTH_BUCKETS = ((1, "1"), (3, "2-3"), (7, "4-7"), (15, "8-15"))
+MAX_RANGE_DAYS = {"hour": 14, "day": 400}
+
+
+def answer_path(intent: Optional[str]) -> str:
+    if not intent:
+        return "desconhecido"
+    return ANSWER_PATHS.get(intent, "estruturada")
+
+
+def session_length_bucket(length: int) -> str:
+    for upper, label in SESSION_LENGTH_BUCKETS:
+        if length <= upper:
+            return label
+    return f"{SESSION_LENGTH_BUCKETS[-1][0] + 1}+"
+
+
+def build_rollups(rows: Iterable[dict], stamp: datetime) -> List[FeedbackRollup]:
+    """
+    Linhas agregadas (hora, sessão, intent, helpful, n) -> contagens por hora e por dia nas três
+    dimensões. O tamanho da sessão é contado nas próprias linhas do período recalculado: uma sessão
+    que começou antes da janela (FEEDBACK_ROLLUP_LOOKBACK_HOURS, desde a meia-noite) conta só os
+    feedbacks de dentro dela. Contar a sessão inteira custaria, a cada rodada, uma busca por sessão
+    da janela no índice (session_id, created_at) de cada partição mensal, inclusive as antigas;
+    com --full (janela inteira) a contagem é a da sessão toda.
+    """
+    rows = list(rows)
+    lengths: Dict[Any, int] = defaultdict(int)
+    for row in rows:
+        if row["session_id"] is not None:
+            lengths[row["session_id"]] += row["n"]
+
+    counts: Dict[tuple, List[int]] = defaultdict(lambda: [0, 0, 0])
+    for row in rows:
+        hour = row["hour"]
+        day = timezone.localtime(hour).replace(hour=0) if timezone.is_aware(hour) else hour.replace(hour=0)
+        column = 0 if row["helpful"] is True else 1 if row["helpful"] is False else 2
+        session = row["session_id"]
+        keys = (
+            ("intent", row["detected_intent"] or "desconhecido"),
+            ("path", answer_path(row["detected_intent"])),
+            ("session_length", session_length_bucket(lengths[session]) if session is not None else "sem_sessao"),
+        )
+        for granularity, bucket in (("hour", hour), ("day", day)):
+            for dimension, key in keys:
+                counts[(granularity, bucket, dimension, key[:80])][column] += row["n"]
+
+    return [
+        FeedbackRollup(granularity=g, bucket_start=b, dimension=d, key=k,
+                       helpful=c[0], unhelpful=c[1], unrated=c[2], updated_at=stamp)
+        for (g, b, d, k), c in counts.items()
+    ]
+
+
+class FeedbackRollupService:
+    """
+    Agregados de feedback para dashboards (úteis/não úteis/sem avaliação por intent, caminho da
+    resposta e tamanho da sessão, por hora e por dia).
+
+    `refresh` recalcula as últimas FEEDBACK_ROLLUP_LOOKBACK_HOURS (a partir da meia-noite, para os
+    dias saírem inteiros) com uma consulta agrupada e grava por upsert; `summary` lê só a tabela de
+    agregados, então responde no mesmo tempo com mil ou cem milhões de feedbacks.
+    """
+
+    def __init__(self, repository: FeedbackRollupRepository | None = None,
+                 lookback_hours: int = FEEDBACK_ROLLUP_LOOKBACK_HOURS):
+        self.repository = repository or FeedbackRollupRepository()
+        self.lookback_hours = lookback_hours
+        self._task: PeriodicTask | None = None
+
+    def window_start(self, now: datetime | None = None) -> datetime:
+        since = timezone.localtime(now or timezone.now()) - timedelta(hours=self.lookback_hours)
+        return since.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def refresh(self, full: bool = False) -> Dict[str, Any]:
+        """Recalcula o período recente (ou tudo, com full=True) e grava os agregados."""
+        start = time.perf_counter()
+        stamp = timezone.now()
+        since = None if full else self.window_start(stamp)
+        rows = self.repository.aggregate_since(since)
+        rollups = build_rollups(rows, stamp)
+        removed = self.repository.replace_since(since or self._oldest_day(), rollups, stamp)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.observe("feedback_rollup_refresh_ms", elapsed_ms)
+        metrics.inc("feedback_rollup_refresh_total")
+        return {"since": since.isoformat() if since else None, "source_groups": len(rows),
+                "rollups": len(rollups), "removed": removed, "ms": round(elapsed_ms, 2)}
+
+    def _oldest_day(self) -> datetime | None:
+        # Na carga completa só se recalcula o que ainda existe: os dias anteriores ao feedback mais
+        # antigo (partições removidas pela retenção) mantêm os agregados
+        oldest = self.repository.earliest_created_at()
+        if oldest is None:
+            return None
+        day = timezone.localtime(oldest) if timezone.is_aware(oldest) else oldest
+        return day.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def start(self, interval: float = FEEDBACK_ROLLUP_SECS) -> bool:
+        """Atualização periódica no worker; interval <= 0 mantém desligado."""
+        if interval <= 0:
+            return False
+        if self._task is None:
+            self._task = PeriodicTask("feedback-rollup", self.refresh, interval)
+        self._task.start()
+        return True
+
+    def summary(self, dimension: str, granularity: str = "day", since: datetime | None = None,
+                until: datetime | None = None, keys: Iterable[str] = ()) -> Dict[str, Any]:
+        """Série por período e totais por chave, com a taxa de 'ajudou' entre as avaliações."""
+        until = until or timezone.now()
+        max_range = timedelta(days=MAX_RANGE_DAYS[granularity])
+        since = max(since or until - timedelta(days=7 if granularity == "hour" else 30), until - max_range)
+
+        series = self.repository.query(granularity, dimension, since, until, keys)
+        totals: Dict[str, Dict[str, int]] = defaultdict(lambda: dict.fromkeys(ROLLUP_COUNTS, 0))
+        for row in series:
+            for name in ROLLUP_COUNTS:
+                totals[row["key"]][name] += row[name]
+            self._add_rates(row)
+
+        return {
+            "dimension": dimension,
+            "granularity": granularity,
+            "since": since,
+            "until": until,
+            "updated_at": self.repository.last_updated(),
+            "totals": [self._add_rates({"key": key, **t}) for key, t in sorted(totals.items())],
+            "series": series,
+        }
+
+    @staticmethod
+    def _add_rates(row: Dict[str, Any]) -> Dict[str, Any]:
+        rated = row["helpful"] + row["unhelpful"]
+        row["total"] = rated + row["unrated"]
+        row["helpful_rate"] = round(row["helpful"] / rated, 4) if rated else None
+        return row
@@ -2,12 +2,17 @@ from difflib import SequenceMatcher
 from typing import Optional
 
 from ..models import Feedback
-from ..repositories import FeedbackRepository
+from ..repositories import FeedbackRepository, TextContentRepository
+from .feedback_writer_service import FeedbackWriterService
 
 
 class FeedbackService:
-    def __init__(self):
+    def __init__(self, writer: FeedbackWriterService | None = None):
         self.repository = FeedbackRepository()
+        if writer is None:
+            from ..runtime import get_feedback_writer_service
+            writer = get_feedback_writer_service()
+        self.writer = writer
 
     def get_next_session_id(self) -> int:
         return self.repository.get_next_session_id()
@@ -16,46 +21,60 @@ class FeedbackService:
             self, feedback_id, session_id,
             user_message, chatbot_response, helpful, detected_intent
     ):
+        # A gravação fica com o write-behind; a resposta sai sem esperar o banco
         if feedback_id:
-            feedback = self.repository.get_by_id(feedback_id)
+            fields = {}
             if session_id is not None:
-                feedback.session_id = session_id
+                fields["session_id"] = session_id
             if user_message is not None:
-                feedback.user_question = user_message
+                fields["user_question"] = user_message
             if chatbot_response is not None:
-                feedback.bot_answer = chatbot_response
+                fields["bot_answer"] = chatbot_response
 
             if helpful is not None:
-                feedback.helpful = helpful
-        else:
-            feedback = Feedback(
-                session_id=session_id,
-                user_question=user_message,
-                bot_answer=chatbot_response,
-                helpful=helpful,
-                detected_intent=detected_intent
-            )
-        self.repository.save(feedback)
-        return feedback
+                fields["helpful"] = helpful
+            return self.writer.update(feedback_id, fields)
+
+        return self.writer.create(
+            session_id=session_id,
+            user_question=user_message,
+            bot_answer=chatbot_response,
+            helpful=helpful,
+            detected_intent=detected_intent
+        )
 
     def get_all_feedback(self):
         return self.repository.get_all()
 
     def mark_consumed(self, feedback: Feedback):
-        return self.repository.mark_consumed(feedback)
+        return self.writer.mark_consumed(feedback)
 
     def get_last_unconsumed_negative(self, session_id: int | None):
-        return self.repository.get_last_unconsumed_negative(session_id)
+        if not session_id:
+            return None
+        # O que está na fila do write-behind é mais novo que o banco: vale o estado da fila
+        pending = self._pending_feedbacks(session_id)
+        consumed = self.writer.pending_consumed_ids()
+        stored = self.repository.get_last_unconsumed_negative(session_id, consumed | {f.id for f in pending})
+        negatives = [f for f in pending if f.helpful is False and not f.consumed and f.id not in consumed]
+        return self._latest(negatives + [stored])
 
     def get_last_feedback(self, session_id: int) -> Optional[Feedback]:
         if not session_id:
             return None
-        return (
-            Feedback.objects
-            .filter(session_id=session_id)
-            .order_by("-created_at")
-            .first()
-        )
+        pending = self._pending_feedbacks(session_id)
+        stored = self.repository.get_last_feedback(session_id)
+        if stored is not None and any(f.id == stored.id for f in pending):
+            stored = None
+        return self._latest(pending + [stored])
+
+    def _pending_feedbacks(self, session_id: int) -> list[Feedback]:
+        cutoff = self.repository.session_cutoff()
+        return [f for f in self.writer.pending_feedbacks(session_id) if f.created_at >= cutoff]
+
+    @staticmethod
+    def _latest(feedbacks: list[Feedback | None]) -> Optional[Feedback]:
+        return max((f for f in feedbacks if f is not None), key=lambda f: f.created_at, default=None)
 
     def session_needs_simplify(self, session_id: int) -> bool:
         """
@@ -64,6 +83,24 @@ class FeedbackService:
         last = self.get_last_feedback(session_id)
         return bool(last and last.helpful is False)
 
+    def _score_recent_negatives(self, text: str) -> list[tuple[float, int]]:
+        """
+        (score, id) dos últimos 200 feedbacks negativos. Perguntas repetidas apontam para o
+        mesmo texto deduplicado, então cada texto distinto é lido e comparado uma vez só.
+        """
+        rows = self.repository.get_recent_negative_questions(200)
+        texts = TextContentRepository.get_texts(question_id for _, question_id in rows)
+
+        text_norm = text.lower()
+        scores: dict = {}
+        scored = []
+        for pk, question_id in rows:
+            if question_id not in scores:
+                prev = texts.get(question_id, "").lower()
+                scores[question_id] = SequenceMatcher(None, text_norm, prev).ratio()
+            scored.append((scores[question_id], pk))
+        return scored
+
     def find_similar_negative_feedbacks(
             self,
             user_message: str,
@@ -78,42 +115,9 @@ class FeedbackService:
         if not user_message:
             return []
 
-        candidates = Feedback.objects.filter(helpful=False).order_by("-created_at")[:200]
-
-        user_msg_norm = user_message.lower()
-        scored: list[tuple[float, Feedback]] = []
-
-        for fb in candidates:
-            fb_msg = (fb.user_question or "").lower()
-            score = SequenceMatcher(None, user_msg_norm, fb_msg).ratio()
-            if score >= min_score:
-                scored.append((score, fb))
-
+        scored = [(score, pk) for score, pk in self._score_recent_negatives(user_message) if score >= min_score]
+        # sort estável: empates mantêm a ordem do mais recente para o mais antigo
         scored.sort(key=lambda t: t[0], reverse=True)
-        return [fb for score, fb in scored[:limit]]
-
-    def get_negative_intents_for_similar_text(self, text: str, min_score: float = 0.7):
-        """
-        Retorna uma lista de intents que já foram rejeitadas (helpful=False)
-        para perguntas parecidas com o texto atual.
-        """
-        if not text:
-            return []
-
-        bads = (
-            Feedback.objects
-            .filter(helpful=False)
-            .exclude(detected_intent__isnull=True)
-            .exclude(detected_intent__exact="")
-            .order_by("-created_at")[:200]
-        )
-
-        text_norm = text.lower()
-        intents = set()
-        for fb in bads:
-            prev = (fb.user_question or "").lower()
-            score = SequenceMatcher(None, text_norm, prev).ratio()
-            if score >= min_score:
-                intents.add(fb.detected_intent)
-
-        return list(intents)
\ No newline at end of file
+        top = [pk for _, pk in scored[:limit]]
+        by_id = {fb.id: fb for fb in self.repository.get_by_ids(top)} if top else {}
+        return [by_id[pk] for pk in top if pk in by_id]
@@ -0,0 +1,211 @@
+import logging
+import threading
+from typing import Any, Dict, List, Set, Tuple
+
+from cachetools import TTLCache
+from django.db import router, transaction
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from ..core import WriteBehindQueue, _env, metrics
+from ..models import Feedback
+from ..repositories import FeedbackRepository
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_WRITE_BEHIND = _env("FEEDBACK_WRITE_BEHIND", True, bool)
+FEEDBACK_QUEUE_MAXSIZE = _env("FEEDBACK_QUEUE_MAXSIZE", 10000, int)
+FEEDBACK_BATCH_SIZE = _env("FEEDBACK_BATCH_SIZE", 500, int)
+FEEDBACK_FLUSH_INTERVAL_SECS = _env("FEEDBACK_FLUSH_INTERVAL_SECS", 0.2, float)
+FEEDBACK_QUEUE_PUT_TIMEOUT_SECS = _env("FEEDBACK_QUEUE_PUT_TIMEOUT_SECS", 0.05, float)
+FEEDBACK_ID_BLOCK = _env("FEEDBACK_ID_BLOCK", 50, int)
+
+# Campos devolvidos pela API de feedback (lidos do banco quando não estão no cache local)
+RESPONSE_FIELDS = ("session_id", "user_question", "bot_answer", "helpful", "detected_intent", "consumed", "created_at")
+
+Operation = Tuple[str, Any, Dict[str, Any]]
+
+
+class FeedbackWriterService:
+    """
+    Grava feedbacks fora do caminho da requisição (write-behind).
+
+    Inserções, atualizações e a marcação de `consumed` entram numa fila em memória e são
+    gravadas em lote pela thread do WriteBehindQueue: um INSERT em lote, um UPDATE por
+    conjunto de campos e um UPDATE ... WHERE id IN (...) para os consumidos, na mesma transação.
+
+    Para devolver o id na hora, as inserções usam ids reservados em blocos na sequência
+    do PostgreSQL; em outros bancos (ou com a fila cheia) a gravação é síncrona, como antes.
+    Os ids marcados como consumidos e ainda não gravados ficam num conjunto consultado
+    por `get_last_unconsumed_negative`, para o mesmo feedback não ser usado duas vezes; e o estado
+    dos inserts/updates ainda na fila fica em `pending_feedbacks`, para as leituras da sessão
+    enxergarem o que este worker acabou de receber.
+    """
+
+    def __init__(self, repository: FeedbackRepository | None = None, enabled: bool = FEEDBACK_WRITE_BEHIND):
+        self.repository = repository or FeedbackRepository()
+        self.enabled = enabled
+        self.queue: WriteBehindQueue[Operation] = WriteBehindQueue(
+            "feedback", self._flush,
+            max_size=FEEDBACK_QUEUE_MAXSIZE,
+            batch_size=FEEDBACK_BATCH_SIZE,
+            linger=FEEDBACK_FLUSH_INTERVAL_SECS,
+            put_timeout=FEEDBACK_QUEUE_PUT_TIMEOUT_SECS,
+        )
+        self._reserved_ids: List[int] = []
+        self._ids_lock = threading.Lock()
+        self._pending_consumed: Set[int] = set()
+        self._consumed_lock = threading.Lock()
+        # id -> [operações na fila, estado] dos inserts/updates ainda não gravados
+        self._pending: Dict[int, list] = {}
+        self._pending_lock = threading.Lock()
+        # Estado dos feedbacks recentes deste worker: atualizações não precisam ler o banco
+        self._recent: TTLCache = TTLCache(maxsize=4096, ttl=600)
+
+    def create(self, **fields) -> Feedback:
+        feedback = Feedback(**fields)
+        feedback.created_at = timezone.now()
+        pk = self._next_id() if self.enabled else None
+        if pk is not None:
+            feedback.id = pk
+            self._track(feedback)
+            if self.queue.submit(("insert", pk, self._state(feedback))):
+                self._remember(feedback)
+                return feedback
+            self._untrack([pk])
+        self.repository.save(feedback, force_insert=pk is not None)
+        metrics.inc("feedback_sync_writes_total", labels={"op": "insert"})
+        self._remember(feedback)
+        return feedback
+
+    def update(self, feedback_id: int, fields: Dict[str, Any]) -> Feedback:
+        state = self._recent.get(feedback_id)
+        if state is None:
+            state = self.repository.get_fields(feedback_id, RESPONSE_FIELDS)
+        feedback = Feedback(id=feedback_id, **{**state, **fields})
+
+        if not fields:
+            return feedback
+        self._remember(feedback)
+        if self.enabled:
+            self._track(feedback)
+            if self.queue.submit(("update", feedback_id, fields)):
+                return feedback
+            self._untrack([feedback_id])
+        self.repository.bulk_update_fields({feedback_id: fields})
+        metrics.inc("feedback_sync_writes_total", labels={"op": "update"})
+        self._notify(feedback, created=False, update_fields=fields)
+        return feedback
+
+    def mark_consumed(self, feedback: Feedback):
+        if self.enabled:
+            with self._consumed_lock:
+                self._pending_consumed.add(feedback.id)
+            if self.queue.submit(("consumed", feedback.id, {})):
+                return
+            with self._consumed_lock:
+                self._pending_consumed.discard(feedback.id)
+        self.repository.mark_consumed(feedback)
+        metrics.inc("feedback_sync_writes_total", labels={"op": "consumed"})
+
+    def pending_consumed_ids(self) -> Set[int]:
+        with self._consumed_lock:
+            return set(self._pending_consumed)
+
+    def pending_feedbacks(self, session_id: int | None) -> List[Feedback]:
+        """Feedbacks da sessão com insert/update ainda na fila, no estado mais novo (o banco ainda não tem)."""
+        with self._pending_lock:
+            states = [(pk, state) for pk, (_, state) in self._pending.items() if state["session_id"] == session_id]
+        return [Feedback(id=pk, **state) for pk, state in states]
+
+    def flush(self, timeout: float | None = None) -> bool:
+        return self.queue.flush(timeout)
+
+    def close(self, timeout: float = 10.0) -> bool:
+        return self.queue.close(timeout)
+
+    @staticmethod
+    def _state(feedback: Feedback) -> Dict[str, Any]:
+        return {f: getattr(feedback, f) for f in RESPONSE_FIELDS}
+
+    def _remember(self, feedback: Feedback):
+        self._recent[feedback.id] = self._state(feedback)
+
+    def _track(self, feedback: Feedback):
+        # Registrado antes de entrar na fila: o flush pode gravar o lote antes de o submit voltar
+        with self._pending_lock:
+            entry = self._pending.get(feedback.id)
+            self._pending[feedback.id] = [(entry[0] if entry else 0) + 1, self._state(feedback)]
+
+    def _untrack(self, pks: List[int]):
+        with self._pending_lock:
+            for pk in pks:
+                entry = self._pending.get(pk)
+                if entry is not None:
+                    entry[0] -= 1
+                    if entry[0] <= 0:
+                        del self._pending[pk]
+
+    @staticmethod
+    def _notify(feedback: Feedback, created: bool, update_fields=None):
+        # bulk_create/bulk_update não disparam post_save; os receptores (ex.: blocklist) dependem dele
+        post_save.send(sender=Feedback, instance=feedback, created=created,
+                       update_fields=frozenset(update_fields) if update_fields else None,
+                       raw=False, using=router.db_for_write(Feedback))
+
+    def _next_id(self) -> int | None:
+        with self._ids_lock:
+            if not self._reserved_ids:
+                try:
+                    self._reserved_ids = self.repository.reserve_ids(FEEDBACK_ID_BLOCK)[::-1]
+                except Exception as e:
+                    logger.warning(f"Falha ao reservar ids de feedback, gravando de forma síncrona: {e}")
+                    return None
+            return self._reserved_ids.pop() if self._reserved_ids else None
+
+    def _flush(self, batch: List[Operation]):
+        inserts: Dict[int, Dict[str, Any]] = {}
+        updates: Dict[int, Dict[str, Any]] = {}
+        consumed: Set[int] = set()
+        consumed_ops: Set[int] = set()
+
+        # Consolida o lote: atualizações de um feedback ainda não inserido entram no próprio INSERT
+        for op, pk, fields in batch:
+            if op == "insert":
+                inserts[pk] = dict(fields)
+            elif op == "update":
+                (inserts.get(pk) or updates.setdefault(pk, {})).update(fields)
+            elif op == "consumed":
+                consumed_ops.add(pk)
+                if pk in inserts:
+                    inserts[pk]["consumed"] = True
+                else:
+                    consumed.add(pk)
+
+        created = [Feedback(id=pk, **fields) for pk, fields in inserts.items()]
+        with transaction.atomic(using=router.db_for_write(Feedback)):
+            if created:
+                self.repository.bulk_insert(created)
+            if updates:
+                self.repository.bulk_update_fields(updates)
+            if consumed:
+                self.repository.bulk_mark_consumed(consumed)
+
+        if consumed_ops:
+            with self._consumed_lock:
+                self._pending_consumed.difference_update(consumed_ops)
+        self._untrack([pk for op, pk, _ in batch if op in ("insert", "update")])
+        metrics.inc("feedback_written_total", len(created), labels={"op": "insert"})
+        metrics.inc("feedback_written_total", len(updates), labels={"op": "update"})
+        metrics.inc("feedback_written_total", len(consumed), labels={"op": "consumed"})
+
+        # Depois do commit nada pode levantar exceção: a retentativa regravaria o lote e, com a
+        # chave (id, created_at) da tabela particionada, duplicaria as inserções
+        try:
+            for feedback in created:
+                self._notify(feedback, created=True)
+            for pk, fields in updates.items():
+                state = {**(self._recent.get(pk) or {}), **fields}
+                self._notify(Feedback(id=pk, **state), created=False, update_fields=fields)
+        except Exception as e:
+            logger.warning(f"Falha ao notificar post_save de feedbacks gravados em lote: {e}")
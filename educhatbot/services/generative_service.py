@@ -1,29 +1,121 @@
-import os
-import google.generativeai as genai
 from dotenv import load_dotenv
 import logging
+import time
+from typing import Callable
+
+from ..core import (
+    Continuation, DeadlineExceeded, GeneratedText, LLMBackend, ModelRouter, OverloadedError, current_channel,
+    estimate_tokens, get_model_router, metrics, output_budget
+)
 
 logger = logging.getLogger(__name__)
 
+OUTPUT_TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
 
 class GenerativeService:
-    def __init__(self):
+    def __init__(self, backend: LLMBackend | None = None, router: ModelRouter | None = None):
         load_dotenv()
-        api_key = os.getenv("GEMINI_API_KEY")
-        model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")  # Fallback seguro
-
-        if not api_key:
-            raise ValueError("A chave GEMINI_API_KEY não foi encontrada.")
-
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(model_name)
+        # Modelo por chamada escolhido pelo roteador (GEMINI_GENERATIVE_MODEL / GEMINI_FAST_MODEL)
+        self.router = router or (ModelRouter(backend) if backend is not None else get_model_router())
+        self.backend = self.router.backend
+        self.model_name = self.router.generative_model
         logger.info("GenerativeService inicializado.")
 
-    def generate_free_response(self, prompt_usuario: str) -> str:
+    def generate_free_response(self, prompt_usuario: str, contexto: list[str] | None = None,
+                               intent: str | None = None, on_chunk: Callable[[str], None] | None = None,
+                               max_output_tokens: int | None = None) -> str:
         """
         Gera uma resposta conversacional com links de busca seguros contra alucinação.
+        `contexto` são trechos oficiais (FAQ/conteúdos) recuperados localmente para embasar a resposta;
+        `intent` (do NLU) ajuda o roteador a escolher o modelo e, com o canal da requisição, define o
+        teto de tokens de saída (`max_output_tokens` explícito tem precedência).
+        Com `on_chunk`, o texto é gerado em streaming e cada pedaço é repassado assim que chega.
+
+        Se a resposta parar no teto, o texto devolvido traz `continuation` para o "quer que eu continue?".
+        """
+        budget = max_output_tokens or output_budget(intent)
+        prompt_completo = self.build_prompt(prompt_usuario, contexto, budget)
+        return self._generate(prompt_completo, prompt_completo, "", intent, budget, len(prompt_usuario), on_chunk)
+
+    def continue_response(self, continuation: Continuation, on_chunk: Callable[[str], None] | None = None) -> str:
+        """Continua uma resposta cortada a partir do prompt e do trecho já enviados, sem gerar tudo de novo."""
+        prompt = (
+            f"{continuation.prompt}\n"
+            f"        Você já enviou este começo da resposta (não repita nada dele):\n"
+            f'        """{continuation.partial}"""\n'
+            f"        Continue exatamente de onde parou e conclua."
+        )
+        return self._generate(prompt, continuation.prompt, continuation.partial, continuation.intent,
+                              continuation.max_output_tokens, len(continuation.partial), on_chunk)
+
+    def rewrite_simpler(self, resposta: str, intent: str = "simplificar_resposta",
+                        on_chunk: Callable[[str], None] | None = None) -> str:
+        """
+        Reescreve uma resposta já dada de forma mais simples. O modelo só encurta o texto que recebe,
+        em vez de responder a pergunta de novo: prompt e saída pequenos, e vai para o modelo rápido.
+        """
+        budget = output_budget(intent)
+        prompt = f"""
+        Reescreva a resposta abaixo para um aluno que não entendeu: bem mais curta (no máximo umas
+        {max(20, int(budget * 0.7))} palavras), em linguagem simples, sem jargões e, se couber, com uma analogia
+        do dia a dia. Mantenha links, nomes, horários e números exatamente como estão e não acrescente informações.
+
+        Resposta original:
+        \"\"\"{resposta}\"\"\"
         """
-        prompt_completo = f"""
+        return self._generate(prompt, prompt, "", intent, budget, len(resposta), on_chunk)
+
+    def _generate(self, prompt: str, base_prompt: str, previous: str, intent: str | None, budget: int,
+                  input_chars: int, on_chunk: Callable[[str], None] | None) -> str:
+        config = {"max_output_tokens": budget}
+        channel = current_channel()
+        start = time.perf_counter()
+        try:
+            if on_chunk is None:
+                text = self.router.generate("generative", prompt, generation_config=config, intent=intent,
+                                            input_chars=input_chars)
+                truncated, tokens = getattr(text, "truncated", False), getattr(text, "output_tokens", None)
+            else:
+                parts, truncated, tokens = [], False, None
+                for chunk in self.router.stream("generative", prompt, generation_config=config, intent=intent,
+                                                input_chars=input_chars):
+                    truncated = truncated or getattr(chunk, "truncated", False)
+                    tokens = getattr(chunk, "output_tokens", None) or tokens
+                    if chunk:
+                        parts.append(chunk)
+                        on_chunk(chunk)
+                text = "".join(parts)
+        except (OverloadedError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            return "Desculpe, não consegui gerar a resposta agora."
+
+        labels = {"channel": channel, "budget": str(budget)}
+        metrics.observe("generative_output_tokens", tokens or estimate_tokens(text), labels,
+                        buckets=OUTPUT_TOKEN_BUCKETS)
+        metrics.observe("generative_latency_ms", (time.perf_counter() - start) * 1000, labels)
+        answer = GeneratedText(text, truncated, tokens)
+        if truncated:
+            metrics.inc("generative_truncated_total", labels={"channel": channel})
+            answer.continuation = Continuation(base_prompt, previous + text, intent, budget)
+        return answer
+
+    @staticmethod
+    def build_prompt(prompt_usuario: str, contexto: list[str] | None = None,
+                     max_output_tokens: int | None = None) -> str:
+        """Instruções da resposta livre (também usadas no modo combinado do NLU)."""
+        bloco_contexto = ""
+        if contexto:
+            trechos = "\n".join(f"        - {c}" for c in contexto)
+            bloco_contexto = (
+                "CONTEXTO OFICIAL (use se for relevante para a pergunta; não invente além dele):\n"
+                f"{trechos}\n"
+            )
+        # O teto vai também no texto: o modelo planeja a resposta para caber, em vez de ser cortado
+        tamanho = f" (no máximo umas {max(20, int(max_output_tokens * 0.7))} palavras)" if max_output_tokens else ""
+
+        return f"""
         Você é o ED, chatbot da UNISINOS.
 
         REGRA DE OURO PARA LINKS (Anti-Alucinação):
@@ -35,13 +127,8 @@ class GenerativeService:
            - https://www.unisinos.br/graduacao
            - https://www.unisinos.br/biblioteca
 
+        {bloco_contexto}
         Pergunta: "{prompt_usuario}"
 
-        Responda de forma útil, curta e inclua 1 link de busca no final se o assunto pedir aprofundamento.
-        """
-
-        try:
-            response = self.model.generate_content(prompt_completo)
-            return response.text
-        except Exception as e:
-            return "Desculpe, não consegui gerar a resposta agora."
\ No newline at end of file
+        Responda de forma útil, curta{tamanho} e inclua 1 link de busca no final se o assunto pedir aprofundamento.
+        """
\ No newline at end of file
@@ -0,0 +1,96 @@
+import hashlib
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FuturesTimeout
+from typing import Any, Callable, Dict, Tuple
+
+from cachetools import TTLCache
+
+from ..core import CHAT_DEADLINE_MAX_SECS, CHAT_DEADLINE_SECS, OverloadedError, _env, metrics
+
+# Resultados guardados por chave (retentativas do app chegam em segundos, não em horas)
+IDEMPOTENCY_TTL_SECS = _env("IDEMPOTENCY_TTL_SECS", 300, int)
+IDEMPOTENCY_MAXSIZE = _env("IDEMPOTENCY_MAXSIZE", 10000, int)
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# Quanto uma retentativa espera pela execução em andamento antes de desistir: mais que o maior prazo
+# possível de um turno, para nunca desistir enquanto a primeira ainda pode responder
+IDEMPOTENCY_WAIT_SECS = _env("IDEMPOTENCY_WAIT_SECS", max(CHAT_DEADLINE_SECS, CHAT_DEADLINE_MAX_SECS) + 5, float)
+
+
+class IdempotencyConflict(Exception):
+    """A mesma chave foi reutilizada com outro conteúdo."""
+
+
+def fingerprint(*parts: Any) -> str:
+    return hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()
+
+
+class IdempotencyService:
+    """
+    Chaves de idempotência (cabeçalho Idempotency-Key) do /api/chat, por worker.
+
+    A primeira requisição com uma chave executa o pipeline e o resultado fica guardado por
+    IDEMPOTENCY_TTL_SECS; retentativas recebem o mesmo resultado sem chamar o LLM de novo, e
+    as que chegam enquanto a primeira ainda roda esperam por ela em vez de começar outra.
+    A chave vale junto com a impressão digital do pedido: reutilizá-la com outro texto é conflito.
+    """
+
+    def __init__(self, ttl: int = IDEMPOTENCY_TTL_SECS, maxsize: int = IDEMPOTENCY_MAXSIZE,
+                 wait_timeout: float = IDEMPOTENCY_WAIT_SECS):
+        self.wait_timeout = wait_timeout
+        self._done: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._in_flight: Dict[str, Tuple[str, Future]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _check(key: str, expected: str, got: str):
+        if expected != got:
+            metrics.inc("idempotency_requests_total", labels={"outcome": "conflict"})
+            raise IdempotencyConflict(f"Idempotency-Key '{key}' já usada com outro pedido.")
+
+    def known(self, key: str) -> bool:
+        """True se a chave já tem resultado guardado ou execução em andamento."""
+        with self._lock:
+            return key in self._done or key in self._in_flight
+
+    def execute(self, key: str, request_fingerprint: str, fn: Callable[[], Any],
+                cacheable: Callable[[Any], bool] = lambda result: True) -> Tuple[Any, str]:
+        """
+        Executa `fn` uma única vez por chave. Devolve (resultado, origem), com origem
+        "new", "replayed" ou "joined". Exceções não são guardadas: a próxima tentativa executa de novo.
+        """
+        with self._lock:
+            done = self._done.get(key)
+            entry = self._in_flight.get(key) if done is None else None
+            if done is None and entry is None:
+                future: Future = Future()
+                self._in_flight[key] = (request_fingerprint, future)
+
+        if done is not None:
+            self._check(key, done[0], request_fingerprint)
+            metrics.inc("idempotency_requests_total", labels={"outcome": "replayed"})
+            return done[1], "replayed"
+
+        if entry is not None:
+            self._check(key, entry[0], request_fingerprint)
+            metrics.inc("idempotency_requests_total", labels={"outcome": "joined"})
+            try:
+                return entry[1].result(timeout=self.wait_timeout), "joined"
+            except FuturesTimeout:
+                raise OverloadedError("idempotency_wait")
+
+        metrics.inc("idempotency_requests_total", labels={"outcome": "new"})
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._in_flight.pop(key, None)
+            if cacheable(result):
+                self._done[key] = (request_fingerprint, result)
+        future.set_result(result)
+        return result, "new"
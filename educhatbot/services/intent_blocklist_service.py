@@ -0,0 +1,85 @@
+import threading
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+from ..core import PeriodicTask, _env, metrics, normalize_question, question_signature
+from ..repositories import FeedbackRepository
+
+BLOCKLIST_WINDOW = _env("INTENT_BLOCKLIST_WINDOW", 1000, int)
+BLOCKLIST_REFRESH_SECS = _env("INTENT_BLOCKLIST_REFRESH_SECS", 60.0, float)
+
+
+class IntentBlocklistService:
+    """
+    Índice em memória (por worker): cluster de pergunta -> intents já rejeitadas (helpful=False).
+
+    A consulta por turno é um lookup O(1) em dicionário, sem acesso ao banco.
+    O índice é reconstruído em background a cada INTENT_BLOCKLIST_REFRESH_SECS a partir
+    dos últimos INTENT_BLOCKLIST_WINDOW feedbacks negativos, e recebe inserções
+    incrementais pelo sinal post_save do Feedback no próprio worker.
+    """
+
+    def __init__(self, window: int = BLOCKLIST_WINDOW, refresh_secs: float = BLOCKLIST_REFRESH_SECS):
+        self.window = window
+        self.refresh_secs = refresh_secs
+        self.repository = FeedbackRepository()
+        self._by_text: Dict[str, FrozenSet[str]] = {}
+        self._by_signature: Dict[str, FrozenSet[str]] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._task = PeriodicTask("intent-blocklist-refresh", self.rebuild, refresh_secs)
+
+    @staticmethod
+    def _build(rows: Iterable[Tuple[str, str]]) -> Tuple[Dict[str, FrozenSet[str]], Dict[str, FrozenSet[str]]]:
+        by_text: Dict[str, set] = {}
+        by_signature: Dict[str, set] = {}
+        for question, intent in rows:
+            norm = normalize_question(question)
+            if not norm or not intent:
+                continue
+            by_text.setdefault(norm, set()).add(intent)
+            sig = question_signature(norm)
+            if sig:
+                by_signature.setdefault(sig, set()).add(intent)
+        return (
+            {k: frozenset(v) for k, v in by_text.items()},
+            {k: frozenset(v) for k, v in by_signature.items()},
+        )
+
+    def rebuild(self) -> int:
+        rows = self.repository.get_recent_negative_intents(self.window)
+        by_text, by_signature = self._build(rows)
+        with self._lock:
+            self._by_text, self._by_signature = by_text, by_signature
+            self._loaded = True
+        metrics.inc("intent_blocklist_rebuilds_total")
+        metrics.set_gauge("intent_blocklist_clusters", len(by_text))
+        return len(by_text)
+
+    def add(self, question: str | None, intent: str | None):
+        """Inclusão incremental (sinal de feedback negativo)."""
+        norm = normalize_question(question)
+        if not norm or not intent:
+            return
+        sig = question_signature(norm)
+        with self._lock:
+            # frozensets substituídos por atribuição: leitores nunca veem um set mutando
+            self._by_text[norm] = self._by_text.get(norm, frozenset()) | {intent}
+            if sig:
+                self._by_signature[sig] = self._by_signature.get(sig, frozenset()) | {intent}
+
+    def lookup(self, text: str | None) -> List[str]:
+        norm = normalize_question(text)
+        if not norm:
+            return []
+        intents = self._by_text.get(norm, frozenset()) | self._by_signature.get(question_signature(norm), frozenset())
+        if intents:
+            metrics.inc("intent_blocklist_hits_total")
+        return sorted(intents)
+
+    def start(self):
+        # Se o warmup já montou o índice, a thread só faz as reconstruções periódicas
+        self._task.run_immediately = not self._loaded
+        self._task.start()
+
+    def stop(self):
+        self._task.stop()
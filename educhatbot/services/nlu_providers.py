@@ -0,0 +1,327 @@
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+import unicodedata
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from django.conf import settings
+
+from ..core import DeadlineExceeded, OverloadedError, current_deadline, metrics, normalize_question
+
+logger = logging.getLogger(__name__)
+
+VALID_INTENTS = frozenset({
+    "buscar_conteudo_disciplina",
+    "aprofundar_topico",
+    "consultar_informacao_institucional",
+    "buscar_video_educacional",
+    "explicar_funcionalidades",
+    "saudacao",
+    "modo_generativo",
+    "desconhecido",
+    "erro_processamento",
+})
+
+
+class NLUProvider(ABC):
+    """
+    Classificador de intenção. `classify(text, question)` devolve
+    {"intent", "entities", "confidence"}; `text` pode trazer o histórico da conversa
+    e `question` é só a mensagem atual.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def classify(self, text: str, question: str) -> Dict[str, Any]:
+        """{"intent", "entities", "confidence"} da mensagem."""
+
+    def warmup(self) -> None:
+        """Pré-carrega SDK/cliente (opcional)."""
+        return None
+
+    def analyze(self, text: str, question: str) -> Dict[str, Any]:
+        """classify() com métricas de latência e de intents por provedor."""
+        start = time.perf_counter()
+        try:
+            result = self.classify(text, question)
+        finally:
+            metrics.observe("nlu_latency_ms", (time.perf_counter() - start) * 1000, {"provider": self.name})
+        result.setdefault("provider", self.name)
+        metrics.inc("nlu_requests_total", labels={"provider": self.name, "intent": result.get("intent", "")})
+        return result
+
+
+class GeminiNLUProvider(NLUProvider):
+    """Classificação pelo LLM (prompt few-shot do NLUService); é a referência das demais."""
+
+    name = "gemini"
+
+    def __init__(self, classify_fn: Callable[[str, str], Dict[str, Any]]):
+        self._classify = classify_fn
+
+    def classify(self, text: str, question: str) -> Dict[str, Any]:
+        result = self._classify(text, question)
+        result.setdefault("confidence", 0.0 if result.get("intent") == "erro_processamento" else 1.0)
+        return result
+
+
+class DialogflowNLUProvider(NLUProvider):
+    """
+    Dialogflow ES (detect_intent). Os nomes das intents do agente são os mesmos do chatbot;
+    o SDK só é importado na primeira chamada.
+    """
+
+    name = "dialogflow"
+
+    def __init__(self, project_id: str | None = None, language_code: str | None = None,
+                 transport: str | None = None):
+        self.project_id = project_id or settings.DIALOGFLOW_PROJECT_ID
+        self.language_code = language_code or settings.DIALOGFLOW_LANGUAGE_CODE
+        self.transport = transport or settings.DIALOGFLOW_TRANSPORT
+        self._sdk = None
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from google.cloud import dialogflow_v2 as dialogflow
+                    self._sdk = dialogflow
+                    self._client = dialogflow.SessionsClient(transport=self.transport)
+        return self._client
+
+    def warmup(self) -> None:
+        self._get_client()
+
+    def classify(self, text: str, question: str) -> Dict[str, Any]:
+        try:
+            client = self._get_client()
+            dialogflow = self._sdk
+            # Sessão derivada da pergunta: o contexto da conversa é do chatbot, não do agente
+            session = client.session_path(self.project_id, hashlib.sha1(question.encode("utf-8")).hexdigest()[:16])
+            query_input = dialogflow.QueryInput(text=dialogflow.TextInput(text=question[:256],
+                                                                           language_code=self.language_code))
+            deadline = current_deadline()
+            response = client.detect_intent(request={"session": session, "query_input": query_input},
+                                            timeout=None if deadline is None else max(0.1, deadline.remaining()))
+        except Exception as e:
+            logger.warning(f"Erro no Dialogflow: {e}")
+            return {"intent": "erro_processamento", "entities": {"error": str(e)}, "confidence": 0.0}
+
+        query = response.query_result
+        intent = query.intent.display_name if query.intent else ""
+        entities = {k: v for k, v in query.parameters.items() if v not in ("", None)}
+        return {
+            "intent": intent if intent in VALID_INTENTS else "desconhecido",
+            "entities": entities,
+            "confidence": float(query.intent_detection_confidence or 0.0),
+        }
+
+
+_CAMPI = {"sao leopoldo": "São Leopoldo", "porto alegre": "Porto Alegre"}
+_LOCAIS = ("biblioteca", "secretaria", "restaurante universitario", "ginasio", "laboratorio", "centro academico")
+_INFOS = (
+    ("faq", ("faq", "perguntas frequentes", "duvidas frequentes")),
+    ("contatos", ("telefone", "contato", "email", "e mail", "endereco", "fone")),
+    ("horarios", ("horario", "abre", "fecha", "funcionamento")),
+)
+_GREETING = re.compile(r"^(oi+|ola|bom dia|boa tarde|boa noite|e ai|eai|hey|tudo bem)( (tudo bem|tudo bom|ed|bot))*$")
+_FUNCIONALIDADES = re.compile(r"\b(como (voce|vc) funciona|o que (voce|vc) (faz|sabe fazer)|quais (sao )?suas funcoes|me ajuda com o que)\b")
+_VIDEO = re.compile(r"\bvideos?\b(?: (?:sobre|de|da|do|das|dos))? (?P<assunto>.+)$")
+_DISCIPLINAS = re.compile(r"\b(quais disciplinas|que disciplinas|lista de disciplinas|disciplinas disponiveis)\b")
+_CONTEUDO = re.compile(r"\b(?:conteudos?|materias?|materiais|ementa) (?:de|da|do|sobre) (?P<disciplina>[\w ]+?)$")
+_TOPICO = re.compile(r"\b(?:me explica|explique|explica|aprofund\w*(?: em)?|quero saber mais sobre|me fala sobre|o que e) "
+                     r"(?:o |a |os |as )?(?P<topico>.+)$")
+_INSTITUCIONAL = re.compile(r"\b(horario|biblioteca|secretaria|campus|telefone|contato|faq|perguntas frequentes|endereco)")
+
+
+def _normalize_with_offsets(text: str) -> tuple[str, list[int]]:
+    """normalize_question(text) e, para cada caractere dele, a posição de origem em `text`."""
+    chars: list[str] = []
+    offsets: list[int] = []
+    for i, c in enumerate(text):
+        for d in unicodedata.normalize("NFKD", c.lower()):
+            if unicodedata.combining(d):
+                continue
+            if d.isspace() or not re.match(r"\w", d):
+                if chars and chars[-1] != " ":
+                    chars.append(" ")
+                    offsets.append(i)
+            else:
+                chars.append(d)
+                offsets.append(i)
+    if chars and chars[-1] == " ":
+        chars.pop()
+        offsets.pop()
+    return "".join(chars), offsets
+
+
+class LocalRulesNLUProvider(NLUProvider):
+    """
+    Regras locais (regex sobre o texto normalizado), sem rede. Cobre os pedidos diretos
+    e frequentes; o resto sai como "desconhecido" com confiança zero, para a cascata
+    escalar ao LLM. Os trechos livres (assunto, disciplina, tópico) são recortados do texto
+    original, com acentos e maiúsculas, como os do Gemini.
+    """
+
+    name = "local"
+
+    def classify(self, text: str, question: str) -> Dict[str, Any]:
+        norm, offsets = _normalize_with_offsets(question)
+
+        def original(match: re.Match, group: str) -> str:
+            start, end = match.span(group)
+            return question[offsets[start]:offsets[end - 1] + 1].strip() if end > start else ""
+
+        if _GREETING.match(norm):
+            return self._result("saudacao", {}, 0.95)
+        if _FUNCIONALIDADES.search(norm):
+            return self._result("explicar_funcionalidades", {}, 0.9)
+
+        match = _VIDEO.search(norm)
+        if match:
+            return self._result("buscar_video_educacional", {"assunto": original(match, "assunto")}, 0.85)
+
+        if _INSTITUCIONAL.search(norm):
+            entities = {}
+            local = next((l for l in _LOCAIS if l in norm), "")
+            campus = next((nome for chave, nome in _CAMPI.items() if chave in norm), "")
+            info = next((info for info, cues in _INFOS if any(c in norm for c in cues)), "")
+            if local:
+                entities["local"] = local
+            if campus:
+                entities["campus"] = campus
+            if info:
+                entities["info"] = info
+            # Sem local nem info explícita o pedido é ambíguo (ex.: "campus de São Leopoldo")
+            return self._result("consultar_informacao_institucional", entities, 0.9 if (local or info) else 0.5)
+
+        if _DISCIPLINAS.search(norm):
+            return self._result("buscar_conteudo_disciplina", {"disciplina": ""}, 0.9)
+        match = _CONTEUDO.search(norm)
+        if match:
+            return self._result("buscar_conteudo_disciplina", {"disciplina": original(match, "disciplina")}, 0.85)
+
+        match = _TOPICO.search(norm)
+        if match:
+            return self._result("aprofundar_topico", {"topico": original(match, "topico")}, 0.7)
+
+        return self._result("desconhecido", {}, 0.0)
+
+    @staticmethod
+    def _result(intent: str, entities: dict, confidence: float) -> Dict[str, Any]:
+        return {"intent": intent, "entities": entities, "confidence": confidence}
+
+
+class FakeNLUProvider(NLUProvider):
+    """Provedor fixo para testes e carga: `responder(text, question)` ou a mesma intent sempre."""
+
+    name = "fake"
+
+    def __init__(self, intent: str = "desconhecido", entities: dict | None = None, confidence: float = 1.0,
+                 responder: Optional[Callable[[str, str], Dict[str, Any]]] = None):
+        self.intent = intent
+        self.entities = entities or {}
+        self.confidence = confidence
+        self.responder = responder
+
+    def classify(self, text: str, question: str) -> Dict[str, Any]:
+        if self.responder is not None:
+            return self.responder(text, question)
+        return {"intent": self.intent, "entities": dict(self.entities), "confidence": self.confidence}
+
+
+class CascadingNLUProvider(NLUProvider):
+    """
+    Cascata: o provedor rápido responde quando a confiança passa de `min_confidence`;
+    senão o turno é reclassificado pelo provedor de referência (Gemini).
+
+    A concordância entre os dois (`nlu_agreement_total{provider, agree}`) vem dos turnos
+    escalados e de uma amostra (`shadow_rate`) das respostas confiantes, reclassificadas
+    em background, e serve de estimativa da precisão do provedor rápido.
+    """
+
+    name = "cascade"
+
+    def __init__(self, fast: NLUProvider, fallback: NLUProvider, min_confidence: float = 0.8,
+                 shadow_rate: float = 0.0):
+        self.fast = fast
+        self.fallback = fallback
+        self.min_confidence = min_confidence
+        self.shadow_rate = shadow_rate
+        self._shadow = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nlu-shadow")
+        self._shadow_busy = threading.Lock()
+
+    def warmup(self) -> None:
+        self.fast.warmup()
+        self.fallback.warmup()
+
+    def classify(self, text: str, question: str) -> Dict[str, Any]:
+        try:
+            first = self.fast.analyze(text, question)
+        except (OverloadedError, DeadlineExceeded):
+            raise
+        except Exception as e:
+            logger.warning(f"Provedor NLU {self.fast.name} falhou: {e}")
+            first = {"intent": "erro_processamento", "entities": {}, "confidence": 0.0}
+
+        if first.get("confidence", 0.0) >= self.min_confidence and first.get("intent") != "desconhecido":
+            metrics.inc("nlu_cascade_total", labels={"outcome": "fast", "provider": self.fast.name})
+            if self.shadow_rate > 0 and random.random() < self.shadow_rate:
+                self._start_shadow(text, question, first)
+            return first
+
+        metrics.inc("nlu_cascade_total", labels={"outcome": "escalated", "provider": self.fast.name})
+        result = self.fallback.analyze(text, question)
+        if first.get("intent") not in ("desconhecido", "erro_processamento"):
+            self._record_agreement(first, result, "escalated")
+        return result
+
+    def _record_agreement(self, first: Dict[str, Any], reference: Dict[str, Any], source: str):
+        if reference.get("intent") == "erro_processamento":
+            return
+        agree = first.get("intent") == reference.get("intent")
+        metrics.inc("nlu_agreement_total",
+                    labels={"provider": self.fast.name, "agree": str(agree).lower(), "source": source})
+
+    def _start_shadow(self, text: str, question: str, first: Dict[str, Any]):
+        # No máximo uma reclassificação de sombra por vez: o custo extra fica limitado
+        if not self._shadow_busy.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self._record_agreement(first, self.fallback.analyze(text, question), "shadow")
+            except Exception as e:
+                logger.debug(f"Reclassificação de sombra falhou: {e}")
+            finally:
+                self._shadow_busy.release()
+
+        self._shadow.submit(run)
+
+
+def build_nlu_provider(name: str, gemini: NLUProvider) -> NLUProvider:
+    """Provedor de NLU_PROVIDER: gemini, dialogflow, local, fake ou cascade."""
+    name = (name or "gemini").strip().lower()
+    if name == "gemini":
+        return gemini
+    if name == "dialogflow":
+        return DialogflowNLUProvider()
+    if name in ("local", "local-rules"):
+        return LocalRulesNLUProvider()
+    if name == "fake":
+        return FakeNLUProvider()
+    if name == "cascade":
+        fast_name = settings.NLU_CASCADE_FAST.strip().lower()
+        if fast_name in ("cascade", "gemini"):
+            raise ValueError(f"NLU_CASCADE_FAST inválido: {fast_name}")
+        return CascadingNLUProvider(build_nlu_provider(fast_name, gemini), gemini,
+                                    settings.NLU_CASCADE_MIN_CONFIDENCE, settings.NLU_SHADOW_RATE)
+    raise ValueError(f"NLU_PROVIDER desconhecido: {name}")
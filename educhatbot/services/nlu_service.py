@@ -1,69 +1,121 @@
-import os
 import json
 import re
 from typing import Any, Dict, List
 
-import google.generativeai as genai
-from google.generativeai.types import GenerationConfigDict
+from django.conf import settings
 from dotenv import load_dotenv
+
+from ..core import DeadlineExceeded, LLMBackend, ModelRouter, OverloadedError, get_model_router, metrics
 from .educational_content_service import EducationalContentService
 from .feedback_service import FeedbackService
+from .intent_blocklist_service import IntentBlocklistService
+from .nlu_providers import VALID_INTENTS, GeminiNLUProvider, NLUProvider, build_nlu_provider
+
+# Intents sem handler estruturado: a resposta vem da recuperação local ou do gerador
+NON_STRUCTURED_INTENTS = ("saudacao", "desconhecido", "modo_generativo")
 
 
 class NLUService:
     """
     Um serviço para realizar tarefas de NLU (Natural Language Understanding)
     usando a API do Google Gemini, otimizado para um chatbot educacional.
+    O provedor da classificação vem de NLU_PROVIDER (ver nlu_providers).
     """
 
-    def __init__(self):
+    def __init__(self, content_service: EducationalContentService | None = None,
+                 feedback_service: FeedbackService | None = None,
+                 backend: LLMBackend | None = None,
+                 intent_blocklist: IntentBlocklistService | None = None,
+                 router: ModelRouter | None = None,
+                 provider: NLUProvider | None = None):
         load_dotenv()
-        api_key = os.getenv("GEMINI_API_KEY")
-        model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
-
-        if not api_key:
-            raise ValueError("A chave GEMINI_API_KEY não foi encontrada. Verifique seu arquivo .env")
-
-        genai.configure(api_key=api_key)
+        # Modelo e hedging vêm do roteador (GEMINI_NLU_MODEL); `backend` monta um roteador próprio
+        self.router = router or (ModelRouter(backend) if backend is not None else get_model_router())
+        self.backend = self.router.backend
+        self.model_name = self.router.nlu_model
 
         # Configuração para garantir saída JSON
-        gen_cfg: GenerationConfigDict = {
+        self.generation_config = {
             "response_mime_type": "application/json",
             "temperature": 0.2,  # Temperatura baixa para ser mais determinístico
         }
-
-        self.model = genai.GenerativeModel(
-            model_name,
-            generation_config=gen_cfg,
-            system_instruction="Você é um assistente de NLU. Retorne APENAS um objeto JSON válido contendo as chaves 'intent' e 'entities'.",
+        self.system_instruction = (
+            "Você é um assistente de NLU. Retorne APENAS um objeto JSON válido contendo as chaves 'intent' e 'entities'."
+        )
+        self.combined_system_instruction = (
+            "Você é o ED, assistente da UNISINOS. Retorne APENAS um objeto JSON válido contendo as chaves "
+            "'intent', 'entities' e 'answer'."
         )
 
-        self.content_service = EducationalContentService()
-        self.feedback_service = FeedbackService()
+        self.content_service = content_service or EducationalContentService()
+        self.feedback_service = feedback_service or FeedbackService()
+        if intent_blocklist is None:
+            from ..runtime import get_intent_blocklist_service
+            intent_blocklist = get_intent_blocklist_service()
+        self.intent_blocklist = intent_blocklist
         print("NLUService inicializado com sucesso.")
 
-        self._intents_validas = {
-            "buscar_conteudo_disciplina",
-            "aprofundar_topico",
-            "consultar_informacao_institucional",
-            "buscar_video_educacional",
-            "explicar_funcionalidades",
-            "saudacao",
-            "modo_generativo",
-            "desconhecido",
-            "erro_processamento",
-        }
+        self._intents_validas = VALID_INTENTS
+
+        # Classificação por NLU_PROVIDER; o Gemini (prompt abaixo) é o provedor padrão e a referência da cascata
+        self.gemini_provider = GeminiNLUProvider(self._analyze_with_gemini)
+        self.provider = provider or build_nlu_provider(settings.NLU_PROVIDER, self.gemini_provider)
 
-    def analyze_text(self, text: str) -> dict:
+    def analyze_text(self, text: str, question: str | None = None) -> dict:
         """
         Analisa o texto para extrair intenção e entidades.
+        `question` é a mensagem atual sem o histórico (usada para consultar os feedbacks negativos).
         """
         user_text = (text or "").strip()
+        question = question if question is not None else user_text
+        result = self.provider.analyze(user_text, question)
+        if not isinstance(result.get("entities"), dict):
+            result["entities"] = {}
+        self._apply_blocklist(result, question, result.get("provider", self.provider.name))
+        return self._normalize_entities(result)
+
+    def _apply_blocklist(self, result: dict, question: str, provider: str):
+        # Vale para qualquer provedor e modo: só o Gemini recebe a lista no prompt, e mesmo ele pode insistir
+        if result.get("intent") in self.intent_blocklist.lookup(question):
+            metrics.inc("nlu_blocked_intent_total", labels={"provider": provider})
+            result["intent"] = "desconhecido"
+
+    def _analyze_with_gemini(self, user_text: str, question: str) -> dict:
+        return self._run("nlu", self._build_prompt(user_text, question), self.system_instruction, user_text)
+
+    def analyze_and_answer(self, text: str, question: str | None = None, answer_prompt: str = "") -> dict:
+        """
+        Modo combinado: uma única chamada devolve intent, entities e um rascunho de resposta
+        ("answer"), preenchido só para as intents não estruturadas (NON_STRUCTURED_INTENTS).
+        `answer_prompt` traz as instruções de resposta do GenerativeService.
 
-        # Verifica feedbacks negativos anteriores para evitar repetir erros
-        bad_intents: List[str] = self.feedback_service.get_negative_intents_for_similar_text(
-            user_text, min_score=0.70
-        )
+        Só o Gemini responde no mesmo JSON: com outro NLU_PROVIDER a classificação vem do provedor
+        configurado e o rascunho fica vazio (a resposta sai do gerador, como no modo sequencial).
+        """
+        if self.provider is not self.gemini_provider:
+            return {**self.analyze_text(text, question), "answer": ""}
+        user_text = (text or "").strip()
+        question = question if question is not None else user_text
+        intents = ", ".join(f"'{i}'" for i in NON_STRUCTURED_INTENTS)
+        combined_clause = f"""
+        MODO COMBINADO: inclua também a chave 'answer' no JSON.
+        Se a intent for {intents}, 'answer' deve ser a resposta final ao usuário, seguindo as
+        instruções abaixo. Para qualquer outra intent, use "answer": "".
+
+        INSTRUÇÕES DA RESPOSTA:
+        {answer_prompt}
+        """
+        prompt = self._build_prompt(user_text, question, combined_clause)
+        result = self._run("combined", prompt, self.combined_system_instruction, user_text)
+        self._apply_blocklist(result, question, self.gemini_provider.name)
+        result = self._normalize_entities(result)
+        answer = result.get("answer")
+        result["answer"] = answer.strip() if isinstance(answer, str) else ""
+        return result
+
+    def _build_prompt(self, user_text: str, question: str | None, extra_clause: str = "") -> str:
+        # Verifica feedbacks negativos anteriores para evitar repetir erros (índice em memória, sem banco)
+        bad_intents: List[str] = self.intent_blocklist.lookup(question if question is not None else user_text)
 
         avoid_clause = ""
         if bad_intents:
@@ -126,17 +178,24 @@ class NLUService:
 
         Texto: "Me explica equações de segundo grau"
         JSON: {{"intent": "aprofundar_topico", "entities": {{"topico": "equações de segundo grau"}}}}
-
+        {extra_clause}
         ---
         INPUT DO USUÁRIO:
         Texto: "{user_text}"
 
         RESPOSTA JSON:
         """
+        return prompt
 
+    def _run(self, stage: str, prompt: str, system_instruction: str, user_text: str) -> dict:
         try:
-            response = self.model.generate_content(prompt)
-            raw_text = response.text or ""
+            raw_text = self.router.generate(
+                stage,
+                prompt,
+                generation_config=self.generation_config,
+                system_instruction=system_instruction,
+                input_chars=len(user_text),
+            ) or ""
 
             # Limpeza robusta
             cleaned_response = self._clean_json_response(raw_text)
@@ -144,12 +203,6 @@ class NLUService:
             # Parse
             result: Dict[str, Any] = json.loads(cleaned_response)
 
-            # Normalização de disciplina (se houver)
-            entities = result.get("entities") or {}
-            if "disciplina" in entities and entities["disciplina"]:
-                entities["disciplina"] = self.content_service.normalize(entities.get("disciplina"))
-                result["entities"] = entities
-
             # Validação da intenção
             intent = result.get("intent", "desconhecido")
             if intent not in self._intents_validas:
@@ -161,6 +214,8 @@ class NLUService:
 
             return result
 
+        except (OverloadedError, DeadlineExceeded):
+            raise
         except Exception as e:
             print(f"Erro ao analisar o texto (NLU): {e}")
             # Fallback seguro
@@ -169,7 +224,16 @@ class NLUService:
                 "entities": {"error": str(e)}
             }
 
-    def _clean_json_response(self, text: str) -> str:
+    def _normalize_entities(self, result: dict) -> dict:
+        # Normalização de disciplina (se houver)
+        entities = result.get("entities") or {}
+        if "disciplina" in entities and entities["disciplina"]:
+            entities["disciplina"] = self.content_service.normalize(entities.get("disciplina"))
+            result["entities"] = entities
+        return result
+
+    @staticmethod
+    def _clean_json_response(text: str) -> str:
         """
         Remove blocos de código Markdown (```json ... ```) se existirem.
         """
@@ -0,0 +1,246 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from django.utils import timezone
+
+from ..core import GeneratedText, PeriodicTask, _env, metrics, normalize_question, output_budget, question_signature
+from ..models import PrecomputedAnswer
+from ..repositories import PrecomputedAnswerRepository, TextContentRepository
+from .generative_service import GenerativeService
+from .retrieval_service import RetrievalService
+
+logger = logging.getLogger(__name__)
+
+# Seleção dos grupos (comando precompute_answers, à noite)
+PRECOMPUTE_TOP_N = _env("PRECOMPUTE_TOP_N", 300, int)
+PRECOMPUTE_LOOKBACK_DAYS = _env("PRECOMPUTE_LOOKBACK_DAYS", 7, int)
+PRECOMPUTE_MIN_VOLUME = _env("PRECOMPUTE_MIN_VOLUME", 5, int)
+PRECOMPUTE_MIN_RATED = _env("PRECOMPUTE_MIN_RATED", 3, int)
+PRECOMPUTE_MIN_HELPFUL_RATE = _env("PRECOMPUTE_MIN_HELPFUL_RATE", 0.7, float)
+# Gerações simultâneas (o LLM também atende o tráfego ao vivo) e idade a partir da qual a resposta é refeita
+PRECOMPUTE_CONCURRENCY = _env("PRECOMPUTE_CONCURRENCY", 4, int)
+PRECOMPUTE_REFRESH_AFTER_HOURS = _env("PRECOMPUTE_REFRESH_AFTER_HOURS", 20, float)
+# No worker: respostas mais velhas que isto não são servidas; intervalo da releitura da tabela
+PRECOMPUTED_MAX_AGE_HOURS = _env("PRECOMPUTED_MAX_AGE_HOURS", 72, float)
+PRECOMPUTED_RELOAD_SECS = _env("PRECOMPUTED_RELOAD_SECS", 300.0, float)
+
+AGE_BUCKETS_SECS = (3600, 6 * 3600, 12 * 3600, 24 * 3600, 48 * 3600, 72 * 3600, 7 * 86400)
+# Intents das respostas que o pré-cálculo substitui: a geração livre da pergunta (não as continuações nem as
+# simplificações, que dependem da resposta anterior) e o próprio pré-cálculo, para continuar avaliando o grupo
+PRECOMPUTABLE_INTENTS = ("generativo", "resposta_precomputada")
+# Perguntas que dependem da conversa ("e isso?", "explica o anterior") não têm resposta fixa
+_CONTEXT_WORDS = frozenset({"isso", "isto", "aquilo", "ele", "ela", "eles", "elas", "dele", "dela", "anterior",
+                            "acima", "mesmo", "mesma", "outro", "outra", "continua", "continue"})
+# Respostas à conversa ("sim", "não entendi", "quero mais") não contam como conteúdo da pergunta
+_CONVERSATION_WORDS = frozenset({"sim", "nao", "ok", "claro", "quero", "pode", "mais", "entendi", "obrigado",
+                                 "obrigada", "valeu", "beleza", "certo"})
+
+
+def _answerable(text: str | None) -> bool:
+    """Pergunta com resposta fixa: sem referência à conversa e com ao menos duas palavras de conteúdo."""
+    words = set(normalize_question(text).split(" "))
+    return not _CONTEXT_WORDS & words and bool(question_signature(" ".join(sorted(words - _CONVERSATION_WORDS))))
+
+
+def cluster_key(text: str | None) -> str:
+    """Chave do grupo: a assinatura de palavras relevantes ou, em perguntas curtas, o texto normalizado."""
+    norm = normalize_question(text)
+    return (question_signature(norm) or norm)[:255]
+
+
+@dataclass
+class QuestionCluster:
+    key: str
+    volume: int = 0
+    helpful: int = 0
+    unhelpful: int = 0
+    precomputable: int = 0  # feedbacks respondidos pelo gerador (ou pelo pré-cálculo)
+    variants: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def question(self) -> str:
+        return max(self.variants.items(), key=lambda item: item[1])[0]
+
+    @property
+    def helpful_rate(self) -> Optional[float]:
+        rated = self.helpful + self.unhelpful
+        return round(self.helpful / rated, 4) if rated else None
+
+
+def build_clusters(rows: Iterable[dict], texts: Dict[Any, str]) -> Dict[str, QuestionCluster]:
+    """Linhas (pergunta, intent, helpful, n) -> grupos por assinatura, com a variante mais frequente."""
+    clusters: Dict[str, QuestionCluster] = {}
+    for row in rows:
+        text = texts.get(row["question_id"], "").strip()
+        key = cluster_key(text)
+        if not key:
+            continue
+        cluster = clusters.setdefault(key, QuestionCluster(key))
+        cluster.volume += row["n"]
+        cluster.variants[text] = cluster.variants.get(text, 0) + row["n"]
+        if row["helpful"] is True:
+            cluster.helpful += row["n"]
+        elif row["helpful"] is False:
+            cluster.unhelpful += row["n"]
+        if row["detected_intent"] in PRECOMPUTABLE_INTENTS:
+            cluster.precomputable += row["n"]
+    return clusters
+
+
+def select_clusters(clusters: Iterable[QuestionCluster], top_n: int = PRECOMPUTE_TOP_N,
+                    min_volume: int = PRECOMPUTE_MIN_VOLUME, min_rated: int = PRECOMPUTE_MIN_RATED,
+                    min_helpful_rate: float = PRECOMPUTE_MIN_HELPFUL_RATE) -> List[QuestionCluster]:
+    """
+    Os top-N grupos por volume entre os que vale pré-calcular: respondidos na maior parte pelo gerador,
+    com avaliações suficientes e boa taxa de "ajudou", e sem depender da conversa.
+    """
+    eligible = [
+        c for c in clusters
+        if c.volume >= min_volume
+        and c.precomputable * 2 > c.volume
+        and c.helpful + c.unhelpful >= min_rated
+        and (c.helpful_rate or 0.0) >= min_helpful_rate
+        and _answerable(c.question)
+    ]
+    return sorted(eligible, key=lambda c: (-c.volume, c.key))[:top_n]
+
+
+class PrecomputedAnswerService:
+    """
+    Respostas pré-calculadas para as perguntas mais frequentes.
+
+    `precompute` (comando noturno) agrupa as perguntas recentes do feedback, escolhe os grupos de
+    maior volume com boa avaliação e gera (ou refaz, se velhas) as respostas com concorrência limitada.
+    No worker, `lookup` é um dicionário em memória, relido da tabela a cada PRECOMPUTED_RELOAD_SECS.
+    """
+
+    def __init__(self, generative_service: GenerativeService | None = None,
+                 retrieval_service: RetrievalService | None = None,
+                 repository: PrecomputedAnswerRepository | None = None,
+                 max_age_hours: float = PRECOMPUTED_MAX_AGE_HOURS):
+        self.generative_service = generative_service or GenerativeService()
+        self.retrieval_service = retrieval_service
+        self.repository = repository or PrecomputedAnswerRepository()
+        self.max_age = timedelta(hours=max_age_hours)
+        self._index: Optional[Dict[str, PrecomputedAnswer]] = None
+        self._lock = threading.Lock()
+        self._task = PeriodicTask("precomputed-answers-reload", self.refresh, PRECOMPUTED_RELOAD_SECS)
+
+    def load(self, entries: Iterable[PrecomputedAnswer]) -> int:
+        index = {e.cluster_key: e for e in entries}
+        with self._lock:
+            self._index = index
+        metrics.set_gauge("precomputed_answers", len(index))
+        if index:
+            oldest = min(e.generated_at for e in index.values())
+            metrics.set_gauge("precomputed_answers_max_age_secs", (timezone.now() - oldest).total_seconds())
+        return len(index)
+
+    def refresh(self) -> int:
+        return self.load(self.repository.get_all())
+
+    def start(self):
+        # Se o warmup já carregou a tabela, a thread só faz as releituras periódicas
+        self._task.run_immediately = self._index is None
+        self._task.start()
+
+    def lookup(self, text: str) -> Optional[PrecomputedAnswer]:
+        """
+        A resposta pré-calculada do grupo da pergunta, se existir, não estiver velha e couber no canal.
+        A própria mensagem também precisa ter resposta fixa: "sim" ou "não entendi" nunca são servidos daqui.
+        """
+        answerable = _answerable(text)
+        entry = (self._index or {}).get(cluster_key(text)) if answerable else None
+        if not answerable:
+            outcome = "ineligible"
+        elif entry is None:
+            outcome = "miss"
+        else:
+            age = (timezone.now() - entry.generated_at).total_seconds()
+            if age > self.max_age.total_seconds():
+                outcome = "stale"
+            elif entry.max_output_tokens > output_budget():
+                outcome = "budget"  # gerada para um teto maior que o do canal (ex.: voz)
+            else:
+                outcome = "hit"
+                metrics.observe("precomputed_answer_age_secs", age, buckets=AGE_BUCKETS_SECS)
+        metrics.inc("precomputed_answer_lookups_total", labels={"outcome": outcome})
+        return entry if outcome == "hit" else None
+
+    def precompute(self, top_n: int = PRECOMPUTE_TOP_N, lookback_days: int = PRECOMPUTE_LOOKBACK_DAYS,
+                   concurrency: int = PRECOMPUTE_CONCURRENCY,
+                   refresh_after_hours: float = PRECOMPUTE_REFRESH_AFTER_HOURS,
+                   dry_run: bool = False, **selection) -> Dict[str, Any]:
+        start = time.perf_counter()
+        stamp = timezone.now()
+        rows = self.repository.question_stats(stamp - timedelta(days=lookback_days))
+        texts = TextContentRepository.get_texts(row["question_id"] for row in rows)
+        clusters = build_clusters(rows, texts)
+        selected = select_clusters(clusters.values(), top_n, **selection)
+        report: Dict[str, Any] = {"feedbacks": sum(r["n"] for r in rows), "clusters": len(clusters),
+                                  "selected": len(selected),
+                                  "selected_volume": sum(c.volume for c in selected)}
+        if dry_run:
+            report["top"] = [{"key": c.key, "question": c.question, "volume": c.volume,
+                              "helpful_rate": c.helpful_rate} for c in selected[:20]]
+            return report
+
+        existing = {e.cluster_key: e for e in self.repository.get_all()}
+        fresh_since = stamp - timedelta(hours=refresh_after_hours)
+        budget = output_budget()
+        to_generate = [c for c in selected if c.key not in existing
+                       or existing[c.key].generated_at < fresh_since
+                       or existing[c.key].max_output_tokens != budget]
+
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="precompute") as pool:
+            answers = dict(zip((c.key for c in to_generate), pool.map(self._generate, to_generate)))
+
+        entries, counts = [], {"generated": 0, "reused": 0, "skipped": 0}
+        for cluster in selected:
+            answer = answers.get(cluster.key)
+            previous = existing.get(cluster.key)
+            if answer is not None:
+                counts["generated"] += 1
+                text, generated_at = str(answer), stamp
+            elif previous is not None:
+                # Ainda nova, ou a geração falhou: fica a anterior (o worker não serve além de PRECOMPUTED_MAX_AGE_HOURS)
+                counts["reused"] += 1
+                text, generated_at = previous.answer, previous.generated_at
+            else:
+                # Resposta curada pela recuperação (o chat já responde sem LLM) ou falha na geração
+                counts["skipped"] += 1
+                continue
+            entries.append(PrecomputedAnswer(
+                cluster_key=cluster.key, question=cluster.question, answer=text, volume=cluster.volume,
+                helpful_rate=cluster.helpful_rate, max_output_tokens=budget, generated_at=generated_at,
+                updated_at=stamp,
+            ))
+
+        removed = self.repository.replace_all(entries, stamp)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics.inc("precompute_answers_total", counts["generated"], labels={"outcome": "generated"})
+        metrics.observe("precompute_run_ms", elapsed_ms, buckets=(1000, 10000, 60000, 300000, 900000, 3600000))
+        return {**report, **counts, "stored": len(entries), "removed": removed, "ms": round(elapsed_ms, 2)}
+
+    def _generate(self, cluster: QuestionCluster) -> Optional[GeneratedText]:
+        """Gera como o chat geraria (com os trechos recuperados como contexto); None se não deve ser guardada."""
+        try:
+            passages = []
+            if self.retrieval_service is not None:
+                retrieval = self.retrieval_service.retrieve(cluster.question)
+                if retrieval.answer:
+                    return None  # o chat já responde com a resposta curada, sem LLM
+                passages = retrieval.passages
+            answer = self.generative_service.generate_free_response(cluster.question, contexto=passages)
+        except Exception as e:
+            logger.warning(f"Pré-cálculo de '{cluster.key}' falhou: {e}")
+            return None
+        # A falha da geração devolve uma str comum; respostas cortadas no teto também não servem
+        if not isinstance(answer, GeneratedText) or answer.truncated:
+            return None
+        return answer
@@ -0,0 +1,138 @@
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Set, Tuple
+
+from ..core import _env, metrics, normalize_question
+from .educational_content_service import EducationalContentService
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = _env("PREFETCH_ENABLED", True, bool)
+PREFETCH_WORKERS = _env("PREFETCH_WORKERS", 2, int)
+# Orçamentos: tópicos por listagem, requisições por listagem e tarefas pendentes no worker
+# (cada tópico gera até duas chaves: os três tópicos padrão cabem nas oito requisições)
+PREFETCH_MAX_TOPICS = _env("PREFETCH_MAX_TOPICS", 3, int)
+PREFETCH_MAX_REQUESTS = _env("PREFETCH_MAX_REQUESTS", 8, int)
+PREFETCH_MAX_PENDING = _env("PREFETCH_MAX_PENDING", 32, int)
+
+Task = Tuple[Callable[..., Any], Tuple[Any, ...]]
+
+
+class PrefetchService:
+    """
+    Aquece o cache de conteúdo com o provável próximo passo da conversa.
+
+    Depois de listar os tópicos de uma disciplina (ou os locais por campus), o turno
+    seguinte quase sempre pede o aprofundamento de um tópico (ou os horários de um local).
+    Essas leituras são disparadas em background num executor limitado; uma nova listagem
+    da mesma sessão cancela o que ainda não começou da anterior. Sem sessão, cada requisição
+    tem a sua chave: uma requisição anônima não cancela o prefetch de outra.
+    """
+
+    def __init__(self, content_service: EducationalContentService | None = None,
+                 max_workers: int = PREFETCH_WORKERS, max_pending: int = PREFETCH_MAX_PENDING,
+                 enabled: bool = PREFETCH_ENABLED):
+        self.content_service = content_service or EducationalContentService()
+        self.enabled = enabled and max_workers > 0
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max(max_workers, 1), thread_name_prefix="prefetch")
+        self._pending: Dict[Any, Set[Future]] = {}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def topico_keys(topico: Dict[str, Any]) -> List[str]:
+        """
+        Chaves com que o próximo turno pede o aprofundamento de um tópico: o handler usa a entidade
+        `topico` em minúsculas, que vem do título listado (com acentos, ou sem eles quando o NLU os tira).
+        """
+        titulo = (topico.get("titulo") or "").strip().lower()
+        return [k for k in dict.fromkeys((titulo, normalize_question(titulo))) if k]
+
+    def prefetch_topicos(self, session_id: int | None, topicos: Iterable[Dict[str, Any]]) -> int:
+        # Primeiro o título de cada tópico, depois as variantes sem acento: o corte do orçamento
+        # nunca deixa um tópico sem a chave principal
+        per_topic = [self.topico_keys(t) for t in list(topicos)[:PREFETCH_MAX_TOPICS]]
+        keys = [k for rank in range(2) for topic_keys in per_topic for k in topic_keys[rank:rank + 1]]
+        tasks = [(self.content_service.get_aprofundamento, (k,)) for k in dict.fromkeys(keys)]
+        return self._schedule(session_id, "aprofundamento", tasks)
+
+    def prefetch_locais(self, session_id: int | None, locais: Dict[str, Any]) -> int:
+        tasks: List[Task] = []
+        for c in (locais or {}).get("campi", []) or []:
+            campus = c.get("campus", "")
+            for loc in c.get("locais") or []:
+                local = (loc.get("id") or "").strip().lower()
+                if local and campus:
+                    tasks.append((self.content_service.horarios, (local, campus)))
+        return self._schedule(session_id, "horarios", tasks)
+
+    def cancel(self, session_id: int | None) -> int:
+        """Cancela os prefetches da sessão que ainda não começaram."""
+        with self._lock:
+            futures = list(self._pending.get(session_id, ()))
+        cancelled = sum(1 for f in futures if f.cancel())
+        if cancelled:
+            metrics.inc("prefetch_cancelled_total", cancelled)
+        return cancelled
+
+    def shutdown(self):
+        with self._lock:
+            sessions = list(self._pending)
+        for session_id in sessions:
+            self.cancel(session_id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule(self, session_id: int | None, kind: str, tasks: List[Task]) -> int:
+        if not self.enabled or not tasks:
+            return 0
+
+        if session_id is not None:
+            self.cancel(session_id)
+        key = session_id if session_id is not None else object()
+        if len(tasks) > PREFETCH_MAX_REQUESTS:
+            metrics.inc("prefetch_skipped_total", len(tasks) - PREFETCH_MAX_REQUESTS,
+                        labels={"kind": kind, "reason": "budget"})
+            tasks = tasks[:PREFETCH_MAX_REQUESTS]
+
+        scheduled = 0
+        for fn, args in tasks:
+            with self._lock:
+                if self._in_flight >= self.max_pending:
+                    metrics.inc("prefetch_skipped_total", len(tasks) - scheduled,
+                                labels={"kind": kind, "reason": "saturated"})
+                    break
+                self._in_flight += 1
+            try:
+                future = self._executor.submit(self._run, kind, fn, args)
+            except RuntimeError:  # executor encerrado
+                with self._lock:
+                    self._in_flight -= 1
+                break
+            with self._lock:
+                self._pending.setdefault(key, set()).add(future)
+            future.add_done_callback(lambda f, k=key: self._done(k, f))
+            scheduled += 1
+
+        metrics.inc("prefetch_scheduled_total", scheduled, labels={"kind": kind})
+        metrics.set_gauge("prefetch_in_flight", self._in_flight)
+        return scheduled
+
+    def _run(self, kind: str, fn: Callable[..., Any], args: Tuple[Any, ...]):
+        with self.content_service.prefetching(kind):
+            try:
+                fn(*args)
+            except Exception as e:
+                metrics.inc("prefetch_errors_total", labels={"kind": kind})
+                logger.debug(f"Prefetch {kind}{args} falhou: {e}")
+
+    def _done(self, key: Any, future: Future):
+        with self._lock:
+            self._in_flight -= 1
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending.discard(future)
+                if not pending:
+                    del self._pending[key]
+        metrics.set_gauge("prefetch_in_flight", self._in_flight)
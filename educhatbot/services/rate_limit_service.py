@@ -0,0 +1,44 @@
+import logging
+from typing import Optional
+
+from ..core import KeyedRateLimiter, TokenBucket, _env, metrics
+
+logger = logging.getLogger(__name__)
+
+SESSION_RATE_PER_MIN = _env("CHAT_RATE_SESSION_PER_MIN", 20.0, float)
+SESSION_BURST = _env("CHAT_RATE_SESSION_BURST", 5.0, float)
+# Limite global por worker (o total do cluster é este valor × número de workers).
+GLOBAL_RATE_PER_SEC = _env("CHAT_RATE_GLOBAL_PER_SEC", 10.0, float)
+GLOBAL_BURST = _env("CHAT_RATE_GLOBAL_BURST", 30.0, float)
+
+
+class RateLimitService:
+    """
+    Limita a taxa de mensagens do /api/chat por sessão e globalmente (token bucket).
+    A sessão é verificada primeiro (uma sessão insistente não gasta a cota global); se o limite
+    global barrar a mensagem, o token da sessão é devolvido.
+    """
+
+    def __init__(self):
+        self.session_limiter = KeyedRateLimiter(SESSION_RATE_PER_MIN / 60, SESSION_BURST)
+        self.global_bucket = TokenBucket(GLOBAL_RATE_PER_SEC, GLOBAL_BURST)
+
+    def check(self, session_id: int | None) -> Optional[float]:
+        """
+        Retorna None se a mensagem pode seguir, ou os segundos sugeridos para o Retry-After.
+        """
+        if session_id is not None:
+            retry_after = self.session_limiter.try_acquire(session_id)
+            if retry_after is not None:
+                metrics.inc("chat_rate_limited_total", labels={"scope": "session"})
+                logger.info(f"Sessão {session_id} limitada por {retry_after:.1f}s.")
+                return retry_after
+
+        retry_after = self.global_bucket.try_acquire()
+        if retry_after is not None:
+            if session_id is not None:
+                self.session_limiter.refund(session_id)
+            metrics.inc("chat_rate_limited_total", labels={"scope": "global"})
+            return retry_after
+
+        return None
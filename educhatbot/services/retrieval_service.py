@@ -0,0 +1,222 @@
+import logging
+import math
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..core import PeriodicTask, _env, metrics, normalize_question
+from .educational_content_service import EducationalContentService
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_TOP_K = _env("RETRIEVAL_TOP_K", 3, int)
+# Similaridade de cosseno a partir da qual a resposta curada é servida sem chamar o LLM
+RETRIEVAL_ANSWER_THRESHOLD = _env("RETRIEVAL_ANSWER_THRESHOLD", 0.62, float)
+# Abaixo disto os trechos não são usados nem como contexto para o gerador
+RETRIEVAL_GROUNDING_THRESHOLD = _env("RETRIEVAL_GROUNDING_THRESHOLD", 0.2, float)
+RETRIEVAL_REFRESH_SECS = _env("RETRIEVAL_REFRESH_SECS", 900.0, float)
+
+_STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "de", "da", "do", "das", "dos", "e", "em", "no", "na", "nos", "nas",
+    "para", "pra", "por", "com", "que", "me", "eu", "voce", "se", "ao", "aos", "sobre", "como", "ha",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Palavras normalizadas (sem acento/stopwords) + bigramas."""
+    words = [w for w in normalize_question(text).split(" ") if len(w) > 1 and w not in _STOPWORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+@dataclass
+class RetrievalDocument:
+    doc_id: str
+    kind: str  # "faq" | "aprofundamento"
+    title: str
+    text: str  # texto indexado
+    answer: str  # resposta curada, pronta para o usuário
+    passage: str  # trecho curto usado como contexto do gerador
+
+
+@dataclass
+class RetrievedPassage:
+    document: RetrievalDocument
+    score: float
+
+
+@dataclass
+class RetrievalResult:
+    answer: Optional[str] = None
+    passages: List[str] = field(default_factory=list)
+    top_score: float = 0.0
+
+
+class TfidfIndex:
+    """
+    Matriz TF-IDF esparsa em formato CSC (arrays NumPy), linhas normalizadas em L2.
+    A busca soma as colunas dos termos da consulta com um único np.bincount
+    (cosseno contra todos os documentos) e extrai o top-k por argpartition.
+    """
+
+    def __init__(self, documents: List[RetrievalDocument]):
+        self.documents = documents
+        self.vocabulary: Dict[str, int] = {}
+        rows: List[int] = []
+        cols: List[int] = []
+        tfs: List[float] = []
+        for row, doc in enumerate(documents):
+            for term, count in Counter(tokenize(doc.text)).items():
+                rows.append(row)
+                cols.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                tfs.append(1 + math.log(count))
+
+        n_docs, n_terms = len(documents), len(self.vocabulary)
+        row_arr = np.asarray(rows, dtype=np.int32)
+        col_arr = np.asarray(cols, dtype=np.int32)
+        df = np.bincount(col_arr, minlength=n_terms).astype(np.float32)
+        self.idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+
+        weights = np.asarray(tfs, dtype=np.float32) * self.idf[col_arr]
+        norms = np.sqrt(np.bincount(row_arr, weights=weights ** 2, minlength=n_docs)).astype(np.float32)
+        norms[norms == 0] = 1
+        weights /= norms[row_arr]
+
+        order = np.argsort(col_arr, kind="stable")
+        self.doc_ids = row_arr[order]
+        self.weights = weights[order]
+        self.indptr = np.concatenate(([0], np.cumsum(df.astype(np.int64))))
+
+    def vectorize(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        counts = Counter(t for t in tokenize(text) if t in self.vocabulary)
+        cols = np.fromiter((self.vocabulary[t] for t in counts), dtype=np.int64, count=len(counts))
+        tf = np.fromiter((1 + math.log(c) for c in counts.values()), dtype=np.float32, count=len(counts))
+        values = tf * self.idf[cols]
+        norm = float(np.linalg.norm(values))
+        return cols, (values / norm if norm else values)
+
+    def query(self, text: str, k: int) -> List[Tuple[int, float]]:
+        cols, values = self.vectorize(text)
+        if not len(cols) or not self.documents:
+            return []
+        starts, ends = self.indptr[cols], self.indptr[cols + 1]
+        positions = np.concatenate([np.arange(a, b) for a, b in zip(starts, ends)])
+        query_weights = np.repeat(values, ends - starts)
+        scores = np.bincount(self.doc_ids[positions], weights=self.weights[positions] * query_weights,
+                             minlength=len(self.documents))
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+
+class RetrievalService:
+    """
+    Busca local (CPU) sobre o FAQ institucional e os conteúdos de aprofundamento.
+
+    O índice é montado no warmup e reconstruído em background; com score alto a
+    resposta curada é servida direto, senão os melhores trechos viram contexto do LLM.
+    """
+
+    def __init__(self, content_service: EducationalContentService | None = None):
+        self.content_service = content_service or EducationalContentService()
+        self._index: Optional[TfidfIndex] = None
+        self._lock = threading.Lock()
+        self._task = PeriodicTask("retrieval-refresh", self.refresh, RETRIEVAL_REFRESH_SECS)
+
+    def collect_documents(self) -> List[RetrievalDocument]:
+        docs: List[RetrievalDocument] = []
+
+        for c in (self.content_service.locais() or {}).get("campi", []) or []:
+            campus = c.get("campus", "")
+            for loc in c.get("locais") or []:
+                data = self.content_service.faq(local=(loc.get("id") or "").lower(), campus=campus)
+                if not isinstance(data, dict):
+                    continue
+                for i, item in enumerate(data.get("faq") or []):
+                    pergunta = item.get("pergunta", "")
+                    resposta = item.get("resposta_simplificada", "")
+                    if not pergunta or not resposta:
+                        continue
+                    local = data.get("local", loc.get("nome", ""))
+                    docs.append(RetrievalDocument(
+                        doc_id=f"faq:{loc.get('id')}:{campus}:{i}",
+                        kind="faq",
+                        title=pergunta,
+                        text=f"{pergunta} {pergunta} {resposta} {local} {campus}",
+                        answer=f"**{pergunta}**\n{resposta}\n_(FAQ – {local} – {campus})_",
+                        passage=f"FAQ {local} ({campus}) – {pergunta} {resposta}",
+                    ))
+
+        seen = set()
+        for d in self.content_service.list_disciplinas():
+            conteudos = self.content_service.get_conteudos(d.get("id", ""))
+            for t in conteudos.get("topicos", []):
+                titulo_norm = normalize_question(t.get("titulo", ""))
+                for key in dict.fromkeys([t.get("id", ""), titulo_norm, titulo_norm.split(" ")[0]]):
+                    data = self.content_service.get_aprofundamento(key) if key else None
+                    if not data or "erro" in data or not data.get("descricao"):
+                        continue
+                    topico = data.get("topico", t.get("titulo", ""))
+                    if topico in seen:
+                        break
+                    seen.add(topico)
+                    etapas = (data.get("detalhamento") or {}).get("etapas", [])
+                    answer = f"🔎 **{topico}**\n\n{data['descricao']}"
+                    if etapas:
+                        answer += "\n\n**Etapas principais:**\n" + "\n".join(f"• {e}" for e in etapas)
+                    docs.append(RetrievalDocument(
+                        doc_id=f"aprofundamento:{key}",
+                        kind="aprofundamento",
+                        title=topico,
+                        text=f"{topico} {topico} {data.get('disciplina', '')} {data['descricao']}",
+                        answer=answer,
+                        passage=f"{topico}: {data['descricao']}",
+                    ))
+                    break
+        return docs
+
+    def build(self, documents: List[RetrievalDocument]) -> int:
+        index = TfidfIndex(documents)
+        with self._lock:
+            self._index = index
+        metrics.set_gauge("retrieval_documents", len(documents))
+        metrics.set_gauge("retrieval_vocabulary", len(index.vocabulary))
+        return len(documents)
+
+    def refresh(self) -> int:
+        return self.build(self.collect_documents())
+
+    def start(self):
+        # Se o warmup já montou o índice, a thread só faz as atualizações periódicas
+        self._task.run_immediately = self._index is None
+        self._task.start()
+
+    def search(self, query: str, k: int = RETRIEVAL_TOP_K) -> List[RetrievedPassage]:
+        index = self._index
+        if index is None:
+            # Sem warmup: monta o índice em background e segue sem recuperação por enquanto
+            self.start()
+            return []
+        start = time.perf_counter()
+        hits = [RetrievedPassage(index.documents[i], score) for i, score in index.query(query, k)]
+        metrics.observe("retrieval_search_ms", (time.perf_counter() - start) * 1000)
+        return hits
+
+    def retrieve(self, query: str) -> RetrievalResult:
+        hits = self.search(query)
+        if not hits:
+            metrics.inc("retrieval_outcome_total", labels={"outcome": "miss", "kind": "none"})
+            return RetrievalResult()
+
+        top = hits[0]
+        if top.score >= RETRIEVAL_ANSWER_THRESHOLD:
+            metrics.inc("retrieval_outcome_total", labels={"outcome": "answered", "kind": top.document.kind})
+            return RetrievalResult(answer=top.document.answer, top_score=top.score)
+
+        passages = [h.document.passage for h in hits if h.score >= RETRIEVAL_GROUNDING_THRESHOLD]
+        metrics.inc("retrieval_outcome_total", labels={"outcome": "grounded" if passages else "miss", "kind": "none"})
+        return RetrievalResult(passages=passages, top_score=top.score)
@@ -0,0 +1,81 @@
+import hashlib
+import re
+import threading
+from typing import Callable, Optional
+
+from cachetools import TTLCache
+
+from ..core import GeneratedText, SessionState, Turn, _env, current_channel, metrics, normalize_question
+from .feedback_rollup_service import answer_path
+from .generative_service import GenerativeService
+
+# Reescritas simplificadas de respostas estruturadas (o mesmo texto sempre gera a mesma versão curta)
+SIMPLIFY_CACHE_TTL_SECS = _env("SIMPLIFY_CACHE_TTL_SECS", 86400, int)
+SIMPLIFY_CACHE_MAXSIZE = _env("SIMPLIFY_CACHE_MAXSIZE", 2048, int)
+
+# Pedidos que se referem à resposta anterior (texto normalizado, sem acentos)
+_SIMPLIFY_CUES = (r"nao entendi|simplifica\w*|simplifique|mais simples|explica melhor|explique melhor|resume|resuma|"
+                  r"resumindo|de novo|outra vez|de outro jeito|de outra forma|mais facil")
+_SIMPLIFY_FILLERS = r"pode|por favor|isso|isto|ai|a resposta|pra mim|para mim|melhor|mais|entao"
+SIMPLIFY_REQUEST = re.compile(
+    rf"^(({_SIMPLIFY_FILLERS}) )*({_SIMPLIFY_CUES})( ({_SIMPLIFY_CUES}|{_SIMPLIFY_FILLERS}))*$"
+)
+# Caminhos de resposta determinísticos: a versão simplificada pode ser reaproveitada
+CACHEABLE_PATHS = ("estruturada", "recuperada")
+
+
+class SimplificationService:
+    """
+    "Simplificar" como reescrita da última resposta do bot, em vez de gerar a resposta do zero:
+    o prompt leva o texto já respondido e a saída tem teto pequeno. As reescritas de respostas
+    estruturadas (horários, FAQ, conteúdos) ficam em cache e voltam sem chamar o LLM.
+    """
+
+    def __init__(self, generative_service: GenerativeService, ttl: int = SIMPLIFY_CACHE_TTL_SECS,
+                 maxsize: int = SIMPLIFY_CACHE_MAXSIZE):
+        self.generative_service = generative_service
+        self._cache: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def refers_to(user_input: str, previous: Turn) -> bool:
+        """A mensagem repete a pergunta da resposta anterior ou só pede para simplificar ("não entendi")."""
+        norm = normalize_question(user_input)
+        return bool(previous.answer.strip()) and (
+            norm == normalize_question(previous.question) or bool(SIMPLIFY_REQUEST.match(norm))
+        )
+
+    @classmethod
+    def previous_answer(cls, user_input: str, session: SessionState | None,
+                        last_messages: list | None) -> Optional[Turn]:
+        """
+        A resposta que o pedido quer simplificada: a última da sessão, se a mensagem se refere a ela.
+        Sem estado no worker, vale a última mensagem do bot no histórico enviado pelo cliente.
+        """
+        previous = session.last_answer if session is not None else None
+        if previous is None and last_messages:
+            bot = next((m for m in reversed(last_messages) if m.get("role") == "bot" and m.get("text")), None)
+            user = next((m for m in reversed(last_messages) if m.get("role") == "user"), {})
+            if bot is not None:
+                previous = Turn(0, user.get("text", ""), bot["text"], None)
+        return previous if previous is not None and cls.refers_to(user_input, previous) else None
+
+    def simplify(self, previous: Turn, on_chunk: Callable[[str], None] | None = None) -> str:
+        key = (current_channel(), hashlib.sha256(previous.answer.encode("utf-8")).digest()[:16])
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached is not None:
+            metrics.inc("simplify_requests_total", labels={"source": "cache"})
+            if on_chunk is not None:
+                on_chunk(cached)
+            return cached
+
+        answer = self.generative_service.rewrite_simpler(previous.answer, on_chunk=on_chunk)
+        # Só texto gerado e completo (a falha devolve uma str comum com o pedido de desculpas)
+        cacheable = (isinstance(answer, GeneratedText) and not answer.truncated
+                     and answer_path(previous.intent) in CACHEABLE_PATHS)
+        if cacheable:
+            with self._lock:
+                self._cache[key] = str(answer)
+        metrics.inc("simplify_requests_total", labels={"source": "rewrite"})
+        return answer
@@ -0,0 +1,196 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from ..core import DeadlineExceeded, _env, current_deadline, metrics, normalize_question
+from .generative_service import GenerativeService
+
+logger = logging.getLogger(__name__)
+
+# Probabilidade mínima (estimada localmente) de o turno terminar no gerador para especular
+SPECULATION_MIN_PROBABILITY = _env("SPECULATION_MIN_PROBABILITY", 0.7, float)
+# Gerações especulativas simultâneas no processo; acima disso o turno segue sequencial
+SPECULATION_MAX_IN_FLIGHT = _env("SPECULATION_MAX_IN_FLIGHT", 4, int)
+
+# Sinais de intents estruturadas (texto normalizado, sem acentos)
+_STRUCTURED_CUES = (
+    "disciplina", "conteudo", "materia", "ementa", "horario", "biblioteca", "secretaria", "campus",
+    "telefone", "contato", "email", "faq", "perguntas frequentes", "video", "funciona", "funcionalidade",
+    "o que voce faz", "quiz",
+)
+_TOPIC_CUES = ("aprofund", "explica", "o que e ", "me fala sobre", "quero saber mais")
+_GREETINGS = ("oi", "ola", "bom dia", "boa tarde", "boa noite", "tudo bem", "e ai", "eai", "hey")
+
+# (classe, intent provável, probabilidade a priori de terminar no gerador)
+_CLASSES: Dict[str, Tuple[Optional[str], float]] = {
+    "saudacao": ("saudacao", 0.95),
+    "estruturada": (None, 0.1),
+    "topico": ("aprofundar_topico", 0.4),
+    "livre": ("modo_generativo", 0.8),
+}
+
+
+@dataclass
+class IntentPrediction:
+    label: str
+    intent: Optional[str]
+    probability: float
+
+
+class GenerativeTurnClassifier:
+    """
+    Classificador local e barato (palavras-chave) que estima se o turno vai terminar no gerador.
+
+    A probabilidade de cada classe parte do valor a priori e é ajustada com os desfechos
+    observados (média suavizada), então o limiar de especulação acompanha o tráfego real.
+    """
+
+    def __init__(self, prior_weight: float = 20.0):
+        self.prior_weight = prior_weight
+        self._stats: Dict[str, List[int]] = {label: [0, 0] for label in _CLASSES}  # [gerador, total]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def label_for(text: str) -> str:
+        norm = normalize_question(text)
+        padded = f" {norm} "
+        if any(cue in norm for cue in _STRUCTURED_CUES):
+            return "estruturada"
+        if any(cue in padded for cue in _TOPIC_CUES):
+            return "topico"
+        if len(norm.split()) <= 5 and any(f" {g} " in padded for g in _GREETINGS):
+            return "saudacao"
+        return "livre"
+
+    def predict(self, text: str) -> IntentPrediction:
+        label = self.label_for(text)
+        intent, prior = _CLASSES[label]
+        with self._lock:
+            hits, total = self._stats[label]
+        probability = (hits + prior * self.prior_weight) / (total + self.prior_weight)
+        return IntentPrediction(label, intent, round(probability, 4))
+
+    def observe(self, prediction: IntentPrediction, generative: bool):
+        with self._lock:
+            stats = self._stats[prediction.label]
+            stats[0] += int(generative)
+            stats[1] += 1
+
+
+@dataclass
+class Speculation:
+    prediction: IntentPrediction
+    future: Optional[Future] = None
+    prompt_chars: int = 0
+    duration_ms: float = 0.0
+    generative: bool = False  # o turno chegou ao gerador
+    consumed: bool = False
+    finished: bool = False
+
+    @property
+    def started(self) -> bool:
+        return self.future is not None
+
+
+class SpeculationService:
+    """
+    Execução especulativa: dispara a resposta generativa em paralelo com o NLU quando o
+    classificador local indica que o turno provavelmente vai terminar no gerador.
+
+    Se o turno for resolvido por intent estruturada (ou recuperação de feedback), a geração
+    é cancelada se ainda não começou; se já estiver no LLM, o resultado é descartado (a
+    chamada não pode ser interrompida) e os tokens estimados entram em
+    `speculation_wasted_tokens_total`. Quando usada, o tempo economizado vai para
+    `speculation_latency_saved_ms`. Os desfechos vão para `speculation_total{outcome, class, reason}`,
+    sempre com os três labels (`reason` só diz algo nos "skipped").
+    """
+
+    def __init__(self, generative_service: GenerativeService | None = None,
+                 classifier: GenerativeTurnClassifier | None = None,
+                 min_probability: float = SPECULATION_MIN_PROBABILITY,
+                 max_in_flight: int = SPECULATION_MAX_IN_FLIGHT):
+        self.generative_service = generative_service or GenerativeService()
+        self.classifier = classifier or GenerativeTurnClassifier()
+        self.min_probability = min_probability
+        self._slots = threading.BoundedSemaphore(max(max_in_flight, 1))
+        self._executor = ThreadPoolExecutor(max_workers=max(max_in_flight, 1), thread_name_prefix="speculation")
+
+    def start(self, user_input: str, contexto: list[str] | None = None) -> Speculation:
+        """Classifica o turno e, se valer a pena, dispara a geração. Sempre devolve a Speculation."""
+        speculation = Speculation(self.classifier.predict(user_input))
+        if speculation.prediction.probability < self.min_probability:
+            self._count(speculation, "skipped", "low_probability")
+            return speculation
+        if not self._slots.acquire(blocking=False):
+            self._count(speculation, "skipped", "saturated")
+            return speculation
+
+        speculation.prompt_chars = len(self.generative_service.build_prompt(user_input, contexto))
+        try:
+            speculation.future = self._executor.submit(
+                contextvars.copy_context().run, self._generate, speculation, user_input, contexto)
+        except RuntimeError:  # executor encerrado
+            self._slots.release()
+            self._count(speculation, "skipped", "shutdown")
+            return speculation
+        speculation.future.add_done_callback(lambda f: self._slots.release())
+        self._count(speculation, "started")
+        return speculation
+
+    @staticmethod
+    def _count(speculation: Speculation, outcome: str, reason: str = "none"):
+        metrics.inc("speculation_total",
+                    labels={"outcome": outcome, "class": speculation.prediction.label, "reason": reason})
+
+    def _generate(self, speculation: Speculation, user_input: str, contexto: list[str] | None) -> str:
+        start = time.perf_counter()
+        try:
+            return self.generative_service.generate_free_response(
+                user_input, contexto=contexto, intent=speculation.prediction.intent)
+        finally:
+            speculation.duration_ms = (time.perf_counter() - start) * 1000
+
+    def use(self, speculation: Speculation) -> str:
+        """Resultado da geração especulativa; a economia é o trecho que rodou junto com o NLU."""
+        speculation.consumed = True
+        start = time.perf_counter()
+        deadline = current_deadline()
+        try:
+            answer = speculation.future.result(timeout=None if deadline is None else deadline.remaining())
+        except FuturesTimeout:
+            raise DeadlineExceeded("generative")
+        waited = (time.perf_counter() - start) * 1000
+        saved = max(0.0, speculation.duration_ms - waited)
+        self._count(speculation, "used")
+        metrics.observe("speculation_latency_saved_ms", saved)
+        metrics.inc("speculation_latency_saved_ms_total", saved)
+        return answer
+
+    def finish(self, speculation: Speculation):
+        """Fecha o turno: alimenta o classificador e cancela/descarta a geração não usada."""
+        if speculation.finished:
+            return
+        speculation.finished = True
+        self.classifier.observe(speculation.prediction, speculation.generative)
+        if not speculation.started or speculation.consumed:
+            return
+
+        if speculation.future.cancel():
+            self._count(speculation, "cancelled")
+            return
+        self._count(speculation, "discarded")
+        speculation.future.add_done_callback(lambda f: self._count_waste(speculation, f))
+
+    @staticmethod
+    def _count_waste(speculation: Speculation, future: Future):
+        output = future.result() if future.exception() is None else ""
+        # Estimativa de ~4 caracteres por token (entrada + saída)
+        metrics.inc("speculation_wasted_tokens_total", (speculation.prompt_chars + len(output or "")) // 4)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
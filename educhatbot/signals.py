@@ -0,0 +1,14 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Feedback
+
+
+@receiver(post_save, sender=Feedback, dispatch_uid="educhatbot_feedback_intent_blocklist")
+def update_intent_blocklist(sender, instance: Feedback, **kwargs):
+    """Feedback negativo com intent entra na hora no blocklist deste worker."""
+    if instance.helpful is False and instance.detected_intent:
+        from .runtime import get_intent_blocklist_service
+        blocklist = get_intent_blocklist_service(create=False)
+        if blocklist is not None:
+            blocklist.add(instance.user_question, instance.detected_intent)
@@ -1,3 +1,659 @@
-from django.test import TestCase
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 
-# Create your tests here.
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from .core import (
+    CircuitBreaker, CircuitOpenError, DeadlineExceeded, FakeLLMBackend, LatencyTracker, ModelRouter, SessionState, Turn,
+    channel_scope, client_deadline, deadline_scope, metrics, output_budget
+)
+from .models import Feedback, PrecomputedAnswer, TextContent
+from .repositories import ContentSnapshot, ContentSnapshotRepository, SnapshotEntry
+from .serializers import FeedbackResponseSerializer
+from .serializers.chat_fast_serializer import parse_ask_request
+from .services.generative_service import GenerativeService
+from .services.feedback_rollup_service import answer_path, build_rollups, session_length_bucket
+from .services.idempotency_service import IdempotencyConflict, IdempotencyService
+from .services.precomputed_answer_service import (
+    PrecomputedAnswerService, build_clusters, cluster_key, select_clusters
+)
+from .services.simplification_service import SimplificationService
+from .services.nlu_providers import CascadingNLUProvider, FakeNLUProvider, LocalRulesNLUProvider
+from .services.speculation_service import GenerativeTurnClassifier, SpeculationService
+
+# Orçamento (ms) para a importação a frio de config.wsgi; ajustável por ambiente de CI.
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+HEAVY_MODULES = ("google.generativeai", "grpc", "google.cloud.dialogflow")
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def run_importtime(code: str, **env) -> dict[str, int]:
+    """
+    Executa `code` num processo novo com -X importtime e retorna
+    {módulo: tempo cumulativo em microssegundos}.
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=settings.BASE_DIR,
+        env={**os.environ, "WARMUP_ON_STARTUP": "", **env},
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise AssertionError(proc.stderr[-2000:])
+
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            modules[match.group(3)] = int(match.group(2))
+    return modules
+
+
+class ImportTimeBudgetTest(SimpleTestCase):
+    def test_cold_import_of_wsgi_within_budget(self):
+        modules = run_importtime("import config.wsgi")
+        elapsed_ms = modules["config.wsgi"] / 1000
+        self.assertLessEqual(
+            elapsed_ms, IMPORT_TIME_BUDGET_MS,
+            f"Importar config.wsgi levou {elapsed_ms:.0f} ms (orçamento {IMPORT_TIME_BUDGET_MS:.0f} ms)",
+        )
+
+    def test_urlconf_does_not_import_llm_sdks(self):
+        modules = run_importtime(
+            "import config.wsgi; from django.urls import get_resolver; get_resolver().url_patterns"
+        )
+        self.assertEqual([m for m in HEAVY_MODULES if m in modules], [])
+
+    def test_schema_disabled_skips_drf_spectacular(self):
+        modules = run_importtime(
+            "import config.wsgi; from django.urls import get_resolver; get_resolver().url_patterns",
+            API_SCHEMA_ENABLED="False",
+        )
+        self.assertFalse([m for m in modules if m.startswith("drf_spectacular")])
+
+
+class ModelRouterTest(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_routes_each_stage_to_its_model(self):
+        backend = FakeLLMBackend(responder=lambda prompt, model, *a: model)
+        router = ModelRouter(backend, nlu_model="nlu", generative_model="grande", fast_model="rapido",
+                             hedge_enabled=False)
+        self.assertEqual(router.generate("nlu", "oi"), "nlu")
+        self.assertEqual(router.generate("generative", "explique frações"), "grande")
+        self.assertEqual(router.generate("generative", "olá!", intent="saudacao"), "rapido")
+
+    def test_slow_generative_model_is_routed_to_fast_model_by_p95(self):
+        tracker = LatencyTracker(window=50, min_samples=5)
+        backend = FakeLLMBackend(responder=lambda prompt, model, *a: model)
+        router = ModelRouter(backend, nlu_model="nlu", generative_model="grande", fast_model="rapido",
+                             hedge_enabled=False, tracker=tracker)
+        for _ in range(10):
+            tracker.record("grande", 20000)
+            tracker.record("rapido", 800)
+        decision = router.route("generative", intent="modo_generativo", input_chars=500)
+        self.assertEqual((decision.model, decision.reason), ("rapido", "latency"))
+
+    def test_hedge_returns_first_response_when_primary_is_slow(self):
+        # p95 baixo do modelo principal: o hedge sai em LLM_HEDGE_MIN_AFTER_MS, bem antes da resposta lenta
+        tracker = LatencyTracker(window=50, min_samples=5)
+        for _ in range(5):
+            tracker.record("grande", 50)
+        backend = FakeLLMBackend(responder=lambda prompt, model, *a: model,
+                                 latency_ms={"grande": 3000, "rapido": 10})
+        router = ModelRouter(backend, nlu_model="nlu", generative_model="grande", fast_model="rapido",
+                             tracker=tracker)
+
+        start = time.perf_counter()
+        self.assertEqual(router.generate("generative", "pergunta", input_chars=500), "rapido")
+        self.assertLess(time.perf_counter() - start, 2.0)
+        self.assertEqual(metrics.counter_value("llm_hedges_total", {"stage": "generative", "outcome": "backup_won"}), 1)
+
+    def test_fast_primary_does_not_fire_hedge(self):
+        backend = FakeLLMBackend(responder=lambda prompt, model, *a: model)
+        router = ModelRouter(backend, nlu_model="nlu", generative_model="grande", fast_model="rapido")
+        self.assertEqual(router.generate("generative", "explique frações"), "grande")
+        self.assertEqual(metrics.counter_value("llm_hedges_total", {"stage": "generative", "outcome": "fired"}), 0)
+
+
+class SpeculationServiceTest(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+        router = ModelRouter(FakeLLMBackend(latency_ms=50), hedge_enabled=False)
+        self.service = SpeculationService(GenerativeService(router=router), min_probability=0.7)
+
+    def test_classifier_labels(self):
+        label_for = GenerativeTurnClassifier.label_for
+        self.assertEqual(label_for("Oi, tudo bem?"), "saudacao")
+        self.assertEqual(label_for("Qual o horário da biblioteca?"), "estruturada")
+        self.assertEqual(label_for("Me explica fotossíntese"), "topico")
+        self.assertEqual(label_for("Você acha que vai chover amanhã?"), "livre")
+
+    def test_structured_turn_is_not_speculated(self):
+        speculation = self.service.start("Qual o telefone da secretaria?")
+        self.assertFalse(speculation.started)
+        self.service.finish(speculation)
+        self.assertEqual(metrics.counter_value(
+            "speculation_total", {"outcome": "skipped", "class": "estruturada", "reason": "low_probability"}), 1)
+
+    def test_used_speculation_returns_answer_and_saves_latency(self):
+        speculation = self.service.start("Me conta uma curiosidade sobre o espaço")
+        self.assertTrue(speculation.started)
+        speculation.generative = True
+        self.assertEqual(self.service.use(speculation), FakeLLMBackend.DEFAULT_TEXT)
+        self.service.finish(speculation)
+        self.assertEqual(metrics.counter_value(
+            "speculation_total", {"outcome": "used", "class": "livre", "reason": "none"}), 1)
+
+    def test_unused_speculation_is_discarded_and_counted_as_waste(self):
+        speculation = self.service.start("Me conta uma curiosidade sobre o espaço")
+        speculation.future.result()  # já chegou ao LLM: não dá para cancelar
+        self.service.finish(speculation)
+        self.assertEqual(metrics.counter_value(
+            "speculation_total", {"outcome": "discarded", "class": "livre", "reason": "none"}), 1)
+        self.assertGreater(metrics.counter_value("speculation_wasted_tokens_total"), 0)
+
+
+class NLUProviderTest(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_local_rules(self):
+        local = LocalRulesNLUProvider()
+        cases = {
+            "Oi, tudo bem?": ("saudacao", {}),
+            "Qual o horário da biblioteca em São Leopoldo?": (
+                "consultar_informacao_institucional",
+                {"local": "biblioteca", "campus": "São Leopoldo", "info": "horarios"}),
+            "Qual o telefone da secretaria?": ("consultar_informacao_institucional",
+                                               {"local": "secretaria", "info": "contatos"}),
+            "preciso de um vídeo sobre história do Brasil": ("buscar_video_educacional",
+                                                             {"assunto": "história do Brasil"}),
+            "Me de o conteúdo de matemática": ("buscar_conteudo_disciplina", {"disciplina": "matemática"}),
+            "Me explica equações de segundo grau": ("aprofundar_topico", {"topico": "equações de segundo grau"}),
+            "como você funciona?": ("explicar_funcionalidades", {}),
+            "Você acha que vai chover amanhã?": ("desconhecido", {}),
+        }
+        for text, (intent, entities) in cases.items():
+            result = local.classify(text, text)
+            self.assertEqual((result["intent"], result["entities"]), (intent, entities), text)
+
+    def test_local_rules_slice_entities_from_the_original_text(self):
+        from .core import normalize_question
+        from .services.nlu_providers import _normalize_with_offsets
+        for text in ("  Vídeos   sobre a Revolução Farroupilha?! ", "O QUE É fotossíntese...", "ação"):
+            self.assertEqual(_normalize_with_offsets(text)[0], normalize_question(text))
+        result = LocalRulesNLUProvider().classify("", "Quero saber mais sobre a Revolução Farroupilha!")
+        self.assertEqual(result["entities"], {"topico": "Revolução Farroupilha"})
+
+    def test_cascade_answers_confident_turns_without_fallback(self):
+        fallback = FakeNLUProvider("modo_generativo")
+        cascade = CascadingNLUProvider(LocalRulesNLUProvider(), fallback, min_confidence=0.8)
+        result = cascade.analyze("Oi", "Oi")
+        self.assertEqual((result["intent"], result["provider"]), ("saudacao", "local"))
+        self.assertEqual(metrics.counter_value("nlu_requests_total", {"provider": "fake", "intent": "modo_generativo"}), 0)
+
+    def test_cascade_escalates_low_confidence_and_records_agreement(self):
+        cascade = CascadingNLUProvider(FakeNLUProvider("aprofundar_topico", confidence=0.5),
+                                       FakeNLUProvider("modo_generativo"), min_confidence=0.8)
+        result = cascade.analyze("me fala da lua", "me fala da lua")
+        self.assertEqual((result["intent"], result["provider"]), ("modo_generativo", "fake"))
+        self.assertEqual(metrics.counter_value("nlu_cascade_total", {"outcome": "escalated", "provider": "fake"}), 1)
+        self.assertEqual(metrics.counter_value(
+            "nlu_agreement_total", {"provider": "fake", "agree": "false", "source": "escalated"}), 1)
+
+
+    def test_blocklisted_intent_is_dropped_for_any_provider(self):
+        from types import SimpleNamespace
+        from .services.nlu_service import NLUService
+        blocklist = SimpleNamespace(lookup=lambda question: ["aprofundar_topico"] if "mitose" in question else [])
+        nlu = NLUService(content_service=object(), feedback_service=object(), intent_blocklist=blocklist,
+                         router=ModelRouter(FakeLLMBackend()), provider=LocalRulesNLUProvider())
+        self.assertEqual(nlu.analyze_text("me explica mitose")["intent"], "desconhecido")
+        self.assertEqual(nlu.analyze_text("me explica meiose")["intent"], "aprofundar_topico")
+        self.assertEqual(metrics.counter_value("nlu_blocked_intent_total", {"provider": "local"}), 1)
+
+    def test_combined_mode_applies_the_blocklist_and_the_configured_provider(self):
+        from types import SimpleNamespace
+        from .services.nlu_service import NLUService
+        blocklist = SimpleNamespace(lookup=lambda question: ["aprofundar_topico"] if "mitose" in question else [])
+        backend = FakeLLMBackend(lambda *args: '{"intent": "aprofundar_topico", "entities": {}, "answer": "x"}')
+        nlu = NLUService(content_service=object(), feedback_service=object(), intent_blocklist=blocklist,
+                         router=ModelRouter(backend), provider=LocalRulesNLUProvider())
+        result = nlu.analyze_and_answer("me explica mitose", answer_prompt="")
+        self.assertEqual((result["intent"], result["answer"], backend.calls), ("desconhecido", "", 0))
+
+        nlu.provider = nlu.gemini_provider
+        self.assertEqual(nlu.analyze_and_answer("me explica mitose", answer_prompt="")["intent"], "desconhecido")
+        self.assertEqual(nlu.analyze_and_answer("me explica meiose", answer_prompt="")["answer"], "x")
+        self.assertEqual(metrics.counter_value("nlu_blocked_intent_total", {"provider": "gemini"}), 1)
+
+
+class PrefetchServiceTest(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+
+    def test_only_the_same_session_cancels_pending_prefetches(self):
+        from contextlib import nullcontext
+        from types import SimpleNamespace
+        from .services.prefetch_service import PrefetchService
+        release = threading.Event()
+        content = SimpleNamespace(get_aprofundamento=lambda key: release.wait(5),
+                                  prefetching=lambda kind: nullcontext())
+        service = PrefetchService(content, max_workers=1)
+        topicos = [{"id": "t1", "titulo": "Porcentagem"}, {"id": "t2", "titulo": "Juros"}]
+        self.assertEqual(PrefetchService.topico_keys({"id": "t3", "titulo": " Frações "}), ["frações", "fracoes"])
+        try:
+            service.prefetch_topicos(None, topicos)
+            service.prefetch_topicos(None, topicos)
+            self.assertEqual(metrics.counter_value("prefetch_cancelled_total"), 0)
+            service.prefetch_topicos(5, topicos)
+            service.prefetch_topicos(5, topicos)
+            self.assertEqual(metrics.counter_value("prefetch_cancelled_total"), 2)
+        finally:
+            release.set()
+            service.shutdown()
+
+
+class ContentSnapshotTest(SimpleTestCase):
+    def setUp(self):
+        metrics.reset()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.repo = ContentSnapshotRepository(os.path.join(self.tmp.name, "content.snapshot"))
+
+    def test_round_trip(self):
+        entry = SnapshotEntry("/locais/horarios", [["campus", "São Leopoldo"], ["local", "biblioteca"]],
+                              {"horario": "8h às 22h"}, '"abc"', None, 1700000000.0)
+        self.repo.write(ContentSnapshot(1700000100.0, {"mat": "matematica"}, [entry]))
+        snapshot = self.repo.read()
+        self.assertEqual(snapshot.aliases, {"mat": "matematica"})
+        self.assertEqual(snapshot.entries, [entry])
+        self.assertEqual(snapshot.created_at, 1700000100.0)
+
+    def test_corrupted_file_is_ignored(self):
+        self.repo.write(ContentSnapshot(1700000100.0, {"mat": "matematica"}))
+        raw = self.repo.path.read_bytes()
+        self.repo.path.write_bytes(raw[:-3])
+        self.assertIsNone(self.repo.read())
+        self.assertEqual(metrics.counter_value("content_snapshot_invalid_total"), 1)
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    def test_opens_after_threshold_and_closes_after_probe(self):
+        breaker = CircuitBreaker("teste", failure_threshold=2, reset_timeout=0.05)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()
+
+        time.sleep(0.06)
+        breaker.before_call()  # chamada de teste
+        self.assertEqual(breaker.state, "half_open")
+        with self.assertRaises(CircuitOpenError):
+            breaker.before_call()  # só uma de teste por vez
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_transport_errors_in_the_probe_reopen_the_circuit(self):
+        import httpx
+        from .core import HttpClientService
+
+        def fail(request):
+            raise httpx.ReadError("conexão caiu", request=request)
+
+        breaker = CircuitBreaker("teste", failure_threshold=1, reset_timeout=0.01)
+        client = HttpClientService("http://conteudo", retries=1, breaker=breaker)
+        client._client = httpx.Client(base_url="http://conteudo", transport=httpx.MockTransport(fail))
+        with self.assertRaises(httpx.ReadError):
+            client.get("/x")
+        self.assertEqual(breaker.state, "open")
+
+        time.sleep(0.02)
+        with self.assertRaises(httpx.ReadError):
+            client.get("/x")  # a chamada de teste falha e o circuito volta a abrir
+        self.assertEqual(breaker.state, "open")
+        time.sleep(0.02)
+        client._client = httpx.Client(base_url="http://conteudo", transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={})))
+        self.assertEqual(client.get("/x").status_code, 200)
+        self.assertEqual(breaker.state, "closed")
+
+
+class StreamingTest(SimpleTestCase):
+    def test_stream_yields_same_text_as_generate(self):
+        router = ModelRouter(FakeLLMBackend(responder=lambda *a: "uma resposta em partes"), hedge_enabled=False)
+        chunks = []
+        answer = GenerativeService(router=router).generate_free_response("oi", on_chunk=chunks.append)
+        self.assertEqual(chunks, ["uma", " resposta", " em", " partes"])
+        self.assertEqual(answer, "uma resposta em partes")
+
+    def test_session_state_tracks_turns_and_feedback(self):
+        state = SessionState(7)
+        turn = state.add_turn("Por que o céu é azul?", "Por causa da dispersão.", "generativo")
+        self.assertEqual([m["role"] for m in state.last_messages()], ["user", "bot"])
+
+        feedback = type("Feedback", (), {"id": 10})()
+        state.record_feedback(feedback, False)
+        self.assertTrue(state.needs_simplify)
+        self.assertIs(state.take_pending_negative(), feedback)
+        self.assertIsNone(state.take_pending_negative())
+
+        state.record_feedback(feedback, True)
+        self.assertFalse(state.needs_simplify)
+        self.assertEqual(turn.message_id, 1)
+
+
+class OutputBudgetTest(SimpleTestCase):
+    def test_smallest_of_channel_and_intent(self):
+        self.assertEqual(output_budget(channel="web"), 512)
+        self.assertEqual(output_budget("saudacao", "web"), 80)
+        self.assertEqual(output_budget("generativo_simplificado", "libras"), 120)
+        with channel_scope("tts"):
+            self.assertEqual(output_budget(), 160)
+        with channel_scope("desconhecido"):
+            self.assertEqual(output_budget(), 512)
+
+    def test_truncated_answer_continues_from_partial(self):
+        backend = FakeLLMBackend(responder=lambda *a: " ".join(f"p{i}" for i in range(30)))
+        service = GenerativeService(router=ModelRouter(backend, hedge_enabled=False))
+        answer = service.generate_free_response("explique tudo", max_output_tokens=10)
+        self.assertTrue(answer.truncated)
+        self.assertEqual(answer.split(" ")[-1], "p9")
+        self.assertEqual(backend.recent[-1][1].count("no máximo umas 20 palavras"), 1)
+
+        service.continue_response(answer.continuation)
+        prompt = backend.recent[-1][1]
+        self.assertIn("explique tudo", prompt)
+        self.assertIn(str(answer), prompt)
+
+    def test_only_bare_affirmatives_continue(self):
+        from .services.chatbot_service import CONTINUE_REQUEST
+        from .core import normalize_question
+        for text in ("sim", "Pode continuar, por favor!", "ok", "quero mais", "Continua"):
+            self.assertTrue(CONTINUE_REQUEST.match(normalize_question(text)), text)
+        for text in ("Pode explicar o que é mitose?", "Quero saber sobre frações", "mais exemplos de verbos", "sei"):
+            self.assertFalse(CONTINUE_REQUEST.match(normalize_question(text)), text)
+
+
+class SimplificationTest(SimpleTestCase):
+    def test_previous_answer_only_when_the_request_refers_to_it(self):
+        state = SessionState(3)
+        state.remember_answer("Qual o horário da biblioteca?", "Seg-Sex 08:00-22:00", "consultar_informacao_institucional")
+        self.assertIsNotNone(SimplificationService.previous_answer("qual o horario da biblioteca", state, None))
+        self.assertIsNotNone(SimplificationService.previous_answer("Não entendi, simplifica isso", state, None))
+        self.assertIsNone(SimplificationService.previous_answer("O que é fotossíntese?", state, None))
+
+        history = [{"role": "user", "text": "oi"}, {"role": "bot", "text": "Olá! Como posso ajudar?"}]
+        self.assertEqual(SimplificationService.previous_answer("resume", None, history).answer, "Olá! Como posso ajudar?")
+
+    def test_structured_rewrites_are_cached(self):
+        backend = FakeLLMBackend(responder=lambda *a: "Abre às 8 e fecha às 22.")
+        service = SimplificationService(GenerativeService(router=ModelRouter(backend, hedge_enabled=False)))
+        structured = Turn(0, "horário?", "Seg-Sex 08:00-22:00", "consultar_informacao_institucional")
+        generated = Turn(0, "por que o céu é azul?", "Por causa da dispersão de Rayleigh.", "generativo")
+
+        self.assertEqual(service.simplify(structured), "Abre às 8 e fecha às 22.")
+        self.assertIn("Seg-Sex 08:00-22:00", backend.recent[-1][1])
+        chunks = []
+        self.assertEqual(service.simplify(structured, on_chunk=chunks.append), "Abre às 8 e fecha às 22.")
+        self.assertEqual(chunks, ["Abre às 8 e fecha às 22."])
+        service.simplify(generated)
+        service.simplify(generated)
+        self.assertEqual(backend.calls, 3)
+
+
+class DeadlineTest(SimpleTestCase):
+    def test_llm_call_stops_at_deadline(self):
+        router = ModelRouter(FakeLLMBackend(latency_ms=2000), hedge_enabled=False)
+        start = time.perf_counter()
+        with deadline_scope(0.1), self.assertRaises(DeadlineExceeded) as ctx:
+            router.generate("nlu", "oi")
+        self.assertEqual(ctx.exception.stage, "nlu")
+        self.assertLess(time.perf_counter() - start, 1.0)
+
+    def test_expired_deadline_skips_the_call(self):
+        backend = FakeLLMBackend()
+        with deadline_scope(0.01):
+            time.sleep(0.02)
+            with self.assertRaises(DeadlineExceeded):
+                ModelRouter(backend, hedge_enabled=False).generate("generative", "oi")
+        self.assertEqual(backend.calls, 0)
+
+    def test_client_deadline_is_clamped(self):
+        self.assertIsNone(client_deadline(None))
+        self.assertIsNone(client_deadline("abc"))
+        self.assertEqual(client_deadline("10"), 1.0)
+        self.assertEqual(client_deadline("5000"), 5.0)
+        self.assertEqual(client_deadline(10 ** 9), 20.0)  # nunca mais que o prazo padrão
+
+    def test_deadline_in_the_probe_releases_it(self):
+        import httpx
+        from .core import HttpClientService
+
+        def slow(request):
+            time.sleep(0.05)
+            raise httpx.ConnectTimeout("sem resposta", request=request)
+
+        breaker = CircuitBreaker("teste", failure_threshold=1, reset_timeout=0.01)
+        breaker.record_failure()
+        time.sleep(0.02)
+        client = HttpClientService("http://conteudo", retries=3, breaker=breaker)
+        client._client = httpx.Client(base_url="http://conteudo", transport=httpx.MockTransport(slow))
+        with deadline_scope(0.1), self.assertRaises(DeadlineExceeded):
+            client.get("/x")
+        self.assertEqual(breaker.state, "half_open")
+        breaker.before_call()  # a chamada de teste foi liberada
+
+
+class RateLimitServiceTest(SimpleTestCase):
+    def test_global_rejection_refunds_the_session_token(self):
+        from .core import TokenBucket
+        from .services.rate_limit_service import RateLimitService
+        service = RateLimitService()
+        service.global_bucket = TokenBucket(rate=0.0, capacity=0)
+        for _ in range(10):
+            self.assertIsNotNone(service.check(7))
+        service.global_bucket = TokenBucket(rate=0.0, capacity=1)
+        self.assertIsNone(service.check(7))
+
+
+class IdempotencyServiceTest(SimpleTestCase):
+    def test_concurrent_duplicates_share_one_execution(self):
+        service, calls, results = IdempotencyService(), [], []
+
+        def answer():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"answer": "ok", "intent": "generativo"}
+
+        threads = [threading.Thread(target=lambda: results.append(service.execute("7:abc", "fp", answer)))
+                   for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(origin for _, origin in results), ["joined", "joined", "new"])
+        self.assertEqual(service.execute("7:abc", "fp", answer)[1], "replayed")
+
+    def test_same_key_with_other_request_is_a_conflict(self):
+        service = IdempotencyService()
+        service.execute("7:abc", "fp", lambda: "ok")
+        with self.assertRaises(IdempotencyConflict):
+            service.execute("7:abc", "outro", lambda: "ok")
+
+    def test_errors_and_uncacheable_results_are_not_stored(self):
+        service = IdempotencyService()
+        with self.assertRaises(RuntimeError):
+            service.execute("k", "fp", lambda: (_ for _ in ()).throw(RuntimeError("falhou")))
+        service.execute("k2", "fp", lambda: "degradada", cacheable=lambda r: False)
+        self.assertFalse(service.known("k"))
+        self.assertFalse(service.known("k2"))
+
+
+class ChatRequestParsingTest(SimpleTestCase):
+    def test_session_id_follows_drf_integer_rules(self):
+        from rest_framework.exceptions import ValidationError
+        body = {"role": "user", "text": "oi"}
+        self.assertEqual(parse_ask_request({**body, "session_id": "1.0"}).session_id, 1)
+        self.assertEqual(parse_ask_request({**body, "session_id": " 42 "}).session_id, 42)
+        for bad in ("--5", "²", True, "abc"):
+            with self.assertRaises(ValidationError) as ctx:
+                parse_ask_request({**body, "session_id": bad})
+            self.assertIn("sessionId", ctx.exception.detail)
+
+
+class FeedbackWriteBehindTest(SimpleTestCase):
+    def test_created_at_set_on_enqueue_survives_the_insert(self):
+        from datetime import datetime, timezone as tz
+        enqueued_at = datetime(2026, 10, 1, 9, tzinfo=tz.utc)
+        feedback = Feedback(id=5, created_at=enqueued_at)
+        self.assertEqual(Feedback._meta.get_field("created_at").pre_save(feedback, add=True), enqueued_at)
+
+    def test_session_reads_see_feedbacks_still_in_the_queue(self):
+        from types import SimpleNamespace
+        from .services.feedback_service import FeedbackService
+        from .services.feedback_writer_service import FeedbackWriterService
+        writer = FeedbackWriterService(repository=SimpleNamespace(reserve_ids=lambda n: list(range(1, n + 1))))
+        queued = []
+        writer.queue = SimpleNamespace(submit=lambda op: queued.append(op) or True)
+        service = FeedbackService(writer=writer)
+        service.repository = SimpleNamespace(session_cutoff=service.repository.session_cutoff,
+                                             get_last_unconsumed_negative=lambda session_id, exclude: None,
+                                             get_last_feedback=lambda session_id: None)
+
+        feedback = service.submit_feedback(None, 7, "O que é mitose?", "É a divisão celular.", False, "generativo")
+        self.assertEqual(service.get_last_unconsumed_negative(7).id, feedback.id)
+        self.assertTrue(service.session_needs_simplify(7))
+        self.assertIsNone(service.get_last_unconsumed_negative(8))
+
+        service.submit_feedback(feedback.id, None, None, None, True, None)
+        self.assertIsNone(service.get_last_unconsumed_negative(7))
+        self.assertFalse(service.session_needs_simplify(7))
+
+        writer._untrack([pk for _, pk, _ in queued])  # o lote gravado sai da fila: vale o banco
+        self.assertIsNone(service.get_last_feedback(7))
+
+
+class TextContentTest(SimpleTestCase):
+    def test_same_text_same_key(self):
+        self.assertEqual(TextContent.key_for("Olá!"), TextContent.of("Olá!").id)
+        self.assertNotEqual(TextContent.key_for("Olá!"), TextContent.key_for("Olá"))
+
+    def test_feedback_text_properties_and_serializer(self):
+        first = Feedback(id=1, user_question="Qual o horário?", bot_answer="08:00 às 21:30", helpful=True)
+        second = Feedback(id=2, user_question="Qual o horário?", bot_answer="", helpful=False)
+        self.assertEqual(first.question_id, second.question_id)
+        self.assertIsNone(second.answer_id)
+        self.assertEqual(second.bot_answer, "")
+        self.assertEqual(len(first.text_contents()), 2)
+
+        data = FeedbackResponseSerializer(first).data
+        self.assertEqual((data["user_question"], data["bot_answer"]), ("Qual o horário?", "08:00 às 21:30"))
+
+
+class FeedbackRollupTest(SimpleTestCase):
+    def test_buckets_and_paths(self):
+        self.assertEqual([session_length_bucket(n) for n in (1, 2, 5, 9, 40)], ["1", "2-3", "4-7", "8-15", "16+"])
+        self.assertEqual(answer_path("generativo_simplificado"), "generativo")
+        self.assertEqual(answer_path("consultar_informacao_institucional"), "estruturada")
+        self.assertEqual(answer_path(None), "desconhecido")
+
+    def test_build_rollups_counts_every_dimension(self):
+        from datetime import datetime, timezone as tz
+        h1, h2 = datetime(2026, 10, 1, 9, tzinfo=tz.utc), datetime(2026, 10, 1, 15, tzinfo=tz.utc)
+        rows = [
+            {"hour": h1, "session_id": 1, "detected_intent": "generativo", "helpful": False, "n": 2},
+            {"hour": h2, "session_id": 1, "detected_intent": "feedback_recovery", "helpful": True, "n": 1},
+            {"hour": h2, "session_id": None, "detected_intent": "explicar_funcionalidades", "helpful": None, "n": 4},
+        ]
+        rollups = {(r.granularity, r.dimension, r.key, r.bucket_start): r for r in build_rollups(rows, h2)}
+        day = datetime(2026, 10, 1, tzinfo=tz.utc)
+
+        path = rollups[("day", "path", "generativo", day)]
+        self.assertEqual((path.helpful, path.unhelpful, path.unrated), (0, 2, 0))
+        self.assertEqual(rollups[("hour", "path", "estruturada", h2)].unrated, 4)
+        session = rollups[("day", "session_length", "2-3", day)]
+        self.assertEqual((session.helpful, session.unhelpful), (1, 2))
+        self.assertEqual(rollups[("day", "session_length", "sem_sessao", day)].total, 4)
+        self.assertEqual(sum(r.total for r in rollups.values() if r.granularity == "day" and r.dimension == "intent"), 7)
+
+    def test_full_refresh_keeps_rollups_older_than_the_table(self):
+        from datetime import datetime, timezone as tz
+        from types import SimpleNamespace
+        from educhatbot.services.feedback_rollup_service import FeedbackRollupService
+        calls = []
+        repository = SimpleNamespace(
+            aggregate_since=lambda since: [],
+            earliest_created_at=lambda: datetime(2026, 3, 5, 14, 30, tzinfo=tz.utc),
+            replace_since=lambda since, rollups, stamp: calls.append(since) or 0,
+        )
+        FeedbackRollupService(repository=repository).refresh(full=True)
+        self.assertEqual((calls[0].year, calls[0].month, calls[0].day, calls[0].hour), (2026, 3, 5, 0))
+
+        repository.earliest_created_at = lambda: None
+        FeedbackRollupService(repository=repository).refresh(full=True)
+        self.assertIsNone(calls[1])
+
+
+class PrecomputedAnswerTest(SimpleTestCase):
+    def test_clusters_pick_frequent_helpful_generative_questions(self):
+        texts = {1: "Como calcular porcentagem?", 2: "calcular porcentagem como", 3: "Horário da biblioteca",
+                 4: "Explica isso de novo", 5: "O que é fotossíntese?"}
+        rows = [
+            {"question_id": 1, "detected_intent": "generativo", "helpful": True, "n": 8},
+            {"question_id": 2, "detected_intent": "resposta_precomputada", "helpful": None, "n": 3},
+            {"question_id": 1, "detected_intent": "generativo", "helpful": False, "n": 1},
+            {"question_id": 3, "detected_intent": "consultar_informacao_institucional", "helpful": True, "n": 30},
+            {"question_id": 4, "detected_intent": "generativo", "helpful": True, "n": 20},
+            {"question_id": 5, "detected_intent": "generativo", "helpful": False, "n": 10},
+        ]
+        clusters = build_clusters(rows, texts)
+        self.assertEqual(clusters[cluster_key("calcular porcentagem, como?")].volume, 12)
+
+        selected = select_clusters(clusters.values(), top_n=10, min_volume=5, min_rated=3, min_helpful_rate=0.7)
+        self.assertEqual([c.question for c in selected], ["Como calcular porcentagem?"])
+        self.assertEqual(selected[0].helpful_rate, 0.8889)
+
+    def test_lookup_skips_stale_answers(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        now = timezone.now()
+        service = PrecomputedAnswerService(generative_service=GenerativeService(router=ModelRouter(FakeLLMBackend())))
+        service.load([
+            PrecomputedAnswer(cluster_key=cluster_key("como calcular porcentagem"), answer="Multiplique e divida por 100.",
+                              max_output_tokens=512, generated_at=now - timedelta(hours=3)),
+            PrecomputedAnswer(cluster_key=cluster_key("o que é mitose"), answer="Divisão celular.",
+                              max_output_tokens=512, generated_at=now - timedelta(days=10)),
+        ])
+        self.assertEqual(service.lookup("Porcentagem: como calcular?").answer, "Multiplique e divida por 100.")
+        self.assertIsNone(service.lookup("O que é mitose?"))
+        self.assertIsNone(service.lookup("quem descobriu o brasil"))
+
+    def test_conversational_follow_ups_are_never_precomputed(self):
+        from django.utils import timezone
+        texts = {1: "sim", 2: "Não entendi", 3: "quero mais", 4: "Quero saber sobre frações"}
+        rows = [{"question_id": pk, "detected_intent": intent, "helpful": True, "n": 20}
+                for pk, intent in ((1, "generativo_continuacao"), (2, "generativo_simplificado"),
+                                   (3, "generativo"), (4, "generativo"))]
+        selected = select_clusters(build_clusters(rows, texts).values(), min_volume=5, min_rated=3)
+        self.assertEqual([c.question for c in selected], ["Quero saber sobre frações"])
+
+        service = PrecomputedAnswerService(generative_service=GenerativeService(router=ModelRouter(FakeLLMBackend())))
+        service.load([PrecomputedAnswer(cluster_key=cluster_key(text), answer="Resposta.", max_output_tokens=512,
+                                        generated_at=timezone.now()) for text in texts.values()])
+        self.assertIsNone(service.lookup("Sim"))
+        self.assertIsNone(service.lookup("não entendi"))
+        self.assertEqual(service.lookup("quero saber sobre frações").answer, "Resposta.")
@@ -1,10 +1,19 @@
 from django.urls import path
 
-from .controllers import AskController, FeedbackController
+from .controllers import (
+    AskController, FeedbackController, FeedbackMetricsController, LivenessController, MetricsController,
+    ProfileDownloadController, ProfileListController, ReadinessController
+)
 from .controllers.session_controller import SessionController
 
 urlpatterns = [
     path('chat', AskController.as_view(), name='chat-api'),
     path('feedback', FeedbackController.as_view(), name='feedback-api'),
+    path('feedback/metrics', FeedbackMetricsController.as_view(), name='feedback-metrics-api'),
     path('session', SessionController.as_view(), name='session-api'),
+    path('health/live', LivenessController.as_view(), name='health-live'),
+    path('health/ready', ReadinessController.as_view(), name='health-ready'),
+    path('metrics', MetricsController.as_view(), name='metrics-api'),
+    path('admin/profiles', ProfileListController.as_view(), name='profiles-list'),
+    path('admin/profiles/<str:name>', ProfileDownloadController.as_view(), name='profiles-download'),
 ]